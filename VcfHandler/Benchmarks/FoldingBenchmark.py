@@ -0,0 +1,118 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Benchmark of the folding of spectra, compared with the former loop-based implementation.
+Run from the VcfHandler directory with: python -m Benchmarks.FoldingBenchmark
+"""
+
+
+from Generators.SfsGenerator import SfsGenerator
+
+import math
+import sys
+import time
+import numpy as np
+
+
+class FoldingBenchmark:
+    """
+    Benchmark of the folding of spectra, compared with the former loop-based implementation.
+    Folded spectra of random one and two populations spectra must be exactly equal to the ones
+    of the loop-based implementation. Multidimensional spectra are only timed, since the loop-based
+    implementation only folds one and two populations spectra.
+    """
+
+
+    # Constructor
+
+    def __init__(self, shapes: list = [(21,), (2001,), (21, 19), (201, 201), (1001, 1001), (41, 41, 41), (21, 21, 21, 21)], seed: int = 0, **kwargs):
+        """
+        Constructor
+        shapes: shapes of the benchmarked spectra
+        """
+
+        self.shapes = shapes
+        self.seed = seed
+
+
+
+    # Methods
+
+    def Run(self):
+        """
+        Runs the benchmark, returns True if all the folded spectra are equal to the reference ones
+        """
+
+        random_generator = np.random.default_rng(self.seed)
+        sfs_generator = SfsGenerator.__new__(SfsGenerator)  # only used for its folding methods, without config
+
+        is_equal = True
+
+        for shape in self.shapes:
+            spectrum = random_generator.integers(0, 1000, size=shape)
+
+            start = time.perf_counter()
+            folded_spectrum = sfs_generator.computeFoldedSpectrum(spectrum)
+            duration = time.perf_counter() - start
+
+            message = "x".join(str(dimension) for dimension in shape) + ": " + str(round(duration * 1000, 3)) + " ms"
+
+            if(len(shape) <= 2):
+                start = time.perf_counter()
+                reference_spectrum = self.Fold1Population(spectrum.tolist()) if len(shape) == 1 else self.Fold2Populations(spectrum.tolist())
+                reference_duration = time.perf_counter() - start
+
+                shape_is_equal = np.array_equal(folded_spectrum, np.array(reference_spectrum))
+                is_equal = is_equal and shape_is_equal
+
+                message += ", loops: " + str(round(reference_duration * 1000, 3)) + " ms, " + ("equal" if shape_is_equal else "DIFFERENT")
+
+            print(message)
+
+        return is_equal
+
+
+    def Fold1Population(self, one_population_spectrum: list):
+        """
+        Former loop-based folding of one population spectra
+        """
+
+        folded_spectrum = [0] * len(one_population_spectrum)
+
+        for i in range (0, math.floor(len(one_population_spectrum) / 2)):
+            folded_spectrum[i] = one_population_spectrum[i] + one_population_spectrum[len(one_population_spectrum) - i - 1]
+
+        if(math.fmod(len(one_population_spectrum), 2) != 0):
+            folded_spectrum[math.floor(len(one_population_spectrum) / 2)] = one_population_spectrum[math.floor(len(one_population_spectrum) / 2)]
+
+        return folded_spectrum
+
+
+    def Fold2Populations(self, two_populations_spectrum: list):
+        """
+        Former loop-based folding of two populations spectra
+        """
+
+        rows = len(two_populations_spectrum)
+        cols = len(two_populations_spectrum[0])
+
+        folded_spectrum = [0] * rows
+        for i in range (0, rows):
+            folded_spectrum[i] = [0] * cols
+
+        for i in range (0, rows):
+            for j in range (0, cols):
+                if(i + j > (rows + cols) / 2 - 1):
+                    folded_spectrum[i][j] = 0
+                else:
+                    folded_spectrum[i][j] = two_populations_spectrum[i][j] + two_populations_spectrum[rows - i - 1][cols - j - 1]
+                if(i + j == (rows + cols) / 2 - 1 and folded_spectrum[i][j] != 0):
+                    folded_spectrum[i][j] /= 2
+
+        return folded_spectrum
+
+
+
+if __name__ == "__main__":
+    sys.exit(0 if FoldingBenchmark().Run() else 1)
@@ -0,0 +1,87 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Benchmark checking that the memory used by the streaming reader doesn't depend on the size of the VCF file.
+Run from the VcfHandler directory with: python -m Benchmarks.MemoryBenchmark
+"""
+
+
+from Benchmarks.SyntheticVcfGenerator import SyntheticVcfGenerator
+from Generators.SfsGenerator import SfsGenerator
+from Readers.VcfReader import VcfReader
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+
+class MemoryBenchmark:
+    """
+    Benchmark checking that the memory used by the streaming reader doesn't depend on the size of the VCF file.
+    """
+
+
+    # Constructor
+
+    def __init__(self, variants_counts: list = [20000, 40000, 80000], samples_cnt: int = 200, block_size: int = 5000, max_growth: float = 1.5, **kwargs):
+        """
+        Constructor
+        The benchmark fails if the peak memory of the largest file exceeds max_growth times the one of the smallest file
+        """
+
+        self.variants_counts = variants_counts
+        self.samples_cnt = samples_cnt
+        self.block_size = block_size
+        self.max_growth = max_growth
+
+
+
+    # Methods
+
+    def Run(self):
+        """
+        Runs the benchmark, returns True if the peak memory stays flat
+        """
+
+        peaks = []
+
+        with tempfile.TemporaryDirectory() as directory:
+            for variants_cnt in self.variants_counts:
+                synthetic_vcf_generator = SyntheticVcfGenerator(variants_cnt, self.samples_cnt)
+                vcf_file_name = os.path.join(directory, "benchmark.vcf")
+                pop_file_name = os.path.join(directory, "benchmark-popfile.txt")
+                synthetic_vcf_generator.WriteVcfFile(vcf_file_name)
+                synthetic_vcf_generator.WritePopFile(pop_file_name)
+
+                peaks.append(self.MeasurePeakMemory(vcf_file_name, pop_file_name))
+
+        for variants_cnt, peak in zip(self.variants_counts, peaks):
+            print(str(variants_cnt) + " variants x " + str(self.samples_cnt) + " samples: peak memory " + str(round(peak / 1024 / 1024, 2)) + " MB")
+
+        growth = peaks[-1] / peaks[0]
+        print("Peak memory growth: " + str(round(growth, 2)))
+
+        return growth <= self.max_growth
+
+
+    def MeasurePeakMemory(self, vcf_file_name: str, pop_file_name: str):
+        """
+        Returns the peak memory allocated while computing the SFS of the provided file, in bytes
+        """
+
+        sfs_generator = SfsGenerator(pop_file_name)
+        vcf_reader = VcfReader()
+
+        tracemalloc.start()
+        vcf_reader.ReadFile(vcf_file_name, sfs_generator, self.block_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return peak
+
+
+
+if __name__ == "__main__":
+    sys.exit(0 if MemoryBenchmark().Run() else 1)
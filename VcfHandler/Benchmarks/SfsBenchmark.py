@@ -0,0 +1,284 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Benchmark of the SFS computation on synthetic VCF files, end to end and stage by stage.
+Run from the VcfHandler directory with: python -m Benchmarks.SfsBenchmark --help
+"""
+
+
+from Benchmarks.SyntheticVcfGenerator import SyntheticVcfGenerator
+from Generators.SfsGenerator import SfsGenerator
+from Readers.ReadAheadReader import ReadAheadReader
+from Readers.VcfReader import VcfReader
+
+from contextlib import redirect_stdout
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+
+class SfsBenchmark:
+    """
+    Benchmark of the SFS computation on synthetic VCF files, end to end and stage by stage.
+    Results are reported as variants per second, genotypes per second and peak memory,
+    in a JSON document that can be compared between versions.
+    """
+
+
+    # Constructor
+
+    def __init__(self, synthetic_vcf_generator: SyntheticVcfGenerator, populations_cnt: int = 2, block_size: int = 10000, line_mode: bool = False, read_ahead_chunk_size: int = 0, read_ahead_queue_size: int = ReadAheadReader.QUEUE_SIZE, **kwargs):
+        """
+        Constructor
+        If line_mode is True, the line by line reading (materialized variant calls) is benchmarked as well,
+        and checked to give the same spectra as the reading by blocks on a file with multiallelic variant calls
+        If read_ahead_chunk_size is greater than 0, reading the lines and the whole computation are benchmarked
+        as well with a read-ahead of the file by chunks of read_ahead_chunk_size characters (see ReadAheadReader)
+        """
+
+        self.synthetic_vcf_generator = synthetic_vcf_generator
+        self.populations_cnt = populations_cnt
+        self.block_size = block_size
+        self.line_mode = line_mode
+        self.read_ahead_chunk_size = read_ahead_chunk_size
+        self.read_ahead_queue_size = read_ahead_queue_size
+
+        # duration of each stage, in seconds
+        self.durations = {}
+
+        # result of each equivalence check, True if both readings gave the same spectra
+        self.equivalences = {}
+
+
+
+    # Methods
+
+    def Run(self):
+        """
+        Runs the benchmark and returns its results as a dictionary
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            vcf_file_name = os.path.join(directory, "benchmark.vcf")
+            pop_file_name = os.path.join(directory, "benchmark-popfile.txt")
+            output_file_name = os.path.join(directory, "benchmark-sfs")
+
+            self.synthetic_vcf_generator.WriteVcfFile(vcf_file_name)
+            self.synthetic_vcf_generator.WritePopFile(pop_file_name, self.populations_cnt)
+
+            # messages of the reader and of the generator are not part of the benchmark output
+            with redirect_stdout(io.StringIO()):
+                self.RunStages(vcf_file_name, pop_file_name, output_file_name)
+                peak_memory = self.MeasurePeakMemory(vcf_file_name, pop_file_name, output_file_name)
+
+            file_size = os.path.getsize(vcf_file_name)
+
+        return self.GetResults(file_size, peak_memory)
+
+
+    def RunStages(self, vcf_file_name: str, pop_file_name: str, output_file_name: str):
+        """
+        Times each stage of the SFS computation, then the whole computation
+        """
+
+        sfs_generator = SfsGenerator(pop_file_name)
+        vcf_reader = VcfReader()
+        vcf_reader.RegisterGenerator(sfs_generator)  # only used for the sample selection of the parsing stage
+
+        self.Time("read_lines", lambda: self.CountLines(VcfReader(), vcf_file_name))
+        if(self.read_ahead_chunk_size > 0):
+            self.Time("read_lines_read_ahead", lambda: self.CountLines(self.GetReadAheadReader(), vcf_file_name))
+
+        genotype_blocks = self.Time("parse", lambda: list(vcf_reader.IterateBlocks(vcf_reader.IterateLines(vcf_file_name), self.block_size)))
+        self.Time("aggregate_blocks", lambda: [sfs_generator.AddGenotypeBlock(genotype_block) for genotype_block in genotype_blocks])
+        self.Time("output", lambda: sfs_generator.GenerateOutputfile(output_file_name))
+
+        if(self.line_mode):
+            line_sfs_generator = SfsGenerator(pop_file_name)
+            variant_calls = self.Time("materialize_variant_calls", lambda: [variant_call for genotype_block in genotype_blocks for variant_call in genotype_block.GetVariantCalls()])
+            self.Time("aggregate_variant_calls", lambda: [line_sfs_generator.AddVariantCall(variant_call) for variant_call in variant_calls])
+            del variant_calls
+
+        del genotype_blocks
+
+        self.Time("end_to_end", lambda: self.ComputeSfs(vcf_file_name, pop_file_name, output_file_name, self.block_size))
+
+        if(self.read_ahead_chunk_size > 0):
+            self.Time("end_to_end_read_ahead", lambda: self.ComputeSfs(vcf_file_name, pop_file_name, output_file_name, self.block_size, self.GetReadAheadReader()))
+
+        if(self.line_mode):
+            self.Time("end_to_end_line_mode", lambda: self.ComputeSfs(vcf_file_name, pop_file_name, output_file_name, 0))
+            self.equivalences["line_mode_multiallelic"] = self.CheckLineModeEquivalence(vcf_file_name + ".multiallelic", pop_file_name)
+
+
+    def CheckLineModeEquivalence(self, vcf_file_name: str, pop_file_name: str):
+        """
+        Returns True if reading line by line and by blocks a synthetic file with multiallelic variant calls
+        (written in the provided file) gives the same spectra and the same tally of ALT and called counts,
+        which also depends on how ALT alleles other than the first one are counted
+        """
+
+        multiallelic_vcf_generator = SyntheticVcfGenerator(min(self.synthetic_vcf_generator.variants_cnt, 2000), self.synthetic_vcf_generator.samples_cnt, self.synthetic_vcf_generator.seed,
+                                                           max(self.synthetic_vcf_generator.missing_rate, 0.05), self.synthetic_vcf_generator.phased_rate, 1, multiallelic_rate=0.3)
+        multiallelic_vcf_generator.WriteVcfFile(vcf_file_name)
+
+        sfs_generators = []
+        for block_size in [0, self.block_size]:
+            sfs_generator = SfsGenerator(pop_file_name, scan_projections=True)
+            VcfReader().ReadFile(vcf_file_name, sfs_generator, block_size)
+            sfs_generators.append(sfs_generator)
+
+        return sfs_generators[0].joint_spectrum == sfs_generators[1].joint_spectrum and sfs_generators[0].projection_tally == sfs_generators[1].projection_tally
+
+
+    def GetReadAheadReader(self):
+        """
+        Returns a VCF reader reading files ahead with the read-ahead settings of the benchmark
+        """
+        return VcfReader(read_ahead_chunk_size=self.read_ahead_chunk_size, read_ahead_queue_size=self.read_ahead_queue_size)
+
+
+    @staticmethod
+    def CountLines(vcf_reader: VcfReader, vcf_file_name: str):
+        """
+        Returns the number of lines of the provided file read by the provided VCF reader, without parsing them
+        """
+        return sum(1 for line in vcf_reader.IterateLines(vcf_file_name))
+
+
+    def ComputeSfs(self, vcf_file_name: str, pop_file_name: str, output_file_name: str, block_size: int, vcf_reader: VcfReader = None):
+        """
+        Computes the SFS of the provided file, from reading to output file generation
+        """
+
+        sfs_generator = SfsGenerator(pop_file_name)
+        (vcf_reader if vcf_reader != None else VcfReader()).ReadFile(vcf_file_name, sfs_generator, block_size)
+        sfs_generator.GenerateOutputfile(output_file_name)
+
+
+    def MeasurePeakMemory(self, vcf_file_name: str, pop_file_name: str, output_file_name: str):
+        """
+        Returns the peak memory allocated by the whole SFS computation, in bytes
+        Memory is measured in a separate run since tracing slows down allocations
+        """
+
+        tracemalloc.start()
+        self.ComputeSfs(vcf_file_name, pop_file_name, output_file_name, self.block_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return peak
+
+
+    def Time(self, stage: str, function):
+        """
+        Runs the provided function, records its duration for the provided stage and returns its result
+        """
+
+        start = time.perf_counter()
+        result = function()
+        self.durations[stage] = time.perf_counter() - start
+
+        return result
+
+
+    def GetResults(self, file_size: int, peak_memory: int):
+        """
+        Returns the results of the benchmark as a dictionary
+        """
+
+        variants_cnt = self.synthetic_vcf_generator.variants_cnt
+        genotypes_cnt = variants_cnt * self.synthetic_vcf_generator.samples_cnt
+
+        stages = {}
+        for stage, duration in self.durations.items():
+            stages[stage] = {
+                "seconds": duration,
+                "variants_per_second": variants_cnt / duration if duration > 0 else None,
+                "genotypes_per_second": genotypes_cnt / duration if duration > 0 else None
+            }
+
+        return {
+            "config": {
+                "variants": variants_cnt,
+                "samples": self.synthetic_vcf_generator.samples_cnt,
+                "missing_rate": self.synthetic_vcf_generator.missing_rate,
+                "phased_rate": self.synthetic_vcf_generator.phased_rate,
+                "format_fields": self.synthetic_vcf_generator.format_fields_cnt,
+                "populations": self.populations_cnt,
+                "block_size": self.block_size,
+                "read_ahead_chunk_size": self.read_ahead_chunk_size,
+                "read_ahead_queue_size": self.read_ahead_queue_size,
+                "seed": self.synthetic_vcf_generator.seed,
+                "file_size": file_size
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform()
+            },
+            "stages": stages,
+            "equivalences": dict(self.equivalences),
+            "peak_memory_bytes": peak_memory
+        }
+
+
+    @staticmethod
+    def Compare(results: dict, baseline_results: dict):
+        """
+        Returns the textual comparison of the throughput of each stage with the one of the baseline results
+        """
+
+        lines = []
+        for stage, values in results["stages"].items():
+            baseline_values = baseline_results["stages"].get(stage)
+            if(baseline_values == None or not baseline_values["seconds"] or not values["seconds"]):
+                continue
+            lines.append(stage + ": " + str(round(baseline_values["seconds"] / values["seconds"], 2)) + "x baseline throughput")
+
+        if(baseline_results.get("peak_memory_bytes")):
+            lines.append("peak memory: " + str(round(results["peak_memory_bytes"] / baseline_results["peak_memory_bytes"], 2)) + "x baseline")
+
+        return "\n".join(lines)
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the SFS computation on a synthetic VCF file")
+    parser.add_argument("--variants", type=int, default=20000, help="number of variant calls")
+    parser.add_argument("--samples", type=int, default=200, help="number of individuals")
+    parser.add_argument("--missing-rate", type=float, default=0.05, help="fraction of missing individual calls")
+    parser.add_argument("--phased-rate", type=float, default=0.5, help="fraction of phased individual calls")
+    parser.add_argument("--format-fields", type=int, default=3, help="number of FORMAT subfields of individual calls")
+    parser.add_argument("--populations", type=int, default=2, help="number of populations of the population file")
+    parser.add_argument("--block-size", type=int, default=10000, help="number of variant calls per genotype block")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    parser.add_argument("--line-mode", action="store_true", help="also benchmark the line by line reading")
+    parser.add_argument("--read-ahead", type=int, default=0, help="also benchmark the read-ahead of the file by chunks of this number of characters")
+    parser.add_argument("--read-ahead-queue-size", type=int, default=ReadAheadReader.QUEUE_SIZE, help="number of chunks read ahead")
+    parser.add_argument("--output", help="JSON file in which results are written (default: standard output)")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    arguments = parser.parse_args()
+
+    synthetic_vcf_generator = SyntheticVcfGenerator(arguments.variants, arguments.samples, arguments.seed, arguments.missing_rate, arguments.phased_rate, arguments.format_fields)
+    results = SfsBenchmark(synthetic_vcf_generator, arguments.populations, arguments.block_size, arguments.line_mode, arguments.read_ahead, arguments.read_ahead_queue_size).Run()
+
+    if(arguments.output != None):
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if(arguments.compare != None):
+        with open(arguments.compare, "r") as baseline_file:
+            print(SfsBenchmark.Compare(results, json.load(baseline_file)), file=sys.stderr)
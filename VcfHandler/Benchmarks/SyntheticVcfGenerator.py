@@ -0,0 +1,121 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Generator of synthetic VCF files and population files used by the benchmarks.
+"""
+
+
+import numpy as np
+
+
+class SyntheticVcfGenerator:
+    """
+    Generator of synthetic VCF files and population files used by the benchmarks.
+    """
+
+
+    # Constructor
+
+    def __init__(self, variants_cnt: int, samples_cnt: int, seed: int = 0, missing_rate: float = 0.0, phased_rate: float = 0.0, format_fields_cnt: int = 1, chromosomes_cnt: int = 1, multiallelic_rate: float = 0.0, **kwargs):
+        """
+        Constructor
+        missing_rate: fraction of individual calls written as ./.
+        phased_rate: fraction of individual calls written with the | separator
+        format_fields_cnt: number of FORMAT subfields of each individual call (GT first, then DP-like integer fields)
+        chromosomes_cnt: number of chromosomes on which variant calls are evenly spread
+        multiallelic_rate: fraction of variant calls with a second ALT allele, carried by half of their ALT individual calls
+        """
+
+        self.variants_cnt = variants_cnt
+        self.samples_cnt = samples_cnt
+        self.seed = seed
+        self.missing_rate = missing_rate
+        self.phased_rate = phased_rate
+        self.format_fields_cnt = max(1, format_fields_cnt)
+        self.chromosomes_cnt = max(1, chromosomes_cnt)
+        self.multiallelic_rate = multiallelic_rate
+
+
+
+    # Methods
+
+    def GetSampleName(self, index: int):
+        """
+        Returns the name of the individual at the provided index
+        """
+        return "sample_" + str(index)
+
+
+    def GetChromosomeLength(self):
+        """
+        Returns the length of each chromosome, variant calls being spaced by 100 positions
+        """
+        return 100 * (self.variants_cnt // self.chromosomes_cnt + 1)
+
+
+    def WriteVcfFile(self, file_name: str, block_size: int = 1000):
+        """
+        Writes a VCF file with random genotypes, biallelic unless multiallelic_rate is provided
+        """
+
+        random_generator = np.random.default_rng(self.seed)
+
+        file = open(file_name, "w")
+
+        format_ids = ["GT"] + ["F" + str(i) for i in range(1, self.format_fields_cnt)]
+
+        file.write("##fileformat=VCFv4.2\n")
+        for i in range(0, self.chromosomes_cnt):
+            file.write("##contig=<ID=chr" + str(i + 1) + ",length=" + str(self.GetChromosomeLength()) + ">\n")
+        file.write("##FORMAT=<ID=GT,Number=1,Type=String,Description=\"Genotype\">\n")
+        for format_id in format_ids[1:]:
+            file.write("##FORMAT=<ID=" + format_id + ",Number=1,Type=Integer,Description=\"Synthetic field\">\n")
+        file.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t" + "\t".join(self.GetSampleName(i) for i in range(0, self.samples_cnt)) + "\n")
+
+        format_field = ":".join(format_ids)
+        format_suffix = "".join(":" + str(10 + i) for i in range(1, self.format_fields_cnt))
+        variants_per_chromosome = -(-self.variants_cnt // self.chromosomes_cnt)
+
+        for block_start in range(0, self.variants_cnt, block_size):
+            block_variants_cnt = min(block_size, self.variants_cnt - block_start)
+
+            # each variant call has its own ALT allele frequency
+            frequencies = random_generator.random((block_variants_cnt, 1, 1))
+            alleles = (random_generator.random((block_variants_cnt, self.samples_cnt, 2)) < frequencies).astype(np.int8)
+            # random numbers are only drawn for multiallelic variant calls if there are some, so that biallelic files don't change
+            is_multiallelic = np.zeros((block_variants_cnt, 1, 1), dtype=bool)
+            if(self.multiallelic_rate > 0):
+                is_multiallelic = random_generator.random((block_variants_cnt, 1, 1)) < self.multiallelic_rate
+                alleles[is_multiallelic & (alleles == 1) & (random_generator.random(alleles.shape) < 0.5)] = 2
+
+            is_missing = random_generator.random((block_variants_cnt, self.samples_cnt)) < self.missing_rate
+            is_phased = random_generator.random((block_variants_cnt, self.samples_cnt)) < self.phased_rate
+
+            # textual genotypes: the separator is chosen per individual call, missing calls replace both alleles
+            separators = np.where(is_phased, "|", "/")
+            genotypes = np.char.add(np.char.add(alleles[:, :, 0].astype(str), separators), alleles[:, :, 1].astype(str))
+            genotypes = np.where(is_missing, np.char.add(np.char.add(".", separators), "."), genotypes)
+
+            for i in range(0, block_variants_cnt):
+                variant_index = block_start + i
+                chrom = "chr" + str(variant_index // variants_per_chromosome + 1)
+                pos = str(100 * (variant_index % variants_per_chromosome) + 1)
+                individual_calls = "\t".join(genotype + format_suffix for genotype in genotypes[i].tolist())
+                alt = "G,T" if is_multiallelic[i, 0, 0] else "G"
+                file.write(chrom + "\t" + pos + "\t.\tA\t" + alt + "\t50\tPASS\t.\t" + format_field + "\t" + individual_calls + "\n")
+
+        file.close()
+
+
+    def WritePopFile(self, file_name: str, populations_cnt: int = 2):
+        """
+        Writes a population file assigning the individuals to the populations in a round robin fashion
+        """
+
+        file = open(file_name, "w")
+
+        for i in range(0, self.samples_cnt):
+            file.write(self.GetSampleName(i) + "\tpop" + str(i % populations_cnt) + "\n")
+
+        file.close()
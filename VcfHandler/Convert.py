@@ -0,0 +1,29 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Converts a VCF file into a genotype store, which can then be read by the VcfReader instead of the VCF file.
+Run from the VcfHandler directory with: python Convert.py input.vcf output.gstore
+"""
+
+
+from Instrumentation.Metrics import Metrics
+from Readers.VcfReader import VcfReader
+
+import argparse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts a VCF file into a genotype store")
+    parser.add_argument("vcf_file", help="VCF file to convert, optionally gzip or BGZF-compressed")
+    parser.add_argument("store_file", help="genotype store to write")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="number of variant calls per chunk")
+    parser.add_argument("--read-ahead", type=int, default=0, help="reads the VCF file ahead in a background thread by chunks of this number of characters")
+    parser.add_argument("--metrics", help="JSON file in which stage timers and counters are written at exit")
+    parser.add_argument("--profile", help="file in which the cProfile statistics of the conversion are written")
+    arguments = parser.parse_args()
+
+    if(arguments.metrics != None or arguments.profile != None):
+        Metrics.Enable(arguments.metrics, arguments.profile)
+
+    VcfReader(read_ahead_chunk_size=arguments.read_ahead).ConvertFile(arguments.vcf_file, arguments.store_file, arguments.chunk_size)
@@ -0,0 +1,61 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Filter of the variant calls which aren't biallelic SNPs.
+"""
+
+
+from Filters.GenericFilter import GenericFilter
+
+
+class BiallelicFilter(GenericFilter):
+    """
+    Filter of the variant calls which aren't biallelic SNPs.
+    Variant calls with several ALT alleles or without any ALT allele are rejected.
+    If snps_only is True, variant calls whose REF or ALT allele isn't a single base (indels,
+    symbolic and spanning deletion alleles) are rejected as well.
+    """
+
+
+    # bases accepted as REF and ALT alleles of SNPs
+    BASES = ("A", "C", "G", "T", "a", "c", "g", "t")
+
+
+    # Constructor
+
+    def __init__(self, snps_only: bool = True, **kwargs):
+        """
+        Constructor
+        """
+
+        self.snps_only = snps_only
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def GetFields(self):
+        """
+        Returns the names of the standard fields read by the filter
+        """
+        return ["REF", "ALT"]
+
+
+    def AcceptFixedFields(self, fixed_fields: list):
+        """
+        Returns True if the variant call with the provided standard fields is biallelic
+        """
+
+        ref = fixed_fields[3]
+        alt = fixed_fields[4]
+
+        if(alt == "." or "," in alt):
+            return False
+
+        if(self.snps_only):
+            return ref in self.BASES and alt in self.BASES
+
+        return True
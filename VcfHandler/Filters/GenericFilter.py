@@ -0,0 +1,64 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Interface of a generic filter of variant calls.
+"""
+
+
+from abc import ABC
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+
+import numpy as np
+
+
+class GenericFilter(ABC):
+    """
+    Interface of a generic filter of variant calls.
+    Filters on the standard fields are evaluated on each line before any individual call is decoded,
+    filters on the genotypes are evaluated on whole genotype blocks.
+    """
+
+
+    # Constructor
+
+    def __init__(self, **kwargs):
+        """
+        Constructor
+        """
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def GetFields(self):
+        """
+        Returns the names of the standard fields read by the filter
+        """
+        return []
+
+
+    def AcceptFixedFields(self, fixed_fields: list):
+        """
+        Returns True if the variant call with the provided standard fields
+        (CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO, FORMAT) is accepted
+        """
+        return True
+
+
+    def FilterGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Returns the boolean array of the variant calls of the provided genotype block which are accepted,
+        or None if all of them are accepted
+        """
+        return None
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals needed by the filter,
+        or None if all of them are needed
+        """
+        return np.array([], dtype=np.intp)
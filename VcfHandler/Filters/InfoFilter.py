@@ -0,0 +1,50 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Filter of the variant calls on the keys of their INFO field.
+"""
+
+
+from Filters.GenericFilter import GenericFilter
+
+
+class InfoFilter(GenericFilter):
+    """
+    Filter of the variant calls on the keys of their INFO field.
+    Variant calls are accepted if their INFO field has all the required keys and none of the excluded keys
+    (for instance excluded_keys=["INDEL"]).
+    """
+
+
+    # Constructor
+
+    def __init__(self, required_keys: list = [], excluded_keys: list = [], **kwargs):
+        """
+        Constructor
+        """
+
+        self.required_keys = set(required_keys)
+        self.excluded_keys = set(excluded_keys)
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def GetFields(self):
+        """
+        Returns the names of the standard fields read by the filter
+        """
+        return ["INFO"]
+
+
+    def AcceptFixedFields(self, fixed_fields: list):
+        """
+        Returns True if the INFO field of the variant call with the provided standard fields has the expected keys
+        """
+
+        keys = set(info.split("=", 1)[0] for info in fixed_fields[7].split(";"))
+
+        return self.required_keys <= keys and self.excluded_keys.isdisjoint(keys)
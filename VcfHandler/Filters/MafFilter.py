@@ -0,0 +1,69 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Filter of the variant calls whose minor allele frequency is too low.
+"""
+
+
+from Filters.GenericFilter import GenericFilter
+from Generators.SfsGenerator import SfsGenerator
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+
+import numpy as np
+
+
+class MafFilter(GenericFilter):
+    """
+    Filter of the variant calls whose minor allele frequency is too low.
+    The frequency of the ALT alleles is computed over the called alleles of the individuals
+    of the populations of the SFS generator if provided, of all the individuals decoded otherwise.
+    Variant calls without any called allele are rejected.
+    """
+
+
+    # Constructor
+
+    def __init__(self, min_maf: float, sfs_generator: SfsGenerator = None, **kwargs):
+        """
+        Constructor
+        """
+
+        self.min_maf = min_maf
+        self.sfs_generator = sfs_generator
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def FilterGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Returns the boolean array of the variant calls of the provided genotype block
+        whose minor allele frequency is at least min_maf
+        """
+
+        alleles = genotype_block.GetAlleles()
+        if(self.sfs_generator != None):
+            alleles = alleles[:, genotype_block.GetSamplePositions(self.sfs_generator.GetSampleSelection()), :]
+
+        called_cnt = (alleles != GenotypeBlock.MISSING_ALLELE).sum(axis=(1, 2))
+        alt_cnt = (alleles > 0).sum(axis=(1, 2))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            alt_frequencies = alt_cnt / called_cnt
+
+        return (called_cnt > 0) & (np.minimum(alt_frequencies, 1 - alt_frequencies) >= self.min_maf)
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals of the populations of the SFS generator,
+        or None if all of them are needed
+        """
+
+        if(self.sfs_generator == None):
+            return None
+
+        return self.sfs_generator.GetSampleSelection()
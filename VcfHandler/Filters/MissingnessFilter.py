@@ -0,0 +1,91 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Filter of the variant calls with too many missing individual calls.
+"""
+
+
+from Filters.GenericFilter import GenericFilter
+from Generators.SfsGenerator import SfsGenerator
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+
+import numpy as np
+
+
+class MissingnessFilter(GenericFilter):
+    """
+    Filter of the variant calls with too many missing individual calls.
+    An individual call is missing if any of its alleles is missing (./., 0/., ...).
+    If an SFS generator is provided, the fraction of missing individual calls is computed
+    for each of its populations, with a threshold per population or a single one for all of them,
+    otherwise it is computed over all the individuals decoded.
+    Missing calls are counted as REF alleles by the SFS, so this filter avoids biasing the spectrum.
+    """
+
+
+    # Constructor
+
+    def __init__(self, max_missing_rates, sfs_generator: SfsGenerator = None, **kwargs):
+        """
+        Constructor
+        max_missing_rates: maximal fraction of missing individual calls, single or per population
+        """
+
+        if(isinstance(max_missing_rates, (list, tuple))):
+            if(sfs_generator == None):
+                raise Exception("Missing rates per population require an SFS generator")
+            if(len(max_missing_rates) != sfs_generator.NumberOfPopulations()):
+                raise Exception("Got " + str(len(max_missing_rates)) + " missing rates for " + str(sfs_generator.NumberOfPopulations()) + " populations")
+
+        self.max_missing_rates = max_missing_rates
+        self.sfs_generator = sfs_generator
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def FilterGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Returns the boolean array of the variant calls of the provided genotype block
+        whose fraction of missing individual calls is under the threshold of each population
+        """
+
+        is_missing = (genotype_block.GetAlleles() == GenotypeBlock.MISSING_ALLELE).any(axis=2)
+
+        if(self.sfs_generator == None):
+            return self.AcceptMissingRates(is_missing, self.max_missing_rates)
+
+        is_accepted = np.ones(genotype_block.GetNumberOfVariants(), dtype=bool)
+        for i in range(0, self.sfs_generator.NumberOfPopulations()):
+            positions = genotype_block.GetSamplePositions(self.sfs_generator.population_indices[i])
+            max_missing_rate = self.max_missing_rates[i] if isinstance(self.max_missing_rates, (list, tuple)) else self.max_missing_rates
+            is_accepted &= self.AcceptMissingRates(is_missing[:, positions], max_missing_rate)
+
+        return is_accepted
+
+
+    def AcceptMissingRates(self, is_missing: np.ndarray, max_missing_rate: float):
+        """
+        Returns the boolean array of the variant calls of the provided matrix of missing individual calls
+        of shape (variants, individuals) whose fraction of missing individual calls is under the threshold
+        """
+
+        if(is_missing.shape[1] == 0):
+            return np.ones(is_missing.shape[0], dtype=bool)
+
+        return is_missing.sum(axis=1) <= max_missing_rate * is_missing.shape[1]
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals of the populations of the SFS generator,
+        or None if all of them are needed
+        """
+
+        if(self.sfs_generator == None):
+            return None
+
+        return self.sfs_generator.GetSampleSelection()
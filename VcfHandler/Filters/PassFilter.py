@@ -0,0 +1,46 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Filter of the variant calls which didn't pass the filters of the variant caller.
+"""
+
+
+from Filters.GenericFilter import GenericFilter
+
+
+class PassFilter(GenericFilter):
+    """
+    Filter of the variant calls which didn't pass the filters of the variant caller.
+    Variant calls are accepted if their FILTER field is one of the accepted values,
+    by default "PASS" and "." (filters not applied).
+    """
+
+
+    # Constructor
+
+    def __init__(self, accepted_values: list = ["PASS", "."], **kwargs):
+        """
+        Constructor
+        """
+
+        self.accepted_values = set(accepted_values)
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def GetFields(self):
+        """
+        Returns the names of the standard fields read by the filter
+        """
+        return ["FILTER"]
+
+
+    def AcceptFixedFields(self, fixed_fields: list):
+        """
+        Returns True if the FILTER field of the variant call with the provided standard fields is accepted
+        """
+        return fixed_fields[6] in self.accepted_values
@@ -0,0 +1,51 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Filter of the variant calls whose quality is too low.
+"""
+
+
+from Filters.GenericFilter import GenericFilter
+
+
+class QualFilter(GenericFilter):
+    """
+    Filter of the variant calls whose quality is too low.
+    Variant calls with a QUAL field lower than min_qual are rejected.
+    Variant calls with an unknown quality (".") are rejected unless keep_unknown is True.
+    """
+
+
+    # Constructor
+
+    def __init__(self, min_qual: float, keep_unknown: bool = False, **kwargs):
+        """
+        Constructor
+        """
+
+        self.min_qual = min_qual
+        self.keep_unknown = keep_unknown
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def GetFields(self):
+        """
+        Returns the names of the standard fields read by the filter
+        """
+        return ["QUAL"]
+
+
+    def AcceptFixedFields(self, fixed_fields: list):
+        """
+        Returns True if the quality of the variant call with the provided standard fields is high enough
+        """
+
+        if(fixed_fields[5] == "."):
+            return self.keep_unknown
+
+        return float(fixed_fields[5]) >= self.min_qual
@@ -8,6 +8,8 @@ Interface of a generic file generator from VCF data reader.
 
 from abc import ABC, abstractclassmethod
 from VariantCallSet.VariantCall import VariantCall
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+from VariantCallSet.VariantCallSet import VariantCallSet
 
 
 class GenericGenerator(ABC):
@@ -37,6 +39,33 @@ class GenericGenerator(ABC):
         pass
 
 
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Adds the provided block of variant calls to the file content
+        By default, variant calls of the block are materialized and added one by one
+        """
+
+        for variant_call in genotype_block.GetVariantCalls():
+            self.AddVariantCall(variant_call)
+
+
+    def SetVariantCallSet(self, variant_call_set: VariantCallSet):
+        """
+        Provides the variant call set whose header has just been read, before any of its variant calls
+        Generators can use it to find the columns of the individuals they need from their names
+        """
+        pass
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals needed by the generator,
+        or None if all of them are needed. Individuals which are not selected by any generator
+        aren't decoded by the reader.
+        """
+        return None
+
+
     @abstractclassmethod
     def GenerateOutputfile(self, file_name: str):
         """
@@ -0,0 +1,97 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Generator of the files of a genotype cache entry.
+"""
+
+
+from Generators.GenericGenerator import GenericGenerator
+from VariantCallSet.VariantCall import VariantCall
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+
+import os
+import json
+import numpy as np
+
+
+class GenotypeCacheWriter(GenericGenerator):
+    """
+    Generator of the files of a genotype cache entry.
+    Each genotype block is written as it is read, in its own compressed numpy file,
+    so memory usage doesn't depend on the size of the variant call set.
+    The output file is the description of the entry, written once all the blocks are written.
+    """
+
+
+    # Constructor
+
+    def __init__(self, directory: str, entry_id: str, fingerprint: str, sample_selection: np.ndarray = None, **kwargs):
+        """
+        Constructor
+        The individuals of sample_selection are the ones decoded by the reader, all of them if None
+        """
+
+        # directory in which the block files are written
+        self.directory = directory
+
+        # identifier of the entry in the cache, and fingerprint of the VCF file of the entry
+        self.entry_id = entry_id
+        self.fingerprint = fingerprint
+
+        self.sample_selection = sample_selection
+
+        # names of the block files, in the order of the variant call set
+        self.block_file_names = []
+
+        # total size of the block files, in bytes
+        self.size = 0
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def AddVariantCall(self, variant_call: VariantCall):
+        """
+        Adds the provided vairant call to the file content
+        """
+        raise Exception("Genotype cache entries are only written from genotype blocks")
+
+
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Writes the provided genotype block in the directory of the entry
+        """
+
+        block_file_name = "block_" + str(len(self.block_file_names)) + ".npz"
+        arrays = {
+            "fixed_fields": np.array(genotype_block.GetFixedFields(), dtype=str),
+            "alleles": genotype_block.GetAlleles(),
+            "phased_bits": genotype_block.phased_bits
+        }
+        if(genotype_block.GetSampleIndices() is not None):
+            arrays["sample_indices"] = genotype_block.GetSampleIndices()
+
+        np.savez_compressed(os.path.join(self.directory, block_file_name), **arrays)
+
+        self.block_file_names.append(block_file_name)
+        self.size += os.path.getsize(os.path.join(self.directory, block_file_name))
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals stored in the entry,
+        or None if all of them are stored
+        """
+        return self.sample_selection
+
+
+    def GenerateOutputfile(self, file_name: str):
+        """
+        Writes the description of the entry: its block files and its size
+        """
+
+        with open(file_name, "w") as file:
+            json.dump({"blocks": self.block_file_names, "size": self.size}, file)
@@ -0,0 +1,185 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Generator of columnar binary genotype stores from variant call sets.
+"""
+
+
+from Generators.GenericGenerator import GenericGenerator
+from Instrumentation.Metrics import Metrics
+from VariantCallSet.VariantCall import VariantCall
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+from VariantCallSet.VariantCallSet import VariantCallSet
+
+import os
+import json
+import struct
+import numpy as np
+
+
+class GenotypeStoreGenerator(GenericGenerator):
+    """
+    Generator of columnar binary genotype stores from variant call sets.
+    A store is a VCF file converted once, which can be read many times by the reader
+    without parsing text (see GenotypeStoreReader). Its layout is:
+    1. the MAGIC bytes
+    2. one chunk per genotype block, made of the CHROM, POS, REF, ALT, QUAL, FILTER and INFO columns,
+       the alleles packed on 2 bits (4 alleles, i.e. 2 individuals, per byte) and the packed phasing bitmask
+    3. the index: JSON description of the header, of the standard fields stored and of the columns of each chunk
+    4. the offset of the index (little endian unsigned 64 bits integer) and the MAGIC bytes
+    Allele codes are 0 for REF, 1 for the first ALT, 2 for any other ALT and 3 for a missing call.
+    QUAL is stored as a float column, NaN standing for ".". FILTER and INFO, whose lengths vary a lot,
+    are stored as the concatenated bytes of their values (column FILTER or INFO) and the offset of each value
+    in these bytes, followed by their end (column FILTER_offsets or INFO_offsets).
+    """
+
+
+    # first and last bytes of a genotype store
+    MAGIC = b"VCFGSTO1"
+
+    # 2 bits code of a missing allele, other alleles being capped to 2
+    MISSING_CODE = 3
+
+    # standard fields stored in the chunks, the other ones being read back as "." (FORMAT as "GT")
+    FIELDS = ["CHROM", "POS", "REF", "ALT", "QUAL", "FILTER", "INFO"]
+
+
+    # Constructor
+
+    def __init__(self, file_name: str, **kwargs):
+        """
+        Constructor
+        Chunks are written as genotype blocks are read, in a temporary file which becomes
+        the store once the output file is generated
+        """
+
+        # temporary file in which chunks are written
+        self.temporary_file_name = file_name + ".tmp"
+        self.file = open(self.temporary_file_name, "wb")
+        self.file.write(self.MAGIC)
+
+        # description of each chunk: number of variant calls and offset, dtype and shape of each column
+        self.chunks = []
+
+        # names of the individuals and raw header lines of the variant call set
+        self.sample_names = []
+        self.header_lines = []
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def SetVariantCallSet(self, variant_call_set: VariantCallSet):
+        """
+        Keeps the header of the variant call set, stored in the index of the store
+        """
+
+        self.sample_names = list(variant_call_set.GetSampleNames())
+        self.header_lines = list(variant_call_set.header_lines)
+
+
+    def AddVariantCall(self, variant_call: VariantCall):
+        """
+        Adds the provided vairant call to the file content
+        """
+        raise Exception("Genotype stores are only written from genotype blocks")
+
+
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Writes the provided genotype block as a chunk of the store
+        """
+
+        if(genotype_block.GetSampleIndices() is not None):
+            raise Exception("Genotype stores are written from genotype blocks of all the individuals")
+
+        fixed_fields = genotype_block.GetFixedFields()
+
+        filter_offsets, filter_values = self.PackStrings([fields[6] for fields in fixed_fields])
+        info_offsets, info_values = self.PackStrings([fields[7] for fields in fixed_fields])
+
+        columns = {
+            "CHROM": np.array([fields[0].encode("utf-8") for fields in fixed_fields], dtype=bytes),
+            "POS": np.array([int(fields[1]) for fields in fixed_fields], dtype=np.int64),
+            "REF": np.array([fields[3].encode("utf-8") for fields in fixed_fields], dtype=bytes),
+            "ALT": np.array([fields[4].encode("utf-8") for fields in fixed_fields], dtype=bytes),
+            "QUAL": np.array([self.ParseQuality(fields[5]) for fields in fixed_fields], dtype=np.float64),
+            "FILTER": filter_values,
+            "FILTER_offsets": filter_offsets,
+            "INFO": info_values,
+            "INFO_offsets": info_offsets,
+            "genotypes": self.PackAlleles(genotype_block.GetAlleles()),
+            "phased": genotype_block.phased_bits
+        }
+
+        chunk = {"variants": genotype_block.GetNumberOfVariants(), "samples": genotype_block.GetNumberOfSamples(), "columns": {}}
+        for name, column in columns.items():
+            chunk["columns"][name] = {"offset": self.file.tell(), "dtype": column.dtype.str, "shape": list(column.shape)}
+            self.file.write(np.ascontiguousarray(column).tobytes())
+
+        self.chunks.append(chunk)
+
+
+    @staticmethod
+    def ParseQuality(quality: str):
+        """
+        Returns the value of the provided QUAL field, NaN if it's missing
+        """
+
+        try:
+            return float(quality)
+        except ValueError:
+            return np.nan
+
+
+    @staticmethod
+    def PackStrings(values: list):
+        """
+        Returns the offsets (followed by the end) and the concatenated bytes of the provided strings
+        """
+
+        encoded_values = [value.encode("utf-8") for value in values]
+
+        offsets = np.zeros(len(encoded_values) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded_values], dtype=np.int64)
+
+        return offsets, np.frombuffer(b"".join(encoded_values), dtype=np.uint8)
+
+
+    def PackAlleles(self, alleles: np.ndarray):
+        """
+        Packs the provided allele matrix of shape (variants, samples, 2) on 2 bits per allele,
+        into a matrix of shape (variants, ceil(samples / 2)) of bytes
+        """
+
+        codes = np.minimum(alleles, 2).astype(np.uint8)
+        codes[alleles == GenotypeBlock.MISSING_ALLELE] = self.MISSING_CODE
+
+        # alleles of an odd last individual are padded with missing codes
+        codes = codes.reshape(alleles.shape[0], -1)
+        if(codes.shape[1] % 4 != 0):
+            codes = np.pad(codes, ((0, 0), (0, 4 - codes.shape[1] % 4)), constant_values=self.MISSING_CODE)
+        codes = codes.reshape(alleles.shape[0], -1, 4)
+
+        return (codes[:, :, 0] << 6) | (codes[:, :, 1] << 4) | (codes[:, :, 2] << 2) | codes[:, :, 3]
+
+
+    def GenerateOutputfile(self, file_name: str):
+        """
+        Writes the index of the store and moves it to the provided file name
+        """
+
+        Metrics.Log("Generating genotype store " + file_name + "...")
+
+        index = {"sample_names": self.sample_names, "header_lines": self.header_lines, "fields": self.FIELDS, "chunks": self.chunks}
+
+        index_offset = self.file.tell()
+        self.file.write(json.dumps(index).encode("utf-8"))
+        self.file.write(struct.pack("<Q", index_offset))
+        self.file.write(self.MAGIC)
+        self.file.close()
+
+        os.replace(self.temporary_file_name, file_name)
@@ -0,0 +1,255 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Generator of population genetics summary statistics per genomic window from variant call sets.
+"""
+
+
+from Generators.GenericGenerator import GenericGenerator
+from Generators.SfsGenerator import SfsGenerator
+from Generators.WindowIndex import WindowIndex
+from Instrumentation.Metrics import Metrics
+from VariantCallSet.VariantCall import VariantCall
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+from VariantCallSet.VariantCallSet import VariantCallSet
+
+import math
+import numpy as np
+
+
+class PopGenStatsGenerator(GenericGenerator):
+    """
+    Generator of population genetics summary statistics per genomic window from variant call sets.
+    Statistics are computed for each population of the provided SFS generator, from the ALT and called
+    allele counts of each variant call (shared with the other consumers of the genotype blocks):
+    - nucleotide diversity pi: sum over the variant calls of 2k(n - k) / (n(n - 1)), k being the ALT count
+      and n the called count of the population
+    - Watterson's theta: sum over the segregating variant calls of 1 / a(n), a(n) = 1 + 1/2 + ... + 1/(n - 1),
+      so that variant calls with missing individual calls are taken into account
+    - Tajima's D, from pi and the number of segregating variant calls, with the sample size
+      being the mean called count of the segregating variant calls
+    - Hudson's F_ST of each pair of populations, as a ratio of averages (Bhatia et al., 2013)
+    Statistics are running sums per window, updated with whole genotype blocks, and are not divided
+    by the length of the windows.
+    """
+
+
+    # Constructor
+
+    def __init__(self, sfs_generator: SfsGenerator, window_index: WindowIndex = None, **kwargs):
+        """
+        Constructor
+        Populations are the ones of the provided SFS generator, which doesn't need to be fed with the variant calls
+        If no window index is provided, statistics are computed per chromosome
+        """
+
+        self.sfs_generator = sfs_generator
+
+        self.window_index = window_index if window_index != None else WindowIndex()
+
+        # pairs of populations for which F_ST is computed
+        self.population_pairs = [(i, j) for i in range(0, self.sfs_generator.NumberOfPopulations()) for j in range(i + 1, self.sfs_generator.NumberOfPopulations())]
+
+        # running sums of each window, of shape (windows, sums): number of variant calls, then for each population
+        # sums of pi, of theta and of the called counts of segregating variant calls and number of segregating variant calls,
+        # then for each pair of populations numerator and denominator of F_ST
+        self.sums = np.zeros((0, self.GetNumberOfSums()), dtype=np.float64)
+
+        return super().__init__(**kwargs)
+
+
+
+    # Getters
+
+    def GetNumberOfSums(self):
+        """
+        Returns the number of running sums of each window
+        """
+        return 1 + 4 * self.sfs_generator.NumberOfPopulations() + 2 * len(self.population_pairs)
+
+
+
+    # Methods
+
+    def SetVariantCallSet(self, variant_call_set: VariantCallSet):
+        """
+        Matches the individuals of the populations with the individuals of the variant call set by name
+        """
+        self.sfs_generator.SetVariantCallSet(variant_call_set)
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals of all the populations
+        """
+        return self.sfs_generator.GetSampleSelection()
+
+
+    def InitializeSpectra(self):
+        """
+        Resets the running sums of the windows
+        """
+        self.sums = np.zeros((0, self.GetNumberOfSums()), dtype=np.float64)
+
+
+    def AddVariantCall(self, variant_call: VariantCall):
+        """
+        Adds the provided vairant call to the file content
+        """
+        self.AddGenotypeBlock(GenotypeBlock.FromVariantCall(variant_call))
+
+
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Adds the provided block of variant calls to the running sums of their windows
+        The contribution of each variant call to each sum is computed for the whole block at once
+        """
+
+        fixed_fields = genotype_block.GetFixedFields()
+        window_ids = self.window_index.GetWindowIds([fields[0] for fields in fixed_fields], np.array([int(fields[1]) for fields in fixed_fields], dtype=np.int64))
+
+        contributions = np.zeros((genotype_block.GetNumberOfVariants(), self.GetNumberOfSums()), dtype=np.float64)
+        contributions[:, 0] = 1
+
+        alt_frequencies = []
+        called_counts = []
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(0, self.sfs_generator.NumberOfPopulations()):
+                alt_cnt = genotype_block.GetAltCounts(self.sfs_generator.population_indices[i])
+                called_cnt = genotype_block.GetCalledCounts(self.sfs_generator.population_indices[i])
+                is_segregating = (alt_cnt > 0) & (alt_cnt < called_cnt)
+
+                harmonic_numbers = self.GetHarmonicNumbers(int(called_cnt.max()) if len(called_cnt) > 0 else 0)
+
+                column = 1 + 4 * i
+                contributions[:, column] = np.where(called_cnt >= 2, 2.0 * alt_cnt * (called_cnt - alt_cnt) / (called_cnt * (called_cnt - 1.0)), 0.0)
+                contributions[:, column + 1] = np.where(is_segregating, 1.0 / harmonic_numbers[called_cnt], 0.0)
+                contributions[:, column + 2] = np.where(is_segregating, called_cnt, 0)
+                contributions[:, column + 3] = is_segregating
+
+                alt_frequencies.append(alt_cnt / called_cnt)
+                called_counts.append(called_cnt)
+
+            for pair_index, (i, j) in enumerate(self.population_pairs):
+                p_i, p_j = alt_frequencies[i], alt_frequencies[j]
+                is_valid = (called_counts[i] >= 2) & (called_counts[j] >= 2)
+
+                column = 1 + 4 * self.sfs_generator.NumberOfPopulations() + 2 * pair_index
+                contributions[:, column] = np.where(is_valid, (p_i - p_j) ** 2 - p_i * (1 - p_i) / (called_counts[i] - 1) - p_j * (1 - p_j) / (called_counts[j] - 1), 0.0)
+                contributions[:, column + 1] = np.where(is_valid, p_i * (1 - p_j) + p_j * (1 - p_i), 0.0)
+
+        # running sums grow with the windows met
+        if(len(self.sums) < self.window_index.GetNumberOfWindows()):
+            self.sums = np.concatenate((self.sums, np.zeros((self.window_index.GetNumberOfWindows() - len(self.sums), self.GetNumberOfSums()))))
+
+        is_in_window = window_ids != -1
+        np.add.at(self.sums, window_ids[is_in_window], contributions[is_in_window])
+
+
+    @staticmethod
+    def GetHarmonicNumbers(max_called_cnt: int):
+        """
+        Returns the array of a(n) = 1 + 1/2 + ... + 1/(n - 1) for n from 0 to max_called_cnt, a(0) and a(1) being 0
+        """
+        return np.concatenate(([0.0, 0.0], np.cumsum(1.0 / np.arange(1, max_called_cnt))))
+
+
+    @staticmethod
+    def ComputeTajimaD(pi: float, segregating_cnt: float, chromosomes_cnt: int):
+        """
+        Returns Tajima's D of the provided sum of pi and number of segregating sites for the provided sample size,
+        None if it's undefined
+        """
+
+        if(segregating_cnt == 0 or chromosomes_cnt < 3):
+            return None
+
+        n = chromosomes_cnt
+        a1 = sum(1.0 / i for i in range(1, n))
+        a2 = sum(1.0 / i ** 2 for i in range(1, n))
+        b1 = (n + 1) / (3.0 * (n - 1))
+        b2 = 2.0 * (n ** 2 + n + 3) / (9.0 * n * (n - 1))
+        c1 = b1 - 1.0 / a1
+        c2 = b2 - (n + 2) / (a1 * n) + a2 / a1 ** 2
+        e1 = c1 / a1
+        e2 = c2 / (a1 ** 2 + a2)
+
+        return (pi - segregating_cnt / a1) / math.sqrt(e1 * segregating_cnt + e2 * segregating_cnt * (segregating_cnt - 1))
+
+
+    def GetStatistics(self, window_id: int):
+        """
+        Returns the statistics of the provided window: number of variant calls, then per population
+        pi, Watterson's theta, Tajima's D and number of segregating sites, then per pair of populations F_ST
+        Undefined statistics are None
+        """
+
+        sums = self.sums[window_id]
+        statistics = [int(sums[0])]
+
+        for i in range(0, self.sfs_generator.NumberOfPopulations()):
+            pi, theta, called_sum, segregating_cnt = sums[1 + 4 * i:5 + 4 * i]
+            chromosomes_cnt = int(round(called_sum / segregating_cnt)) if segregating_cnt > 0 else 0
+            statistics += [pi, theta, self.ComputeTajimaD(pi, segregating_cnt, chromosomes_cnt), int(segregating_cnt)]
+
+        for pair_index in range(0, len(self.population_pairs)):
+            numerator, denominator = sums[1 + 4 * self.sfs_generator.NumberOfPopulations() + 2 * pair_index:3 + 4 * self.sfs_generator.NumberOfPopulations() + 2 * pair_index]
+            statistics.append(numerator / denominator if denominator > 0 else None)
+
+        return statistics
+
+
+    def GetPartialSpectrum(self):
+        """
+        Returns the running sums of each window, per window (chromosome, start, end), which can be merged
+        with the sums of generators that read other parts of the variant call set
+        """
+
+        windows = self.window_index.GetWindows()
+
+        return {windows[window_id]: self.sums[window_id] for window_id in range(0, len(self.sums)) if self.sums[window_id, 0] > 0}
+
+
+    def MergePartialSpectrum(self, partial_spectrum: dict):
+        """
+        Adds the running sums of the provided partial state to the running sums of the generator
+        """
+
+        for window, sums in partial_spectrum.items():
+            window_id = self.window_index.RegisterWindow(window)
+            if(len(self.sums) <= window_id):
+                self.sums = np.concatenate((self.sums, np.zeros((window_id + 1 - len(self.sums), self.GetNumberOfSums()))))
+            self.sums[window_id] += sums
+
+
+    def GenerateOutputfile(self, file_name: str):
+        """
+        Generates the TSV file of the statistics of each window having variant calls (suffixed with '_stats.tsv')
+        """
+
+        population_names = self.sfs_generator.population_names
+        columns = ["chromosome", "start", "end", "variants"]
+        for population_name in population_names:
+            columns += ["pi_" + population_name, "theta_w_" + population_name, "tajima_d_" + population_name, "segregating_" + population_name]
+        for i, j in self.population_pairs:
+            columns.append("fst_" + population_names[i] + "_" + population_names[j])
+
+        Metrics.Log("Generating output file in stats format...")
+
+        with Metrics.Stage("write"):
+            file = open(file_name + "_stats.tsv", "w", buffering=1024 * 1024)
+            file.write("\t".join(columns) + "\n")
+
+            windows = self.window_index.GetWindows()
+            for window_id in range(0, len(self.sums)):
+                if(self.sums[window_id, 0] == 0):
+                    continue
+                chromosome, start, end = windows[window_id]
+                values = [chromosome, "." if start == None else str(start), "." if end == None else str(end)]
+                values += ["NA" if statistic == None else str(statistic) if isinstance(statistic, int) else str(round(float(statistic), 6)) for statistic in self.GetStatistics(window_id)]
+                file.write("\t".join(values) + "\n")
+
+            file.close()
+
+        Metrics.Log("Done.")
@@ -7,13 +7,20 @@ Generator of SFS files from variant call sets.
 
 
 from Generators.GenericGenerator import GenericGenerator
+from Generators.SfsPartialSpectrum import SfsPartialSpectrum
+from Generators.SfsProjection import SfsProjection
+from Generators.WindowIndex import WindowIndex
+from Instrumentation.Metrics import Metrics
 from VariantCallSet.VariantCall import VariantCall
 from VariantCallSet.IndividualCallValue import IndividualCallValue, Genotype
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+from VariantCallSet.VariantCallSet import VariantCallSet
 
-from datetime import datetime
-
+import os
 import re
+import copy
 import math
+import numpy as np
 
 
 class SfsGenerator(GenericGenerator):
@@ -24,33 +31,84 @@ class SfsGenerator(GenericGenerator):
 
     # Constructor
 
-    def __init__(self, config_file_name: str, enable_debug: bool = False, **kwargs):
+    def __init__(self, config_file_name: str, enable_debug: bool = False, generate_full_spectrum: bool = False, projection: list = None, scan_projections: bool = False, window_index: WindowIndex = None, bootstrap_replicates: int = 0, bootstrap_seed: int = None, **kwargs):
         """
         Constructor
+        If generate_full_spectrum is True, the multidimensional spectrum of all the populations
+        is generated in addition to the one population and pairwise joint spectra
+        If projection is provided (number of chromosomes of each population), the spectra are projected
+        to these sample sizes, so that variant calls with missing individual calls are taken into account
+        If scan_projections is True, the number of segregating sites of each population is computed
+        for every possible projection, and written with the output files
+        If window_index is provided, spectra are also tallied per genomic window in the same pass,
+        and the spectrum of each population in each window is written with the output files
+        If bootstrap_replicates is provided, the output files of this number of block-bootstrap replicates,
+        whose blocks are the windows, are also generated, bootstrap_seed being the seed of the random generator
         """
 
+        if(bootstrap_replicates > 0 and window_index == None):
+            raise Exception("Bootstrap replicates are computed from the spectra of windows, a window index must be provided")
+
         self.config_file_name = config_file_name
 
+        # names of the individuals of the config file, and name of the population of each of them
+        self.individual_names = []
+        self.individual_populations = []
+
         # names of all the populations in the variant call set
         self.population_names = []
 
-        # indices of individuals of the population 1 in the variant call set
-        self.population_1_indices = []
+        # indices of the individuals of each population in the variant call set
+        self.population_indices = []
+
+        # sorted indices of the individuals of all the populations, which are the only ones to be decoded
+        self.sample_selection = None
 
-        # indices of individuals of the population 2 in the variant call set
-        self.population_2_indices = []
+        # population of each individual of the variant call set: index of its population, -1 if not taken into account
+        self.population_labels = []
 
-        # spectrum for the population 1, will be initialized after config parsing
-        self.population_1_spectrum = []
+        # dimensions of the joint spectrum of all the populations, will be initialized after config parsing
+        self.spectrum_dimensions = ()
 
-        # spectrum for the population 2, will be initialized after config parsing
-        self.population_2_spectrum = []
+        # multipliers used to pack the ALT counts of all the populations of a variant call into a single integer key
+        self.spectrum_strides = np.array([], dtype=np.int64)
 
-        # joint spectrum of both populations: a two-dimensional matrix that will be initialized after config parsing
-        self.two_populations_spectrum = []
+        # sparse joint spectrum of all the populations: number of variant calls per packed key of ALT counts
+        # one population and pairwise spectra are computed from it at output time
+        self.joint_spectrum = {}
 
         self.enable_debug = enable_debug
 
+        self.generate_full_spectrum = generate_full_spectrum
+
+        # number of chromosomes of each population in the projected spectra, None if spectra aren't projected
+        self.projection = None if projection == None else list(projection)
+
+        self.scan_projections = scan_projections
+
+        # dimensions of the ALT counts, and of the called chromosomes counts, of all the populations in the tally,
+        # which is only kept if spectra are projected or projections are scanned
+        self.tally_dimensions = ()
+
+        # multipliers used to pack the ALT counts, and separately the called counts, of all the populations of a variant call into integer keys
+        self.tally_strides = np.array([], dtype=np.int64)
+
+        # sparse tally: number of variant calls per pair of packed keys of ALT counts and of called counts
+        self.projection_tally = {}
+
+        # projected joint spectrum of all the populations, computed from the tally when needed
+        self.projected_spectrum = None
+
+        # index of the genomic windows in which spectra are also tallied, None if they aren't
+        self.window_index = window_index
+
+        # sparse spectrum of each window having variant calls, per window identifier: number of variant calls
+        # per key of the joint spectrum (of the tally if spectra are projected)
+        self.window_spectra = {}
+
+        self.bootstrap_replicates = bootstrap_replicates
+        self.bootstrap_seed = bootstrap_seed
+
         self.ReadConfig()
 
         self.InitializeSpectra()
@@ -70,14 +128,14 @@ class SfsGenerator(GenericGenerator):
         2. population id
         If population id is "N/A", the corresponding individual is not taken
         into account for the computation of the SFS file.
+        Until the header of the variant call set is read, lines are assumed to be
+        in the same order as the columns of the individuals in the variant call set.
         """
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Reading SFS config...")
+        Metrics.Log("Reading SFS config...")
 
         file = open(self.config_file_name, "r")
 
-        index = 0
-
         for line in file:
             line_parts = re.split(r'\t+', line.replace("\n", ""))
             if(len(line_parts) < 2):
@@ -86,25 +144,62 @@ class SfsGenerator(GenericGenerator):
             individual_name = line_parts[0]
             population_name = line_parts[1]
 
-            if(population_name != "N/A"):
-                if(not population_name in self.population_names):
-                    if(self.NumberOfPopulations() == 2):
-                        raise Exception("Only two populations can be handled for the moment for SFS file generation")
-                    self.population_names.append(population_name)
+            self.individual_names.append(individual_name)
+            self.individual_populations.append(population_name)
 
-                if(self.population_names.index(population_name) == 0):  # this is the first population
-                    self.population_1_indices.append(index)
-                else:
-                    self.population_2_indices.append(index)
-
-            index += 1
+            if(population_name != "N/A" and not population_name in self.population_names):
+                self.population_names.append(population_name)
 
         file.close()
 
+        self.AssignColumns(list(range(0, len(self.individual_names))))
+
+        Metrics.Log("Done.")
+
+
+
+    def AssignColumns(self, columns: list):
+        """
+        Computes the indices of the individuals of each population from the provided
+        column of each individual of the config file in the variant call set
+        """
+
+        population_indices = [[] for population_name in self.population_names]
+        self.population_labels = [-1] * (max(columns) + 1 if len(columns) > 0 else 0)
+
+        for column, population_name in zip(columns, self.individual_populations):
+            if(population_name != "N/A"):
+                population_indices[self.population_names.index(population_name)].append(column)
+                self.population_labels[column] = self.population_names.index(population_name)
+
+        # index arrays are used to select the individuals of each population in genotype blocks
+        self.population_indices = [np.array(sorted(indices), dtype=np.intp) for indices in population_indices]
+        self.sample_selection = np.array([i for i in range(0, len(self.population_labels)) if self.population_labels[i] != -1], dtype=np.intp)
+
         if(self.enable_debug):
-            print("Config file read. Found " + str(len(self.population_names)) + " populations. Pop 1 indices: [" + str(self.population_1_indices).strip('[]') + "], pop 2 indices: [" + str(self.population_2_indices).strip('[]') + "]");
+            print("Config file read. Found " + str(len(self.population_names)) + " populations. " + ", ".join("Pop " + str(i + 1) + " indices: [" + str(self.population_indices[i].tolist()).strip('[]') + "]" for i in range(0, self.NumberOfPopulations())))
+
+
+
+    def SetVariantCallSet(self, variant_call_set: VariantCallSet):
+        """
+        Matches the individuals of the config file with the individuals of the variant call set by name
+        If none of the names of the config file is in the variant call set, individuals are matched by order
+        """
+
+        if(len(variant_call_set.GetSampleNames()) == 0):
+            return
+
+        columns = [variant_call_set.GetSampleColumn(individual_name) for individual_name in self.individual_names]
+        missing_names = [self.individual_names[i] for i in range(0, len(columns)) if columns[i] == None and self.individual_populations[i] != "N/A"]
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Done.")
+        if(all(column == None for column in columns)):
+            print("None of the individuals of the config file is in the variant call set, individuals are matched by order")
+            return
+        if(len(missing_names) > 0):
+            raise Exception("Individuals of the config file not found in the variant call set: " + ", ".join(missing_names))
+
+        self.AssignColumns([column if column != None else -1 for column in columns])
 
 
 
@@ -115,21 +210,59 @@ class SfsGenerator(GenericGenerator):
         return len(self.population_names)
 
 
+    def GetChromosomesCount(self, population_index: int):
+        """
+        Returns the number of chromosomes of the provided population, individuals being diploid
+        """
+        return 2 * len(self.population_indices[population_index])
+
+
 
     def InitializeSpectra(self):
         """
         Initializes the spectra of the populations with 0 after config reading
-        Each spectrum contains the number of elements equal to 
+        Each population dimension of the joint spectrum contains the number of elements equal to
         2 * its population size (since individuals are diploid) + 1 (for nocalls)
-        Dimensions of two populations spectrum correspond to the dimensions of each spectrum
         """
 
-        self.population_1_spectrum = [0] * (1 + 2*len(self.population_1_indices))
-        if(self.NumberOfPopulations() > 1):
-            self.population_2_spectrum = [0] * (1 + 2*len(self.population_2_indices))
-            self.two_populations_spectrum = [0] * len(self.population_1_spectrum)
-            for i in range (0, len(self.population_1_spectrum)):
-                self.two_populations_spectrum[i] = [0] * len(self.population_2_spectrum)
+        self.spectrum_dimensions = tuple(1 + 2*len(population_indices) for population_indices in self.population_indices)
+
+        if(self.projection != None):
+            if(len(self.projection) != self.NumberOfPopulations()):
+                raise Exception("Projection must give the number of chromosomes of each of the " + str(self.NumberOfPopulations()) + " populations")
+            if(any(self.projection[i] > self.spectrum_dimensions[i] - 1 for i in range(0, self.NumberOfPopulations()))):
+                raise Exception("Projection can't exceed the number of chromosomes of the populations")
+            self.spectrum_dimensions = tuple(1 + chromosomes_cnt for chromosomes_cnt in self.projection)
+
+        if(math.prod(self.spectrum_dimensions) >= 2**63):
+            raise Exception("The joint spectrum of " + str(self.NumberOfPopulations()) + " populations is too large to be indexed")
+
+        # the ALT count of the last population varies fastest in the packed key, as in a C-ordered array
+        self.spectrum_strides = np.array([math.prod(self.spectrum_dimensions[i + 1:]) for i in range(0, self.NumberOfPopulations())], dtype=np.int64)
+
+        self.joint_spectrum = {}
+
+        # ALT counts and called counts are packed in two keys, as the ALT counts of the joint spectrum before projection,
+        # so that the tally can be indexed as long as the unprojected joint spectrum can
+        if(self.IsTallyKept()):
+            self.tally_dimensions = tuple(1 + 2*len(population_indices) for population_indices in self.population_indices)
+            if(math.prod(self.tally_dimensions) >= 2**63):
+                raise Exception("The tally of called chromosomes of " + str(self.NumberOfPopulations()) + " populations is too large to be indexed")
+            self.tally_strides = np.array([math.prod(self.tally_dimensions[i + 1:]) for i in range(0, self.NumberOfPopulations())], dtype=np.int64)
+
+        self.projection_tally = {}
+        self.projected_spectrum = None
+
+        self.window_spectra = {}
+
+
+
+    def IsTallyKept(self):
+        """
+        Returns True if the ALT and called counts of the variant calls are kept for the projection
+        """
+        return self.projection != None or self.scan_projections
+
 
 
 
@@ -138,37 +271,361 @@ class SfsGenerator(GenericGenerator):
         Adds the provided vairant call to the file content
         """
 
-        pop_1_alt_cnt = 0
-        pop_2_alt_cnt = 0
+        alt_cnt = [0] * self.NumberOfPopulations()
+        called_cnt = [0] * self.NumberOfPopulations()
 
-        i = 0
-        while i < len(variant_call.GetIndividualCalls()):
-            individual_call_value = variant_call.GetIndividualCalls()[i]
+        for population_index, individual_call_value in zip(self.population_labels, variant_call.GetIndividualCalls()):
+            if(population_index != -1):
+                if(individual_call_value.GetGenotype0() == Genotype.ALT):
+                    alt_cnt[population_index] += 1
+                if(individual_call_value.GetGenotype1() == Genotype.ALT):
+                    alt_cnt[population_index] += 1
+                if(individual_call_value.GetGenotype0() != Genotype.UNKNOWN):
+                    called_cnt[population_index] += 1
+                if(individual_call_value.GetGenotype1() != Genotype.UNKNOWN):
+                    called_cnt[population_index] += 1
+
+        if(self.enable_debug):
+            print("INDICES ARE: " + ", ".join(str(i + 1) + "_alt: " + str(alt_cnt[i]) for i in range(0, len(alt_cnt))))
 
-            if(individual_call_value.GetGenotype0() == Genotype.ALT):
-                if(i in self.population_1_indices):
-                    pop_1_alt_cnt += 1
-                elif(self.NumberOfPopulations() > 1 and i in self.population_2_indices):
-                    pop_2_alt_cnt +=1
+        if(self.IsTallyKept()):
+            tally_key = (sum(alt_cnt[i] * int(self.tally_strides[i]) for i in range(0, len(alt_cnt))), sum(called_cnt[i] * int(self.tally_strides[i]) for i in range(0, len(called_cnt))))
+            self.projection_tally[tally_key] = self.projection_tally.get(tally_key, 0) + 1
+            self.projected_spectrum = None
 
-            if(individual_call_value.GetGenotype1() == Genotype.ALT):
-                if(i in self.population_1_indices):
-                    pop_1_alt_cnt += 1
-                elif(self.NumberOfPopulations() > 1 and i in self.population_2_indices):
-                    pop_2_alt_cnt +=1
+        if(self.projection == None):
+            key = sum(alt_cnt[i] * int(self.spectrum_strides[i]) for i in range(0, len(alt_cnt)))
+            self.joint_spectrum[key] = self.joint_spectrum.get(key, 0) + 1
 
-            i+=1
+        if(self.window_index != None):
+            window_ids = self.window_index.GetWindowIds([variant_call.GetChromosome()], np.array([int(variant_call.GetPosition())], dtype=np.int64))
+            self.AddWindowKeys(window_ids, np.array([tally_key if self.projection != None else key], dtype=np.int64))
 
         if(self.enable_debug):
-            print("INDICES ARE: 1_alt: " + str(pop_1_alt_cnt) + ", 2_alt: " + str(pop_2_alt_cnt))
+            print("Variant call added. Spectrums: " + self.SpectraToString())
+
+
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Adds the provided block of variant calls to the file content
+        ALT counts of each population are computed for the whole block at once (and shared with the other
+        consumers of the block), packed into keys and the joint spectrum is updated with a histogram of these keys
+        """
+
+        if(self.IsTallyKept()):
+            # one row per variant call: packed key of the ALT counts, packed key of the called counts
+            tally_keys = np.zeros((genotype_block.GetNumberOfVariants(), 2), dtype=np.int64)
+            for i in range(0, self.NumberOfPopulations()):
+                tally_keys[:, 0] += genotype_block.GetAltCounts(self.population_indices[i]) * self.tally_strides[i]
+                tally_keys[:, 1] += genotype_block.GetCalledCounts(self.population_indices[i]) * self.tally_strides[i]
+            self.AddKeys(tally_keys, self.projection_tally)
+            self.projected_spectrum = None
+
+        if(self.projection == None):
+            keys = np.zeros(genotype_block.GetNumberOfVariants(), dtype=np.int64)
+            for i in range(0, self.NumberOfPopulations()):
+                keys += genotype_block.GetAltCounts(self.population_indices[i]) * self.spectrum_strides[i]
+
+            self.AddKeys(keys)
+
+        if(self.window_index != None):
+            fixed_fields = genotype_block.GetFixedFields()
+            window_ids = self.window_index.GetWindowIds([fields[0] for fields in fixed_fields], np.array([int(fields[1]) for fields in fixed_fields], dtype=np.int64))
+            self.AddWindowKeys(window_ids, tally_keys if self.projection != None else keys)
 
-        self.population_1_spectrum[pop_1_alt_cnt] += 1
-        if(self.NumberOfPopulations() > 1):
-            self.population_2_spectrum[pop_2_alt_cnt] += 1
-            self.two_populations_spectrum[pop_1_alt_cnt][pop_2_alt_cnt] += 1
-        
         if(self.enable_debug):
-            print("Variant call added. Spectrums: pop1: [" + str(self.population_1_spectrum).strip('[]') + "], pop2: [" + str(self.population_2_spectrum).strip('[]') + "]")
+            print("Genotype block of " + str(genotype_block.GetNumberOfVariants()) + " variant calls added. Spectrums: " + self.SpectraToString())
+
+
+    def AddKeys(self, keys: np.ndarray, spectrum: dict = None):
+        """
+        Adds the provided packed keys to the provided sparse spectrum, the joint spectrum by default
+        Keys made of several packed keys (rows of a two-dimensional array) are added as tuples
+        """
+
+        if(spectrum == None):
+            spectrum = self.joint_spectrum
+
+        if(keys.ndim > 1):
+            unique_keys, counts = np.unique(keys, axis=0, return_counts=True)
+            unique_keys = [tuple(key) for key in unique_keys.tolist()]
+        else:
+            unique_keys, counts = np.unique(keys, return_counts=True)
+            unique_keys = unique_keys.tolist()
+
+        for key, count in zip(unique_keys, counts.tolist()):
+            spectrum[key] = spectrum.get(key, 0) + count
+
+
+    def AddWindowKeys(self, window_ids: np.ndarray, keys: np.ndarray):
+        """
+        Adds the provided packed keys to the sparse spectra of the provided windows,
+        ignoring the variant calls which are out of any window (window identifier -1)
+        Keys made of several packed keys (rows of a two-dimensional array) are added as tuples
+        """
+
+        is_in_window = window_ids != -1
+        window_keys, counts = np.unique(np.column_stack((window_ids[is_in_window], keys[is_in_window])), axis=0, return_counts=True)
+        for window_key, count in zip(window_keys.tolist(), counts.tolist()):
+            window_id, key = window_key[0], (window_key[1] if keys.ndim == 1 else tuple(window_key[1:]))
+            window_spectrum = self.window_spectra.setdefault(window_id, {})
+            window_spectrum[key] = window_spectrum.get(key, 0) + count
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals of all the populations
+        """
+        return self.sample_selection
+
+
+    def UnpackJointSpectrum(self):
+        """
+        Returns the ALT counts of each population (array of shape (populations, keys)) and the number
+        of variant calls of each key of the sparse joint spectrum
+        """
+
+        keys = np.fromiter(self.joint_spectrum.keys(), dtype=np.int64, count=len(self.joint_spectrum))
+        counts = np.fromiter(self.joint_spectrum.values(), dtype=np.int64, count=len(self.joint_spectrum))
+
+        return np.array(np.unravel_index(keys, self.spectrum_dimensions)).reshape(self.NumberOfPopulations(), len(keys)), counts
+
+
+    def UnpackProjectionTally(self):
+        """
+        Returns the ALT counts and the called counts of each population (arrays of shape (populations, keys))
+        and the number of variant calls of each key of the sparse tally
+        """
+
+        keys = np.array(list(self.projection_tally.keys()), dtype=np.int64).reshape(len(self.projection_tally), 2)
+        counts = np.fromiter(self.projection_tally.values(), dtype=np.int64, count=len(self.projection_tally))
+
+        alt_counts = np.array(np.unravel_index(keys[:, 0], self.tally_dimensions)).reshape(self.NumberOfPopulations(), len(keys))
+        called_counts = np.array(np.unravel_index(keys[:, 1], self.tally_dimensions)).reshape(self.NumberOfPopulations(), len(keys))
+
+        return alt_counts, called_counts, counts
+
+
+    def GetProjectedSpectrum(self):
+        """
+        Returns the dense projected joint spectrum of all the populations
+        Keys of the tally are projected by batches: the contribution of a batch is the sum over its keys
+        of the outer product of the projection weights of each population, weighted by the count of the key
+        """
+
+        if(self.projected_spectrum is not None):
+            return self.projected_spectrum
+
+        alt_counts, called_counts, counts = self.UnpackProjectionTally()
+
+        projections = [SfsProjection(self.GetChromosomesCount(i), self.projection[i]) for i in range(0, self.NumberOfPopulations())]
+
+        # einsum subscripts: "k,ka,kb->ab" for two populations
+        letters = [chr(ord("a") + i) for i in range(0, self.NumberOfPopulations())]
+        subscripts = "z," + ",".join("z" + letter for letter in letters) + "->" + "".join(letters)
+
+        # batches are sized so that the intermediate products stay around 16 million values
+        batch_size = max(1, 2**24 // math.prod(self.spectrum_dimensions))
+
+        projected_spectrum = np.zeros(self.spectrum_dimensions, dtype=np.float64)
+        for start in range(0, len(counts), batch_size):
+            end = start + batch_size
+            weights = [projections[i].GetWeights(alt_counts[i, start:end], called_counts[i, start:end]) for i in range(0, self.NumberOfPopulations())]
+            projected_spectrum += np.einsum(subscripts, counts[start:end].astype(np.float64), *weights, optimize=True)
+
+        self.projected_spectrum = projected_spectrum
+
+        return projected_spectrum
+
+
+    def GetOnePopulationSpectrum(self, population_index: int):
+        """
+        Returns the dense spectrum of the provided population
+        """
+
+        if(self.projection != None):
+            return self.GetProjectedSpectrum().sum(axis=tuple(i for i in range(0, self.NumberOfPopulations()) if i != population_index))
+
+        alt_counts, counts = self.UnpackJointSpectrum()
+
+        return np.bincount(alt_counts[population_index], weights=counts, minlength=self.spectrum_dimensions[population_index]).astype(np.int64)
+
+
+    def GetTwoPopulationsSpectrum(self, population_1_index: int, population_2_index: int):
+        """
+        Returns the dense joint spectrum of the provided pair of populations
+        """
+
+        if(self.projection != None):
+            return self.GetProjectedSpectrum().sum(axis=tuple(i for i in range(0, self.NumberOfPopulations()) if i != population_1_index and i != population_2_index))
+
+        alt_counts, counts = self.UnpackJointSpectrum()
+        rows = self.spectrum_dimensions[population_1_index]
+        cols = self.spectrum_dimensions[population_2_index]
+
+        return np.bincount(alt_counts[population_1_index] * cols + alt_counts[population_2_index], weights=counts, minlength=rows * cols).astype(np.int64).reshape(rows, cols)
+
+
+    def GetFullSpectrum(self):
+        """
+        Returns the dense joint spectrum of all the populations
+        """
+
+        if(self.projection != None):
+            return self.GetProjectedSpectrum()
+
+        full_spectrum = np.zeros(math.prod(self.spectrum_dimensions), dtype=np.int64)
+        for key, count in self.joint_spectrum.items():
+            full_spectrum[key] += count
+
+        return full_spectrum.reshape(self.spectrum_dimensions)
+
+
+    def SpectraToString(self):
+        """
+        Returns the textual representation of the one population spectra
+        """
+
+        return ", ".join("pop" + str(i + 1) + ": [" + str(self.GetOnePopulationSpectrum(i).tolist()).strip('[]') + "]" for i in range(0, self.NumberOfPopulations()))
+
+
+    def GetPartialSpectrum(self):
+        """
+        Returns the partial state of the generator, which can be merged with
+        the state of generators that read other parts of the variant call set
+        """
+
+        # windows are described by their position, since their identifiers depend on the order in which they were met
+        windows = self.GetWindows()
+        window_spectra = {(windows[window_id], key): count for window_id, spectrum in self.GetWindowSpectra().items() for key, count in spectrum.items()}
+
+        return SfsPartialSpectrum(self.spectrum_dimensions, self.joint_spectrum, self.projection_tally, window_spectra)
+
+
+    def MergePartialSpectrum(self, partial_spectrum: SfsPartialSpectrum):
+        """
+        Adds the counts of the provided partial spectrum to the spectra of the generator
+        """
+
+        merged_spectrum = self.GetPartialSpectrum().Merge(partial_spectrum)
+
+        self.joint_spectrum = merged_spectrum.joint_spectrum
+        self.projection_tally = merged_spectrum.projection_tally
+        self.projected_spectrum = None
+
+        self.window_spectra = {}
+        if(self.window_index != None):
+            for (window, key), count in merged_spectrum.window_spectra.items():
+                self.window_spectra.setdefault(self.window_index.RegisterWindow(window), {})[key] = count
+
+
+    def GetWindows(self):
+        """
+        Returns the description of each window: (chromosome, start, end) per window identifier
+        """
+        return [] if self.window_index == None else self.window_index.GetWindows()
+
+
+    def GetWindowSpectra(self):
+        """
+        Returns the sparse spectrum of each window having variant calls, per window identifier
+        Keys are the keys of the joint spectrum, or of the tally if spectra are projected
+        """
+        return self.window_spectra
+
+
+    def GetWindowGenerator(self, window_spectrum: dict):
+        """
+        Returns a copy of the generator whose spectra are computed from the provided sparse spectrum
+        of a window (or sum of spectra of several windows) instead of the whole variant call set
+        """
+
+        window_generator = copy.copy(self)
+        window_generator.window_index = None
+        window_generator.window_spectra = {}
+        window_generator.scan_projections = False
+        window_generator.bootstrap_replicates = 0
+
+        window_generator.joint_spectrum = dict(window_spectrum) if self.projection == None else {}
+        window_generator.projection_tally = dict(window_spectrum) if self.projection != None else {}
+        window_generator.projected_spectrum = None
+
+        return window_generator
+
+
+    def GetBootstrapSpectra(self, replicates_cnt: int, seed: int = None):
+        """
+        Returns the sparse spectra of the provided number of block-bootstrap replicates, whose blocks are the windows
+        Each replicate is the sum of the spectra of as many windows as there are windows in the window index, drawn
+        with replacement: the number of draws of each window in each replicate is drawn at once from a multinomial
+        distribution, then the spectra of all the replicates are summed by batches of the entries of the window spectra
+        Windows without variant calls are drawn as well, with empty spectra: all the windows of a BED file are,
+        while fixed-size windows and chromosomes are only in the window index once a variant call has been met in them
+        """
+
+        windows_cnt = self.window_index.GetNumberOfWindows()
+        if(windows_cnt == 0):
+            raise Exception("Bootstrap replicates can't be computed without windows")
+
+        entries_cnt = sum(len(spectrum) for spectrum in self.window_spectra.values())
+        window_ids = np.fromiter((window_id for window_id, spectrum in self.window_spectra.items() for key in spectrum), dtype=np.int64, count=entries_cnt)
+        counts = np.fromiter((count for spectrum in self.window_spectra.values() for count in spectrum.values()), dtype=np.int64, count=entries_cnt)
+
+        # keys are renumbered from 0, in the order in which they are met
+        positions = {}
+        key_positions = np.fromiter((positions.setdefault(key, len(positions)) for spectrum in self.window_spectra.values() for key in spectrum), dtype=np.int64, count=entries_cnt)
+        unique_keys = list(positions)
+
+        random_generator = np.random.default_rng(seed)
+        draws = random_generator.multinomial(windows_cnt, np.full(windows_cnt, 1.0 / windows_cnt), size=replicates_cnt)
+
+        # batches are sized so that the contributions of a batch stay around 16 million values
+        batch_size = max(1, 2**24 // replicates_cnt)
+        replicate_offsets = np.arange(replicates_cnt, dtype=np.int64)[:, np.newaxis] * len(unique_keys)
+
+        replicate_spectra = np.zeros(replicates_cnt * len(unique_keys), dtype=np.int64)
+        for start in range(0, len(counts), batch_size):
+            end = start + batch_size
+            contributions = draws[:, window_ids[start:end]] * counts[start:end]
+            replicate_spectra += np.bincount((replicate_offsets + key_positions[start:end]).reshape(-1), weights=contributions.reshape(-1), minlength=len(replicate_spectra)).astype(np.int64)
+
+        replicate_spectra = replicate_spectra.reshape(replicates_cnt, len(unique_keys))
+
+        return [{key: count for key, count in zip(unique_keys, replicate_spectrum.tolist()) if count != 0} for replicate_spectrum in replicate_spectra]
+
+
+    def ScanProjections(self, population_index: int):
+        """
+        Returns the expected number of segregating sites of the provided population for each projection,
+        as a dictionary per number of chromosomes, from 2 to the number of chromosomes of the population
+        """
+
+        if(not self.IsTallyKept()):
+            raise Exception("Projections can only be scanned if the generator is created with scan_projections or a projection")
+
+        alt_counts, called_counts, counts = self.UnpackProjectionTally()
+
+        # the tally is summed over the other populations
+        chromosomes_cnt = self.GetChromosomesCount(population_index)
+        population_counts = np.bincount(alt_counts[population_index] * (chromosomes_cnt + 1) + called_counts[population_index], weights=counts, minlength=(chromosomes_cnt + 1) ** 2)
+        population_keys = np.nonzero(population_counts)[0]
+
+        return {target_cnt: SfsProjection.CountSegregatingSites(population_keys // (chromosomes_cnt + 1), population_keys % (chromosomes_cnt + 1), population_counts[population_keys], target_cnt)
+                for target_cnt in range(2, chromosomes_cnt + 1)}
+
+
+    def GetBestProjections(self):
+        """
+        Returns the number of chromosomes of each population keeping the most segregating sites,
+        the largest one in case of equality
+        """
+
+        best_projections = []
+        for i in range(0, self.NumberOfPopulations()):
+            segregating_sites = self.ScanProjections(i)
+            best_projections.append(max(segregating_sites, key=lambda target_cnt: (segregating_sites[target_cnt], target_cnt)) if len(segregating_sites) > 0 else 0)
+
+        return best_projections
 
 
     def GenerateOutputfile(self, file_name: str):
@@ -177,17 +634,38 @@ class SfsGenerator(GenericGenerator):
         In this case, two files are generated:
         - one in dadi format (prefixed with 'dadi_')
         - one in FastSimCoal format (prefixed with ('fsc_')
+        Files are generated for the spectrum of each population, for the joint spectrum of each pair
+        of populations and optionally for the joint spectrum of all the populations
         """
 
-        self.generateOnePopulationOutputFiles(self.population_1_spectrum, file_name + "_pop1", False)
-        self.generateOnePopulationOutputFiles(self.compute1PopFoldedSpectrum(self.population_1_spectrum), file_name + "_pop1", True)
+        with Metrics.Stage("write"):
+            for i in range(0, self.NumberOfPopulations()):
+                one_population_spectrum = self.GetOnePopulationSpectrum(i)
+                self.generateOnePopulationOutputFiles(one_population_spectrum, file_name + "_pop" + str(i + 1), False)
+                self.generateOnePopulationOutputFiles(self.compute1PopFoldedSpectrum(one_population_spectrum), file_name + "_pop" + str(i + 1), True)
+
+            for i in range(0, self.NumberOfPopulations()):
+                for j in range(i + 1, self.NumberOfPopulations()):
+                    # with two populations only, the joint spectrum files keep the name of the output file
+                    two_populations_file_name = file_name if self.NumberOfPopulations() == 2 else file_name + "_pop" + str(i + 1) + "_pop" + str(j + 1)
+                    two_populations_spectrum = self.GetTwoPopulationsSpectrum(i, j)
+                    self.generateTwoPopulationsOutputFiles(two_populations_spectrum, two_populations_file_name, False)
+                    self.generateTwoPopulationsOutputFiles(self.compute2PopFoldedSpectrum(two_populations_spectrum), two_populations_file_name, True)
+
+            if(self.generate_full_spectrum and self.NumberOfPopulations() > 2):
+                full_spectrum = self.GetFullSpectrum()
+                self.generateMultiPopulationsOutputFiles(full_spectrum, file_name + "_multi", False)
+                self.generateMultiPopulationsOutputFiles(self.computeFoldedSpectrum(full_spectrum), file_name + "_multi", True)
 
-        if(self.NumberOfPopulations() == 2):
-            self.generateOnePopulationOutputFiles(self.population_2_spectrum, file_name + "_pop2", False)
-            self.generateOnePopulationOutputFiles(self.compute1PopFoldedSpectrum(self.population_2_spectrum), file_name + "_pop2", True)
-            
-            self.generateTwoPopulationsOutputFiles(self.two_populations_spectrum, file_name, False)
-            self.generateTwoPopulationsOutputFiles(self.compute2PopFoldedSpectrum(), file_name, True)
+            if(self.scan_projections):
+                self.generateProjectionsOutputFile(file_name)
+
+            if(self.window_index != None):
+                self.generateWindowsOutputFile(file_name)
+
+        # output files of the bootstrap replicates are timed by the generators of the replicates
+        if(self.bootstrap_replicates > 0):
+            self.generateBootstrapOutputFiles(file_name)
 
 
 
@@ -196,116 +674,210 @@ class SfsGenerator(GenericGenerator):
         Computes the folder spectrum for the provided one population spectrum.
         """
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Computing folded spectrum for one population...")
+        Metrics.Log("Computing folded spectrum for one population...")
+
+        folded_spectrum = self.computeFoldedSpectrum(one_population_spectrum)
+
+        Metrics.Log("Done")
+
+        return folded_spectrum
+
+
 
-        # initialization
-        folded_spectrum = [0] * len(one_population_spectrum)
+    def compute2PopFoldedSpectrum(self, two_populations_spectrum):
+        """
+        Computes the folder spectrum for the provided two populations spectrum.
+        """
 
-        # computation of the folded spectrum:
-        # first, make a sum of the unfolded spectrum with itself reversed for the left part of the spectrum
-        # if the spectrum has an uneven number of elements, take the element in the middle
-        # the last elements remain set to 0
-        for i in range (0, math.floor(len(one_population_spectrum) / 2)):
-            folded_spectrum[i] = one_population_spectrum[i] + one_population_spectrum[len(one_population_spectrum) - i - 1]
+        Metrics.Log("Computing folded spectrum for two populations...")
 
-        if(math.fmod(len(one_population_spectrum), 2) != 0):
-            folded_spectrum[math.floor(len(one_population_spectrum) / 2)] = one_population_spectrum[math.floor(len(one_population_spectrum) / 2)]
+        folded_spectrum = self.computeFoldedSpectrum(two_populations_spectrum)
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Done")
+        Metrics.Log("Done")
 
         return folded_spectrum
 
 
 
-    def compute2PopFoldedSpectrum(self):
+    def computeFoldedSpectrum(self, spectrum):
         """
-        Computes the folder spectrum for two populations.
+        Computes the folded spectrum for the provided spectrum of any number of populations.
+        The spectrum is summed with itself reversed along all its axes, then the cells whose sum of indices
+        is above half of the sum of the sample sizes are set to 0 and the cells on this anti-diagonal
+        are divided by 2, since they are summed with another cell of the anti-diagonal (or with themselves)
         """
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Computing folded spectrum for two populations...")
+        spectrum = np.asarray(spectrum)
 
-        # initialization
-        folded_spectrum = [0] * len(self.population_1_spectrum)
-        for i in range (0, len(self.population_1_spectrum)):
-            folded_spectrum[i] = [0] * len(self.population_2_spectrum)
+        # sum of the indices of each cell, and half of the sum of the sample sizes (number of chromosomes)
+        index_sums = sum(np.ogrid[tuple(slice(0, dimension) for dimension in spectrum.shape)])
+        half_sample_size = sum(dimension - 1 for dimension in spectrum.shape) / 2
 
-        # computation of the folded spectrum:
-        # first, make a sum of the unfolded spectrum with itself reversed
-        # then set the elements of the left down corner to 0
-        # finally, divide its values on the diagonal by 2
-        for i in range (0, len(self.population_1_spectrum)):
-            for j in range (0, len(self.population_2_spectrum)):
-                if(i + j > (len(self.population_1_spectrum) + len(self.population_2_spectrum)) / 2 - 1):
-                    folded_spectrum[i][j] = 0
-                else:
-                    folded_spectrum[i][j] = self.two_populations_spectrum[i][j] + self.two_populations_spectrum[len(self.population_1_spectrum) - i - 1][len(self.population_2_spectrum) - j - 1]
-                if(i + j == (len(self.population_1_spectrum) + len(self.population_2_spectrum)) / 2 - 1 and folded_spectrum[i][j] != 0):
-                    folded_spectrum[i][j] /= 2
+        folded_spectrum = spectrum + np.flip(spectrum)
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Done")
+        if(np.any(index_sums == half_sample_size)):
+            folded_spectrum = np.where(index_sums == half_sample_size, folded_spectrum / 2, folded_spectrum)
 
-        return folded_spectrum
+        return np.where(index_sums > half_sample_size, 0, folded_spectrum)
 
 
     def generateOnePopulationOutputFiles(self, spectrum, file_name: str, is_folded: bool):
         """
         Generates output files for one population spectrum, in dadi and FastSimCoal formats
+        Values are formatted once and written to both files
         """
 
-        result_dadi = str(len(spectrum)) + "\n"
+        values = self.spectrumToStrings(spectrum)
+
+        dadi_file = self.openOutputFile(file_name, "dadi", is_folded)
+        fsc_file = self.openOutputFile(file_name, "fsc", is_folded)
 
-        result_fsc = "1 observations\n"
-        for i in range(0, len(spectrum)):
-            result_fsc += "\td_" + str(i)
-        result_fsc += "\n"
+        dadi_file.write(str(len(values)) + "\n")
 
-        for i in range(0, len(spectrum)):
-            result_dadi += str(spectrum[i]) + " "
-            result_fsc += str(spectrum[i]) + " "
-            
-        self.writeResultInFile(result_dadi, file_name, "dadi", is_folded)
-        self.writeResultInFile(result_fsc, file_name, "fsc", is_folded)
+        fsc_file.write("1 observations\n")
+        fsc_file.write("".join("\td_" + str(i) for i in range(0, len(values))) + "\n")
+
+        row = " ".join(values) + " "
+        dadi_file.write(row)
+        fsc_file.write(row)
+
+        self.closeOutputFile(dadi_file)
+        self.closeOutputFile(fsc_file)
 
 
     def generateTwoPopulationsOutputFiles(self, spectrum, file_name: str, is_folded: bool):
         """
         Generates output files for two populations spectrum, in dadi and FastSimCoal formats
+        Rows are formatted once and streamed to both files
         """
 
         rows = len(spectrum)
         cols = len(spectrum[0])
 
-        result_dadi = str(rows) + " " + str(cols) + "\n"
+        dadi_file = self.openOutputFile(file_name, "dadi", is_folded)
+        fsc_file = self.openOutputFile(file_name, "fsc", is_folded)
 
-        result_fsc = "1 observations\n"
-        for j in range(0, cols):
-            result_fsc += "\td_" + str(j)
-        result_fsc += "\n"
+        dadi_file.write(str(rows) + " " + str(cols) + "\n")
+
+        fsc_file.write("1 observations\n")
+        fsc_file.write("".join("\td_" + str(j) for j in range(0, cols)) + "\n")
 
         for i in range(0, rows):
-            for j in range(0, cols):
-                result_dadi += str(spectrum[i][j]) + " "
-                if(j == 0):
-                    result_fsc += "d_" + str(i)
-                result_fsc += "\t" + str(spectrum[i][j])
-                if(j == cols - 1):
-                    result_fsc += "\n"
+            values = self.spectrumToStrings(spectrum[i])
+            dadi_file.write(" ".join(values) + " ")
+            fsc_file.write("d_" + str(i) + "\t" + "\t".join(values) + "\n")
+
+        self.closeOutputFile(dadi_file)
+        self.closeOutputFile(fsc_file)
+
+
+    def generateMultiPopulationsOutputFiles(self, spectrum, file_name: str, is_folded: bool):
+        """
+        Generates output files for a multidimensional spectrum, in dadi and FastSimCoal formats
+        Values are listed with the index of the last population varying fastest
+        """
+
+        dadi_file = self.openOutputFile(file_name, "dadi", is_folded)
+        fsc_file = self.openOutputFile(file_name, "fsc", is_folded)
+
+        dadi_file.write(" ".join(str(dimension) for dimension in spectrum.shape) + "\n")
+
+        # FastSimCoal header gives the number of populations and their sample sizes (number of chromosomes)
+        fsc_file.write("1 observations. No. of demes and sample sizes are on next line\n")
+        fsc_file.write(str(spectrum.ndim) + "\t" + "\t".join(str(dimension - 1) for dimension in spectrum.shape) + "\n")
+
+        # values are streamed by rows of the last population
+        for row in spectrum.reshape(-1, spectrum.shape[-1]):
+            values = " ".join(self.spectrumToStrings(row)) + " "
+            dadi_file.write(values)
+            fsc_file.write(values)
+
+        self.closeOutputFile(dadi_file)
+        self.closeOutputFile(fsc_file)
+
+
+    def spectrumToStrings(self, spectrum):
+        """
+        Returns the textual representation of the values of the provided spectrum row
+        Integral values are written as integers, other values (halved anti-diagonal of folded spectra,
+        projected spectra) with the shortest representation of their floating point value
+        """
+
+        return [str(int(value)) if isinstance(value, float) and value.is_integer() else str(value) for value in np.asarray(spectrum).tolist()]
+
 
-        self.writeResultInFile(result_dadi, file_name, "dadi", is_folded)
-        self.writeResultInFile(result_fsc, file_name, "fsc", is_folded)
+    def generateProjectionsOutputFile(self, file_name: str):
+        """
+        Generates the output file of the scan of projections: the expected number of segregating sites
+        of each population for each number of chromosomes, followed by the best projection of each population
+        """
+
+        projections_file = self.openOutputFile(file_name, "projections", False)
+
+        projections_file.write("population\tchromosomes\tsegregating_sites\n")
+        for i in range(0, self.NumberOfPopulations()):
+            for target_cnt, segregating_sites in self.ScanProjections(i).items():
+                projections_file.write(self.population_names[i] + "\t" + str(target_cnt) + "\t" + str(round(segregating_sites, 2)) + "\n")
+
+        projections_file.write("# best projection: " + " ".join(str(target_cnt) for target_cnt in self.GetBestProjections()) + "\n")
+
+        self.closeOutputFile(projections_file)
+
+
+    def generateWindowsOutputFile(self, file_name: str):
+        """
+        Generates the output file of the windows: the position and the number of variant calls of each window
+        having variant calls, followed by the spectrum of each population in the window (values separated by commas)
+        """
+
+        windows = self.GetWindows()
+
+        windows_file = self.openOutputFile(file_name, "windows", False)
 
+        windows_file.write("chromosome\tstart\tend\tvariants\t" + "\t".join(self.population_names) + "\n")
+        for window_id, window_spectrum in sorted(self.GetWindowSpectra().items()):
+            chromosome, start, end = windows[window_id]
+            window_generator = self.GetWindowGenerator(window_spectrum)
+            one_population_spectra = [",".join(self.spectrumToStrings(window_generator.GetOnePopulationSpectrum(i))) for i in range(0, self.NumberOfPopulations())]
+            windows_file.write(chromosome + "\t" + ("." if start == None else str(start)) + "\t" + ("." if end == None else str(end)) + "\t" + str(sum(window_spectrum.values())) + "\t" + "\t".join(one_population_spectra) + "\n")
 
-    def writeResultInFile(self, result: str, file_name: str, file_format: str, is_folded: bool):
-        file_format_to_display = file_format
-        folded_suffix = ""
-        if(is_folded):
-            file_format_to_display = file_format_to_display + "_folded"
-            folded_suffix = "_folded"
+        self.closeOutputFile(windows_file)
+
+
+    def generateBootstrapOutputFiles(self, file_name: str):
+        """
+        Generates the output files of each bootstrap replicate, with the name of the output file,
+        in a numbered directory per replicate: <file_name>_bootstrap/replicate_<number>
+        """
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Generating output file in " + file_format_to_display + " format...")
+        bootstrap_spectra = self.GetBootstrapSpectra(self.bootstrap_replicates, self.bootstrap_seed)
 
-        dadi_file = open(file_name + "_" + file_format + folded_suffix + ".out", "w")
-        dadi_file.write(result)
-        dadi_file.close()
+        for i in range(0, len(bootstrap_spectra)):
+            Metrics.Log("Generating output files of bootstrap replicate " + str(i + 1) + "/" + str(len(bootstrap_spectra)) + "...")
+
+            replicate_directory = os.path.join(file_name + "_bootstrap", "replicate_" + str(i + 1))
+            os.makedirs(replicate_directory, exist_ok=True)
+
+            self.GetWindowGenerator(bootstrap_spectra[i]).GenerateOutputfile(os.path.join(replicate_directory, os.path.basename(file_name)))
+
+
+    def openOutputFile(self, file_name: str, file_format: str, is_folded: bool):
+        """
+        Opens the output file of the provided format for writing, with a large buffer
+        """
+
+        folded_suffix = "_folded" if is_folded else ""
+
+        Metrics.Log("Generating output file in " + file_format + folded_suffix + " format...")
+
+        return open(file_name + "_" + file_format + folded_suffix + ".out", "w", buffering=1024 * 1024)
+
+
+    def closeOutputFile(self, file):
+        """
+        Closes the provided output file
+        """
+
+        file.close()
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Done.")
\ No newline at end of file
+        Metrics.Log("Done.")
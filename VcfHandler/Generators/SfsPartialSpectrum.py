@@ -0,0 +1,57 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Partial state of an SFS generator, computed on a part of a variant call set.
+"""
+
+
+class SfsPartialSpectrum:
+    """
+    Partial state of an SFS generator, computed on a part of a variant call set.
+    Spectra only contain counts, so partial spectra computed on disjoint parts
+    of a variant call set are merged by an exact sum.
+    """
+
+
+    # Constructor
+
+    def __init__(self, spectrum_dimensions: tuple, joint_spectrum: dict, projection_tally: dict = {}, window_spectra: dict = {}, **kwargs):
+        """
+        Constructor
+        """
+
+        # dimensions of the joint spectrum of all the populations
+        self.spectrum_dimensions = tuple(spectrum_dimensions)
+
+        # sparse joint spectrum of all the populations: number of variant calls per packed key of ALT counts
+        self.joint_spectrum = dict(joint_spectrum)
+
+        # sparse tally of projected generators: number of variant calls per pair of packed keys of ALT counts and of called counts
+        self.projection_tally = dict(projection_tally)
+
+        # sparse spectra of the windows: number of variant calls per pair of window (chromosome, start, end) and packed key
+        self.window_spectra = dict(window_spectra)
+
+
+
+    # Methods
+
+    def Merge(self, partial_spectrum: "SfsPartialSpectrum"):
+        """
+        Adds the counts of the provided partial spectrum to this one
+        """
+
+        if(self.spectrum_dimensions != partial_spectrum.spectrum_dimensions):
+            raise Exception("Partial spectra computed with different population configurations can't be merged")
+
+        for key, count in partial_spectrum.joint_spectrum.items():
+            self.joint_spectrum[key] = self.joint_spectrum.get(key, 0) + count
+
+        for key, count in partial_spectrum.projection_tally.items():
+            self.projection_tally[key] = self.projection_tally.get(key, 0) + count
+
+        for key, count in partial_spectrum.window_spectra.items():
+            self.window_spectra[key] = self.window_spectra.get(key, 0) + count
+
+        return self
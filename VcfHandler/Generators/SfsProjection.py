@@ -0,0 +1,112 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Hypergeometric projection of allele counts to a smaller sample size.
+"""
+
+
+import numpy as np
+
+
+class SfsProjection:
+    """
+    Hypergeometric projection of allele counts to a smaller sample size.
+    A variant call with k ALT alleles among n called chromosomes contributes to the entry j of the spectrum
+    of a sample of m chromosomes with the probability of drawing j ALT alleles when drawing m chromosomes
+    among the n called ones: C(k, j) * C(n - k, m - j) / C(n, m). Variant calls with less than m called
+    chromosomes don't contribute. Weights are precomputed for every (n, k) pair.
+    """
+
+
+    # Constructor
+
+    def __init__(self, max_called_cnt: int, target_cnt: int, **kwargs):
+        """
+        Constructor
+        max_called_cnt: maximal number of called chromosomes of a variant call
+        target_cnt: number of chromosomes of the projected sample
+        """
+
+        if(target_cnt > max_called_cnt):
+            raise Exception("Can't project " + str(max_called_cnt) + " chromosomes to " + str(target_cnt) + " chromosomes")
+
+        self.max_called_cnt = max_called_cnt
+        self.target_cnt = target_cnt
+
+        # projection weights of shape (called count, ALT count, projected ALT count)
+        self.weights = self.ComputeWeights()
+
+
+
+    # Methods
+
+    @staticmethod
+    def LogFactorials(max_value: int):
+        """
+        Returns the array of the logarithms of the factorials of 0 to max_value
+        """
+        return np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, max_value + 1)))))
+
+
+    @staticmethod
+    def LogBinomials(log_factorials: np.ndarray, n: np.ndarray, k: np.ndarray):
+        """
+        Returns the logarithms of the binomial coefficients C(n, k), -inf where k < 0 or k > n
+        """
+
+        is_valid = (k >= 0) & (k <= n)
+        n = np.where(is_valid, n, 0)
+        k = np.where(is_valid, k, 0)
+
+        return np.where(is_valid, log_factorials[n] - log_factorials[k] - log_factorials[n - k], -np.inf)
+
+
+    def ComputeWeights(self):
+        """
+        Returns the projection weights of every (called count, ALT count) pair
+        """
+
+        log_factorials = self.LogFactorials(self.max_called_cnt)
+
+        called_cnt = np.arange(self.max_called_cnt + 1)[:, np.newaxis, np.newaxis]
+        alt_cnt = np.arange(self.max_called_cnt + 1)[np.newaxis, :, np.newaxis]
+        projected_alt_cnt = np.arange(self.target_cnt + 1)[np.newaxis, np.newaxis, :]
+
+        # weights of variant calls with less than target_cnt called chromosomes are undefined and set to 0
+        with np.errstate(invalid="ignore"):
+            log_weights = (self.LogBinomials(log_factorials, alt_cnt, projected_alt_cnt)
+                           + self.LogBinomials(log_factorials, called_cnt - alt_cnt, self.target_cnt - projected_alt_cnt)
+                           - self.LogBinomials(log_factorials, called_cnt, np.full_like(called_cnt, self.target_cnt)))
+
+            return np.where(called_cnt >= self.target_cnt, np.exp(log_weights), 0.0)
+
+
+    def GetWeights(self, alt_counts: np.ndarray, called_counts: np.ndarray):
+        """
+        Returns the projection weights of the provided variant calls, of shape (variants, target_cnt + 1)
+        """
+        return self.weights[called_counts, alt_counts]
+
+
+    @staticmethod
+    def CountSegregatingSites(alt_counts: np.ndarray, called_counts: np.ndarray, counts: np.ndarray, target_cnt: int):
+        """
+        Returns the expected number of segregating variant calls (neither 0 nor target_cnt ALT alleles)
+        once the provided variant calls are projected to target_cnt chromosomes
+        """
+
+        is_projected = called_counts >= target_cnt
+        alt_counts = alt_counts[is_projected]
+        called_counts = called_counts[is_projected]
+        counts = counts[is_projected]
+
+        log_factorials = SfsProjection.LogFactorials(int(called_counts.max()) if len(called_counts) > 0 else 0)
+        target_cnts = np.full_like(called_counts, target_cnt)
+        log_total = SfsProjection.LogBinomials(log_factorials, called_counts, target_cnts)
+
+        # probabilities of drawing only REF alleles or only ALT alleles
+        only_ref = np.exp(SfsProjection.LogBinomials(log_factorials, called_counts - alt_counts, target_cnts) - log_total)
+        only_alt = np.exp(SfsProjection.LogBinomials(log_factorials, alt_counts, target_cnts) - log_total)
+
+        return float(np.sum(counts * (1.0 - only_ref - only_alt)))
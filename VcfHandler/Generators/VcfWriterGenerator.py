@@ -0,0 +1,189 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Generator of VCF files made of the variant calls read, optionally restricted to the individuals of populations.
+"""
+
+
+from Generators.GenericGenerator import GenericGenerator
+from Generators.SfsGenerator import SfsGenerator
+from Instrumentation.Metrics import Metrics
+from Readers.VcfTokenizer import VcfTokenizer
+from VariantCallSet.VariantCall import VariantCall
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+from VariantCallSet.VariantCallSet import VariantCallSet
+from Writers.BgzfWriter import BgzfWriter
+
+import os
+import operator
+import numpy as np
+
+
+class VcfWriterGenerator(GenericGenerator):
+    """
+    Generator of VCF files made of the variant calls read, optionally restricted to the individuals of populations.
+    Used with the filters of the reader, it writes the subset of the variant calls accepted by the filters.
+    Variant calls are written from the raw lines of the genotype blocks: lines are written as they are
+    if all the individuals are kept, otherwise they are split and only the columns of the kept individuals,
+    computed once from the header, are joined. Variant calls without raw lines (read line by line, from
+    a genotype store or from the cache) are written from their standard fields and genotypes only (GT format).
+    Output is compressed in BGZF blocks, in a background thread, unless compression is disabled.
+    """
+
+
+    # Constructor
+
+    def __init__(self, file_name: str, sfs_generator: SfsGenerator = None, compress: bool = True, threaded: bool = True, **kwargs):
+        """
+        Constructor
+        If an SFS generator is provided, only the individuals of its populations are written, otherwise all of them are
+        Variant calls are written in a temporary file, which becomes the output file once it is generated
+        """
+
+        self.sfs_generator = sfs_generator
+
+        # temporary file in which variant calls are written
+        self.temporary_file_name = file_name + ".tmp"
+        if(compress):
+            self.file = BgzfWriter(self.temporary_file_name, threaded=threaded)
+        else:
+            self.file = open(self.temporary_file_name, "w", buffering=1024 * 1024)
+
+        # header lines of the variant call set, written before the first variant call
+        self.header_lines = []
+        self.is_header_written = False
+
+        # splits raw lines into their columns, with the delimiter of the variant call set
+        self.tokenizer = VcfTokenizer()
+
+        # positions of the individuals written in the variant call set, None if all of them are written
+        self.sample_positions = None
+
+        # function returning the columns written from the columns of a line, None if lines are written as they are
+        self.get_columns = None
+
+        return super().__init__(**kwargs)
+
+
+
+    # Methods
+
+    def SetVariantCallSet(self, variant_call_set: VariantCallSet):
+        """
+        Keeps the header of the variant call set and computes the columns of the individuals to write
+        """
+
+        if(self.sfs_generator != None):
+            self.sfs_generator.SetVariantCallSet(variant_call_set)
+
+        samples_cnt = len(variant_call_set.GetSampleNames())
+        sample_selection = self.GetSampleSelection()
+        if(sample_selection is None):
+            self.sample_positions = None
+        else:
+            self.sample_positions = sample_selection[sample_selection < samples_cnt]
+
+        self.header_lines = list(variant_call_set.header_lines)
+        chrom_line = self.header_lines[-1]
+        self.tokenizer.DetectDelimiter(chrom_line)
+
+        columns = list(range(0, VcfTokenizer.FIXED_FIELDS_CNT)) + ([] if self.sample_positions is None else (self.sample_positions + VcfTokenizer.FIXED_FIELDS_CNT).tolist())
+        if(self.sample_positions is None):
+            # lines of tab-separated files are written as they are
+            self.get_columns = None if self.tokenizer.delimiter == "\t" else (lambda line_parts: line_parts)
+        else:
+            # the getter returns a single column rather than a tuple if there is only one
+            self.get_columns = operator.itemgetter(*columns) if len(columns) > 1 else (lambda line_parts: (line_parts[columns[0]],))
+
+        self.header_lines[-1] = "\t".join(self.GetColumns(self.tokenizer.Split(chrom_line, -1)))
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals of the populations of the SFS generator,
+        or None if all of them are written
+        """
+
+        if(self.sfs_generator == None):
+            return None
+
+        return self.sfs_generator.GetSampleSelection()
+
+
+    def GetColumns(self, line_parts: list):
+        """
+        Returns the columns written from the provided columns of a line
+        """
+        return line_parts if self.get_columns == None else self.get_columns(line_parts)
+
+
+    def WriteHeader(self):
+        """
+        Writes the header lines, once
+        """
+
+        if(self.is_header_written):
+            return
+
+        self.file.write("".join(line + "\n" for line in self.header_lines))
+        self.is_header_written = True
+
+
+    def AddVariantCall(self, variant_call: VariantCall):
+        """
+        Adds the provided vairant call to the file content
+        """
+        self.AddGenotypeBlock(GenotypeBlock.FromVariantCall(variant_call))
+
+
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Writes the variant calls of the provided genotype block, from their raw lines if they are available
+        """
+
+        self.WriteHeader()
+
+        lines = genotype_block.GetLines()
+        if(lines == None):
+            self.file.write(self.FormatGenotypeBlock(genotype_block))
+        elif(self.get_columns == None):
+            self.file.write("".join(line if line.endswith("\n") else line + "\n" for line in lines))
+        else:
+            self.file.write("".join("\t".join(self.get_columns(self.tokenizer.Split(line.rstrip("\r\n"), -1))) + "\n" for line in lines))
+
+
+    def FormatGenotypeBlock(self, genotype_block: GenotypeBlock):
+        """
+        Returns the lines of the variant calls of the provided genotype block, made of their standard fields
+        and of the genotypes of the written individuals
+        """
+
+        alleles = genotype_block.GetAlleles()
+        phased = genotype_block.GetPhased()
+        if(self.sample_positions is not None):
+            positions = genotype_block.GetSamplePositions(self.sample_positions)
+            alleles = alleles[:, positions, :]
+            phased = phased[:, positions]
+
+        # textual value of each allele index, "." for missing alleles
+        allele_strings = np.array(["."] + [str(i) for i in range(0, int(alleles.max(initial=0)) + 1)], dtype=object)
+        separators = np.where(phased, "|", "/").astype(object)
+        genotypes = allele_strings[alleles[:, :, 0] + 1] + separators + allele_strings[alleles[:, :, 1] + 1]
+
+        return "".join("\t".join([str(field) for field in fixed_fields[0:VcfTokenizer.FIXED_FIELDS_CNT - 1]] + ["GT"] + variant_genotypes) + "\n"
+                       for fixed_fields, variant_genotypes in zip(genotype_block.GetFixedFields(), genotypes.tolist()))
+
+
+    def GenerateOutputfile(self, file_name: str):
+        """
+        Closes the file of the variant calls and moves it to the provided file name
+        """
+
+        Metrics.Log("Generating VCF file " + file_name + "...")
+
+        with Metrics.Stage("write"):
+            self.WriteHeader()
+            self.file.close()
+
+        os.replace(self.temporary_file_name, file_name)
@@ -0,0 +1,178 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Index of the genomic windows in which variant calls are tallied.
+"""
+
+
+import threading
+import numpy as np
+
+
+class WindowIndex:
+    """
+    Index of the genomic windows in which variant calls are tallied.
+    Windows are either fixed-size windows of each chromosome (the window of a variant call is given by
+    the integer division of its position by the window size), the intervals of a BED file (found by a binary
+    search in the sorted intervals of the chromosome), or whole chromosomes if neither is provided.
+    Each window has an integer identifier, in the order in which windows are met (in the order of the BED file
+    for BED windows), and is described by its chromosome and its 1-based inclusive start and end positions.
+    An index can be shared by generators fed in parallel threads: windows are registered under a lock.
+    """
+
+
+    # Constructor
+
+    def __init__(self, window_size: int = None, bed_file_name: str = None, **kwargs):
+        """
+        Constructor
+        BED intervals of a chromosome are expected not to overlap
+        """
+
+        if(window_size != None and bed_file_name != None):
+            raise Exception("Windows are either fixed-size windows or BED intervals")
+
+        self.window_size = window_size
+
+        # description of each window, per identifier: (chromosome, start, end), start and end being None for whole chromosomes
+        self.windows = []
+
+        # identifier of each window, per description
+        self.window_ids = {}
+
+        # BED windows of each chromosome: 0-based starts sorted, ends and identifiers
+        self.bed_windows = {}
+
+        # lock of the registration of windows, so that threads sharing the index get the same identifiers
+        self.lock = threading.Lock()
+
+        if(bed_file_name != None):
+            self.ReadBedFile(bed_file_name)
+
+
+
+    # Serialization
+
+    def __getstate__(self):
+        """
+        Returns the state of the index without its lock, which can't be serialized (indexes are sent to worker processes)
+        """
+
+        state = self.__dict__.copy()
+        del state["lock"]
+
+        return state
+
+
+    def __setstate__(self, state: dict):
+        """
+        Restores the state of the index with a new lock
+        """
+
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+
+    # Getters
+
+    def GetWindows(self):
+        """
+        Returns the description of each window, per identifier
+        """
+        return self.windows
+
+
+    def GetNumberOfWindows(self):
+        """
+        Returns the number of windows met so far
+        """
+        return len(self.windows)
+
+
+
+    # Methods
+
+    def ReadBedFile(self, bed_file_name: str):
+        """
+        Reads the windows of the provided BED file (0-based, half-open intervals)
+        """
+
+        intervals = {}
+
+        file = open(bed_file_name, "r")
+
+        for line in file:
+            if(line.startswith("#") or line.startswith("track") or line.startswith("browser") or line.strip() == ""):
+                continue
+
+            line_parts = line.split()
+            if(len(line_parts) < 3):
+                raise Exception("Wrong format for BED line \"" + line + "\"")
+
+            window_id = self.RegisterWindow((line_parts[0], int(line_parts[1]) + 1, int(line_parts[2])))
+            intervals.setdefault(line_parts[0], []).append((int(line_parts[1]), int(line_parts[2]), window_id))
+
+        file.close()
+
+        for chromosome, chromosome_intervals in intervals.items():
+            chromosome_intervals.sort()
+            self.bed_windows[chromosome] = tuple(np.array([interval[k] for interval in chromosome_intervals], dtype=np.int64) for k in range(0, 3))
+
+
+    def RegisterWindow(self, window: tuple):
+        """
+        Returns the identifier of the provided window, which is added to the index if it's not in it yet
+        """
+
+        with self.lock:
+            window_id = self.window_ids.get(window)
+            if(window_id == None):
+                window_id = len(self.windows)
+                self.windows.append(window)
+                self.window_ids[window] = window_id
+
+        return window_id
+
+
+    def GetWindowIds(self, chromosomes: list, positions: np.ndarray):
+        """
+        Returns the identifier of the window of each of the provided variant calls, -1 if it isn't in any window
+        """
+
+        window_ids = np.full(len(positions), -1, dtype=np.int64)
+        chromosomes = np.array(chromosomes)
+
+        for chromosome in np.unique(chromosomes).tolist():
+            is_in_chromosome = chromosomes == chromosome
+            window_ids[is_in_chromosome] = self.GetChromosomeWindowIds(chromosome, positions[is_in_chromosome])
+
+        return window_ids
+
+
+    def GetChromosomeWindowIds(self, chromosome: str, positions: np.ndarray):
+        """
+        Returns the identifier of the window of each of the provided positions of the provided chromosome,
+        -1 if it isn't in any window
+        """
+
+        if(len(self.bed_windows) > 0):
+            if(not chromosome in self.bed_windows):
+                return np.full(len(positions), -1, dtype=np.int64)
+
+            starts, ends, window_ids = self.bed_windows[chromosome]
+
+            # last window starting before each position, which contains it if it doesn't end before it
+            indices = np.searchsorted(starts, positions - 1, side="right") - 1
+            is_in_window = (indices >= 0) & (positions <= ends[np.maximum(indices, 0)])
+
+            return np.where(is_in_window, window_ids[np.maximum(indices, 0)], -1)
+
+        if(self.window_size == None):
+            return np.full(len(positions), self.RegisterWindow((chromosome, None, None)), dtype=np.int64)
+
+        window_indices, inverse = np.unique((positions - 1) // self.window_size, return_inverse=True)
+        window_ids = np.array([self.RegisterWindow((chromosome, window_index * self.window_size + 1, (window_index + 1) * self.window_size)) for window_index in window_indices.tolist()], dtype=np.int64)
+
+        return window_ids[inverse.reshape(-1)]
@@ -0,0 +1,278 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Process-wide instrumentation of the reading of variant call sets: progress messages, stage timers and counters.
+"""
+
+
+from datetime import datetime
+
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import threading
+
+
+class StageTimer:
+    """
+    Context manager adding the time spent in its block to the timer of a stage.
+    """
+
+
+    # Constructor
+
+    def __init__(self, stage: str, **kwargs):
+        """
+        Constructor
+        """
+
+        self.stage = stage
+
+        # time at which the block was entered
+        self.start_time = 0.0
+
+
+
+    # Methods
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        Metrics.AddTime(self.stage, time.perf_counter() - self.start_time)
+        return False
+
+
+
+class NoStageTimer:
+    """
+    Context manager doing nothing, returned for every stage while the instrumentation is disabled.
+    """
+
+
+    # Methods
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        return False
+
+
+
+class Metrics:
+    """
+    Process-wide instrumentation of the reading of variant call sets: progress messages, stage timers and counters.
+    Stages are timed per genotype block (or per output file), never per line, and counters are only updated
+    while the instrumentation is enabled, so that its cost is negligible when it's disabled.
+    Stages are "io" (reading lines), "tokenize" (splitting lines and extracting genotypes), "decode" (building
+    genotype matrices), "filter", "aggregate" (generators) and "write" (output files).
+    Counters are "lines", "sites_kept", "sites_filtered" and "genotypes_decoded".
+    Metrics of the worker processes of parallel reads aren't collected.
+    """
+
+
+    # stages timed by the instrumentation, in the order of the pipeline
+    STAGES = ["io", "tokenize", "decode", "filter", "aggregate", "write"]
+
+    # True if stages are timed and counters are updated
+    enabled = False
+
+    # False if progress messages aren't printed
+    verbose = True
+
+    # time spent in each stage, in seconds
+    timers = {}
+
+    # value of each counter
+    counters = {}
+
+    # time at which the instrumentation was enabled
+    start_time = 0.0
+
+    # context manager returned for every stage while the instrumentation is disabled
+    no_stage_timer = NoStageTimer()
+
+    # profiler of the whole run and file in which its statistics are written, None if the run isn't profiled
+    profiler = None
+    profile_file_name = None
+
+    # number of samples of the stack of the main thread per function, and thread taking these samples
+    samples = {}
+    sampling_thread = None
+
+
+
+    # Methods
+
+    @classmethod
+    def Enable(cls, metrics_file_name: str = None, profile_file_name: str = None, sampling_interval: float = None):
+        """
+        Enables the timers and counters, which are reset
+        If metrics_file_name is provided, metrics are written in this JSON file when the process exits
+        If profile_file_name is provided, the whole run is profiled with cProfile and its statistics are written in this file
+        If sampling_interval is provided (in seconds), the function executed by the main thread is sampled at this interval,
+        which is cheaper than profiling, and the most sampled functions are part of the metrics
+        Enabling the instrumentation again replaces the files and the profiler of the previous call
+        """
+
+        cls.enabled = True
+        cls.timers = {stage: 0.0 for stage in cls.STAGES}
+        cls.counters = {}
+        cls.samples = {}
+        cls.start_time = time.perf_counter()
+
+        # functions called at exit are registered once, with the files of the last call
+        if(metrics_file_name != None):
+            atexit.unregister(cls.Dump)
+            atexit.register(cls.Dump, metrics_file_name)
+
+        if(profile_file_name != None):
+            cls.StopProfiler()
+            atexit.unregister(cls.StopProfiler)
+            cls.profiler = cProfile.Profile()
+            cls.profile_file_name = profile_file_name
+            cls.profiler.enable()
+            atexit.register(cls.StopProfiler)
+
+        if(sampling_interval != None):
+            cls.sampling_thread = threading.Thread(target=cls.SampleMainThread, args=(threading.main_thread().ident, sampling_interval), daemon=True)
+            cls.sampling_thread.start()
+
+
+    @classmethod
+    def Disable(cls):
+        """
+        Disables the timers and counters, and stops the profiler and the sampling if any
+        """
+
+        cls.enabled = False
+        cls.sampling_thread = None
+        cls.StopProfiler()
+
+
+    @classmethod
+    def Log(cls, message: str):
+        """
+        Prints the provided progress message with the current time
+        """
+
+        if(cls.verbose):
+            print(datetime.now().strftime("%H:%M:%S") + ": " + message)
+
+
+    @classmethod
+    def Stage(cls, stage: str):
+        """
+        Returns a context manager adding the time spent in its block to the timer of the provided stage
+        """
+
+        if(not cls.enabled):
+            return cls.no_stage_timer
+
+        return StageTimer(stage)
+
+
+    @classmethod
+    def AddTime(cls, stage: str, duration: float):
+        """
+        Adds the provided duration, in seconds, to the timer of the provided stage
+        """
+
+        if(cls.enabled):
+            cls.timers[stage] = cls.timers.get(stage, 0.0) + duration
+
+
+    @classmethod
+    def Count(cls, counter: str, value: int = 1):
+        """
+        Adds the provided value to the provided counter
+        """
+
+        if(cls.enabled):
+            cls.counters[counter] = cls.counters.get(counter, 0) + value
+
+
+    @classmethod
+    def GetRateSuffix(cls):
+        """
+        Returns the number of lines read per second since the instrumentation was enabled, as a message suffix,
+        or an empty string if it's disabled
+        """
+
+        elapsed_time = time.perf_counter() - cls.start_time
+        if(not cls.enabled or elapsed_time <= 0):
+            return ""
+
+        return " (" + str(round(cls.counters.get("lines", 0) / elapsed_time)) + " lines/s)"
+
+
+    @classmethod
+    def GetReport(cls):
+        """
+        Returns the metrics as a dictionary: elapsed time, time of each stage, counters,
+        rates (lines per second overall and per stage) and most sampled functions
+        """
+
+        elapsed_time = time.perf_counter() - cls.start_time
+        lines_cnt = cls.counters.get("lines", 0)
+
+        return {
+            "elapsed": elapsed_time,
+            "stages": dict(cls.timers),
+            "counters": dict(cls.counters),
+            "rates": {
+                "lines_per_second": lines_cnt / elapsed_time if elapsed_time > 0 else 0.0,
+                "stage_lines_per_second": {stage: lines_cnt / duration for stage, duration in cls.timers.items() if duration > 0}
+            },
+            "samples": dict(sorted(cls.samples.items(), key=lambda item: -item[1])[0:50])
+        }
+
+
+    @classmethod
+    def Dump(cls, file_name: str):
+        """
+        Writes the metrics in the provided JSON file
+        """
+
+        with open(file_name, "w") as file:
+            json.dump(cls.GetReport(), file, indent=2)
+
+
+    @classmethod
+    def StopProfiler(cls):
+        """
+        Stops the profiler, if any, and writes its statistics
+        """
+
+        if(cls.profiler == None):
+            return
+
+        cls.profiler.disable()
+        cls.profiler.dump_stats(cls.profile_file_name)
+        cls.profiler = None
+
+
+    @classmethod
+    def SampleMainThread(cls, thread_id: int, sampling_interval: float):
+        """
+        Counts the function executed by the provided thread at the provided interval, until the sampling is stopped
+        """
+
+        sampling_thread = threading.current_thread()
+        while cls.sampling_thread is sampling_thread:
+            frame = sys._current_frames().get(thread_id)
+            if(frame == None):
+                break
+
+            function = os.path.basename(frame.f_code.co_filename) + ":" + frame.f_code.co_name
+            cls.samples[function] = cls.samples.get(function, 0) + 1
+
+            time.sleep(sampling_interval)
@@ -0,0 +1,311 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements a streaming reader of BGZF (blocked gzip) files, as produced by bgzip.
+"""
+
+
+from threading import Thread, Event
+from queue import Queue, Full
+
+import struct
+import zlib
+
+
+class BgzfReader:
+    """
+    Implements a streaming reader of BGZF (blocked gzip) files, as produced by bgzip.
+    A BGZF file is a concatenation of independent gzip blocks of at most 64 KB,
+    each block storing its own compressed size in a 'BC' extra subfield.
+    Decompression can run in a background thread so that it overlaps with parsing.
+    """
+
+
+    # size of the fixed part of a gzip header, up to the XLEN field
+    HEADER_SIZE = 12
+
+    # size of the gzip footer (CRC32 + ISIZE)
+    FOOTER_SIZE = 8
+
+    # size of the buffer used to read compressed data
+    BUFFER_SIZE = 4 * 1024 * 1024
+
+
+    # Constructor
+
+    def __init__(self, file_name: str, start_offset: int = 0, length: int = -1, skip_first_line: bool = False, threaded: bool = True, queue_size: int = 64, **kwargs):
+        """
+        Constructor
+        Only the lines starting in the first length bytes of decompressed data after
+        the block at start_offset are read (all the lines if length is negative).
+        If skip_first_line is True, the first (partial) line is skipped.
+        """
+
+        self.file_name = file_name
+        self.start_offset = start_offset
+        self.length = length
+        self.skip_first_line = skip_first_line
+        self.threaded = threaded
+        self.queue_size = queue_size
+
+        self.file = open(file_name, "rb", buffering=self.BUFFER_SIZE)
+
+        # used to stop the decompression thread when the reader is closed before the end of the file
+        self.stop_event = Event()
+
+
+
+    # Methods
+
+    @staticmethod
+    def IsGzip(file_name: str):
+        """
+        Returns a boolean indicating whether the provided file is gzip-compressed
+        """
+
+        file = open(file_name, "rb")
+        magic = file.read(2)
+        file.close()
+
+        return magic == b"\x1f\x8b"
+
+
+    @staticmethod
+    def IsBgzf(file_name: str):
+        """
+        Returns a boolean indicating whether the provided file is BGZF-compressed
+        """
+
+        file = open(file_name, "rb")
+        header = file.read(BgzfReader.HEADER_SIZE + 6)
+        file.close()
+
+        return BgzfReader.ParseBlockSize(header) != None
+
+
+    @staticmethod
+    def ParseBlockSize(header: bytes):
+        """
+        Returns the total size of the BGZF block starting with the provided header,
+        or None if the header isn't a BGZF block header
+        """
+
+        if(len(header) < BgzfReader.HEADER_SIZE + 6 or header[0:4] != b"\x1f\x8b\x08\x04"):
+            return None
+
+        # the BC subfield is the first (and usually only) extra subfield written by bgzip
+        subfield_id, subfield_length, block_size = struct.unpack("<2sHH", header[BgzfReader.HEADER_SIZE:BgzfReader.HEADER_SIZE + 6])
+        if(subfield_id != b"BC" or subfield_length != 2):
+            return None
+
+        return block_size + 1
+
+
+    @staticmethod
+    def ReadBlockOffsets(file_name: str):
+        """
+        Returns the list of (compressed offset, decompressed size) of the blocks of the provided
+        BGZF file, without decompressing them. Blocks are independent, so their offsets can be used
+        as split points for parallel readers.
+        """
+
+        block_offsets = []
+
+        file = open(file_name, "rb")
+        offset = 0
+        while True:
+            file.seek(offset)
+            header = file.read(BgzfReader.HEADER_SIZE + 6)
+            if(not header):
+                break
+            block_size = BgzfReader.ParseBlockSize(header)
+            if(block_size == None):
+                raise Exception("Invalid BGZF block at offset " + str(offset) + " in file " + file_name)
+            file.seek(offset + block_size - 4)
+            decompressed_size = struct.unpack("<I", file.read(4))[0]
+            block_offsets.append((offset, decompressed_size))
+            offset += block_size
+        file.close()
+
+        return block_offsets
+
+
+    def ReadBlock(self):
+        """
+        Reads and decompresses the next block of the file
+        Returns None at the end of the file
+        """
+
+        header = self.file.read(self.HEADER_SIZE + 6)
+        if(not header):
+            return None
+
+        block_size = self.ParseBlockSize(header)
+        if(block_size == None):
+            raise Exception("Invalid BGZF block in file " + self.file_name)
+
+        extra_length = struct.unpack("<H", header[10:12])[0]
+        data = self.file.read(block_size - len(header))
+        compressed_data = data[extra_length - 6:len(data) - self.FOOTER_SIZE]
+
+        return zlib.decompress(compressed_data, -15)
+
+
+    def ReadBlockAt(self, offset: int):
+        """
+        Reads and decompresses the block at the provided compressed offset
+        """
+
+        self.file.seek(offset)
+        return self.ReadBlock()
+
+
+    def ReadBlocks(self):
+        """
+        Yields the decompressed blocks of the file, starting at start_offset
+        """
+
+        self.file.seek(self.start_offset)
+
+        if(not self.threaded):
+            block = self.ReadBlock()
+            while block != None:
+                yield block
+                block = self.ReadBlock()
+            return
+
+        # decompression runs in a background thread, with a bounded queue as buffer
+        blocks = Queue(maxsize=self.queue_size)
+        thread = Thread(target=self.decompressBlocks, args=(blocks,), daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                block = blocks.get()
+                if(isinstance(block, Exception)):
+                    raise block
+                if(block == None):
+                    break
+                yield block
+        finally:
+            self.stop_event.set()
+            thread.join()
+
+
+    def decompressBlocks(self, blocks: Queue):
+        """
+        Decompresses the blocks of the file in the provided queue, until the end of the file
+        or until the reader is closed
+        """
+
+        try:
+            block = self.ReadBlock()
+            while block != None:
+                if(not self.putBlock(blocks, block)):
+                    return
+                block = self.ReadBlock()
+        except Exception as exception:
+            block = exception
+
+        self.putBlock(blocks, block)
+
+
+    def putBlock(self, blocks: Queue, block):
+        """
+        Puts the provided block in the queue, waiting for free space unless the reader is closed
+        Returns False if the reader has been closed
+        """
+
+        while not self.stop_event.is_set():
+            try:
+                blocks.put(block, timeout=0.1)
+                return True
+            except Full:
+                pass
+
+        return False
+
+
+    def ReadLines(self):
+        """
+        Yields the lines of the file, which may span over several blocks
+        """
+
+        # position of the current line in the decompressed data, in bytes
+        position = 0
+        remainder = b""
+        is_first_line = True
+
+        for block in self.ReadBlocks():
+            data = remainder + block
+            last_line_end = data.rfind(b"\n") + 1
+            remainder = data[last_line_end:]
+
+            for line in data[0:last_line_end].split(b"\n")[0:-1]:
+                line_start = position
+                position += len(line) + 1
+                if(is_first_line):
+                    is_first_line = False
+                    if(self.skip_first_line):
+                        continue
+
+                if(self.length >= 0 and line_start >= self.length):
+                    return
+                yield line.decode("utf-8") + "\n"
+
+        if(len(remainder) > 0 and not (is_first_line and self.skip_first_line) and (self.length < 0 or position < self.length)):
+            yield remainder.decode("utf-8")
+
+
+    def ReadChunkLines(self, virtual_start: int, virtual_end: int):
+        """
+        Yields the lines starting in the chunk [virtual_start, virtual_end) of virtual offsets,
+        a virtual offset being the compressed offset of a block shifted by 16 bits
+        plus the offset of the line in the decompressed block
+        """
+
+        block_offset = virtual_start >> 16
+        position = virtual_start & 0xFFFF
+        line_start = virtual_start
+        remainder = b""
+
+        self.file.seek(block_offset)
+        block = self.ReadBlock()
+
+        while block != None:
+            next_block_offset = self.file.tell()
+
+            line_end = block.find(b"\n", position)
+            while line_end != -1:
+                if(line_start >= virtual_end):
+                    return
+                yield (remainder + block[position:line_end + 1]).decode("utf-8")
+                remainder = b""
+                position = line_end + 1
+                line_start = (next_block_offset << 16) if position == len(block) else ((block_offset << 16) | position)
+                line_end = block.find(b"\n", position)
+
+            remainder += block[position:]
+            block_offset = next_block_offset
+            position = 0
+            block = self.ReadBlock()
+
+        if(len(remainder) > 0 and line_start < virtual_end):
+            yield remainder.decode("utf-8")
+
+
+    def __iter__(self):
+        """
+        Iterates over the lines of the file
+        """
+        return self.ReadLines()
+
+
+    def close(self):
+        """
+        Closes the reader
+        """
+
+        self.stop_event.set()
+        self.file.close()
@@ -0,0 +1,211 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements an on-disk cache of the genotype blocks of VCF files.
+"""
+
+
+from Generators.GenotypeCacheWriter import GenotypeCacheWriter
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+
+class GenotypeCache:
+    """
+    Implements an on-disk cache of the genotype blocks of VCF files.
+    Entries are keyed by a fingerprint of the VCF file (size, modification time and hashes of sampled
+    byte ranges) and by the individuals decoded, so that runs with another population file
+    replay the decoded genotypes instead of parsing the VCF file again.
+    An entry can be used by any run whose individuals are all stored in it.
+    The total size of the entries is bounded, least recently used entries being evicted first.
+    """
+
+
+    # name of the file describing the entries of the cache
+    INDEX_FILE_NAME = "index.json"
+
+    # name of the file describing the blocks of an entry, in the directory of the entry
+    ENTRY_FILE_NAME = "entry.json"
+
+    # number and size of the byte ranges hashed in the fingerprint of a file
+    FINGERPRINT_RANGES_CNT = 16
+    FINGERPRINT_RANGE_SIZE = 65536
+
+
+    # Constructor
+
+    def __init__(self, directory: str, max_size: int = 10 * 1024 ** 3, all_samples: bool = False, **kwargs):
+        """
+        Constructor
+        max_size: maximal total size of the entries, in bytes
+        If all_samples is True, new entries store all the individuals of the VCF file, so that they can be used
+        whatever the population file, otherwise only the individuals selected by the generators are stored
+        """
+
+        self.directory = directory
+        self.max_size = max_size
+        self.all_samples = all_samples
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # description of each entry per identifier: fingerprint, individuals, size and time of last access
+        self.entries = self.ReadIndex()
+
+
+
+    # Getters
+
+    def GetSize(self):
+        """
+        Returns the total size of the entries, in bytes
+        """
+        return sum(entry["size"] for entry in self.entries.values())
+
+
+
+    # Methods
+
+    def ComputeFingerprint(self, file_name: str):
+        """
+        Returns the fingerprint of the provided file: its size, its modification time
+        and the hash of byte ranges spread over the whole file
+        """
+
+        stat = os.stat(file_name)
+
+        file_hash = hashlib.sha1()
+        with open(file_name, "rb") as file:
+            for i in range(0, self.FINGERPRINT_RANGES_CNT):
+                file.seek(max(0, stat.st_size - self.FINGERPRINT_RANGE_SIZE) * i // (self.FINGERPRINT_RANGES_CNT - 1))
+                file_hash.update(file.read(self.FINGERPRINT_RANGE_SIZE))
+
+        return str(stat.st_size) + "-" + str(stat.st_mtime_ns) + "-" + file_hash.hexdigest()
+
+
+    def Find(self, file_name: str, sample_selection: np.ndarray):
+        """
+        Returns the identifier of an entry of the provided file storing all the provided individuals
+        (all the individuals of the file if None), or None if there is no such entry
+        """
+
+        fingerprint = self.ComputeFingerprint(file_name)
+
+        for entry_id, entry in self.entries.items():
+            if(entry["fingerprint"] != fingerprint):
+                continue
+            if(entry["samples"] == None or (sample_selection is not None and np.isin(sample_selection, entry["samples"]).all())):
+                entry["last_access"] = time.time()
+                self.WriteIndex()
+                return entry_id
+
+        return None
+
+
+    def CreateWriter(self, file_name: str, sample_selection: np.ndarray):
+        """
+        Returns the generator writing a new entry of the provided file with the provided individuals
+        The entry is only part of the cache once committed
+        """
+
+        if(self.all_samples):
+            sample_selection = None
+
+        fingerprint = self.ComputeFingerprint(file_name)
+        entry_id = hashlib.sha1((fingerprint + str(None if sample_selection is None else sample_selection.tolist())).encode()).hexdigest()
+
+        # the entry is written in a temporary directory, renamed when committed
+        directory = os.path.join(self.directory, entry_id + ".tmp")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+        return GenotypeCacheWriter(directory, entry_id, fingerprint, sample_selection)
+
+
+    def Commit(self, writer: GenotypeCacheWriter):
+        """
+        Adds the entry written by the provided generator to the cache, then evicts the least recently used
+        entries until the total size of the entries is under the limit
+        """
+
+        writer.GenerateOutputfile(os.path.join(writer.directory, self.ENTRY_FILE_NAME))
+
+        directory = os.path.join(self.directory, writer.entry_id)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(writer.directory, directory)
+
+        self.entries[writer.entry_id] = {
+            "fingerprint": writer.fingerprint,
+            "samples": None if writer.GetSampleSelection() is None else writer.GetSampleSelection().tolist(),
+            "size": writer.size,
+            "last_access": time.time()
+        }
+
+        self.Evict()
+        self.WriteIndex()
+
+
+    def Discard(self, writer: GenotypeCacheWriter):
+        """
+        Removes the files of the entry written by the provided generator, which won't be part of the cache
+        """
+        shutil.rmtree(writer.directory, ignore_errors=True)
+
+
+    def Evict(self):
+        """
+        Removes the least recently used entries until the total size of the entries is under the limit
+        """
+
+        for entry_id in sorted(self.entries, key=lambda entry_id: self.entries[entry_id]["last_access"]):
+            if(self.GetSize() <= self.max_size):
+                break
+            shutil.rmtree(os.path.join(self.directory, entry_id), ignore_errors=True)
+            del self.entries[entry_id]
+
+
+    def ReadBlocks(self, entry_id: str):
+        """
+        Yields the genotype blocks of the provided entry, in the order of the variant call set
+        """
+
+        directory = os.path.join(self.directory, entry_id)
+        with open(os.path.join(directory, self.ENTRY_FILE_NAME), "r") as file:
+            block_file_names = json.load(file)["blocks"]
+
+        for block_file_name in block_file_names:
+            with np.load(os.path.join(directory, block_file_name)) as arrays:
+                sample_indices = arrays["sample_indices"] if "sample_indices" in arrays else None
+                yield GenotypeBlock(arrays["fixed_fields"].tolist(), arrays["alleles"], arrays["phased_bits"], sample_indices)
+
+
+    def ReadIndex(self):
+        """
+        Returns the description of the entries of the cache, ignoring the entries whose directory was removed
+        """
+
+        index_file_name = os.path.join(self.directory, self.INDEX_FILE_NAME)
+        if(not os.path.exists(index_file_name)):
+            return {}
+
+        with open(index_file_name, "r") as file:
+            entries = json.load(file)
+
+        return {entry_id: entry for entry_id, entry in entries.items() if os.path.isdir(os.path.join(self.directory, entry_id))}
+
+
+    def WriteIndex(self):
+        """
+        Writes the description of the entries of the cache
+        """
+
+        index_file_name = os.path.join(self.directory, self.INDEX_FILE_NAME)
+        with open(index_file_name + ".tmp", "w") as file:
+            json.dump(self.entries, file)
+        os.replace(index_file_name + ".tmp", index_file_name)
@@ -0,0 +1,181 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements a reader of columnar binary genotype stores.
+"""
+
+
+from Generators.GenotypeStoreGenerator import GenotypeStoreGenerator
+from VariantCallSet.GenotypeBlock import GenotypeBlock
+
+import json
+import math
+import struct
+import numpy as np
+
+
+class GenotypeStoreReader:
+    """
+    Implements a reader of columnar binary genotype stores (see GenotypeStoreGenerator).
+    The store is memory-mapped: columns of each chunk are views on the file, and only the
+    individuals of the requested selection are unpacked into genotype blocks.
+    The ID field of the variant calls of the blocks is "." and their FORMAT field is "GT", since they aren't stored.
+    Stores written before QUAL, FILTER and INFO were stored only have CHROM, POS, REF and ALT columns:
+    the other fields of their variant calls are "." too (see GetFields).
+    """
+
+
+    # Constructor
+
+    def __init__(self, file_name: str, **kwargs):
+        """
+        Constructor
+        """
+
+        self.file_name = file_name
+
+        # bytes of the whole store, mapped in memory
+        self.data = np.memmap(file_name, dtype=np.uint8, mode="r")
+
+        magic_length = len(GenotypeStoreGenerator.MAGIC)
+        if(bytes(self.data[0:magic_length]) != GenotypeStoreGenerator.MAGIC or bytes(self.data[-magic_length:]) != GenotypeStoreGenerator.MAGIC):
+            raise Exception("File " + file_name + " is not a genotype store")
+
+        index_offset = struct.unpack("<Q", bytes(self.data[-magic_length - 8:-magic_length]))[0]
+        index = json.loads(bytes(self.data[index_offset:-magic_length - 8]).decode("utf-8"))
+
+        # names of the individuals and raw header lines of the variant call set
+        self.sample_names = index["sample_names"]
+        self.header_lines = index["header_lines"]
+
+        # standard fields stored in the chunks
+        self.fields = index.get("fields", ["CHROM", "POS", "REF", "ALT"])
+
+        # description of each chunk: number of variant calls and offset, dtype and shape of each column
+        self.chunks = index["chunks"]
+
+
+
+    # Getters
+
+    def GetHeaderLines(self):
+        """
+        Returns the raw header lines of the variant call set of the store
+        """
+        return self.header_lines
+
+
+    def GetFields(self):
+        """
+        Returns the names of the standard fields stored, the other ones being "." in the genotype blocks read
+        """
+        return self.fields
+
+
+    def GetNumberOfVariants(self):
+        """
+        Returns the number of variant calls of the store
+        """
+        return sum(chunk["variants"] for chunk in self.chunks)
+
+
+
+    # Methods
+
+    @staticmethod
+    def IsGenotypeStore(file_name: str):
+        """
+        Returns True if the provided file is a genotype store
+        """
+
+        with open(file_name, "rb") as file:
+            return file.read(len(GenotypeStoreGenerator.MAGIC)) == GenotypeStoreGenerator.MAGIC
+
+
+    def GetColumn(self, chunk: dict, name: str):
+        """
+        Returns the view of the provided column of the provided chunk
+        """
+
+        column = chunk["columns"][name]
+        dtype = np.dtype(column["dtype"])
+        size = int(np.prod(column["shape"])) * dtype.itemsize
+
+        return self.data[column["offset"]:column["offset"] + size].view(dtype).reshape(column["shape"])
+
+
+    def GetStrings(self, chunk: dict, name: str):
+        """
+        Returns the list of the strings of the provided column of the provided chunk, stored as bytes and offsets,
+        or a list of "." if the column isn't stored
+        """
+
+        if(not name in chunk["columns"]):
+            return ["."] * chunk["variants"]
+
+        offsets = self.GetColumn(chunk, name + "_offsets").tolist()
+        values = bytes(self.GetColumn(chunk, name))
+
+        return [values[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(0, len(offsets) - 1)]
+
+
+    def GetQualities(self, chunk: dict):
+        """
+        Returns the list of the QUAL fields of the provided chunk, "." for missing values or if they aren't stored
+        """
+
+        if(not "QUAL" in chunk["columns"]):
+            return ["."] * chunk["variants"]
+
+        return ["." if math.isnan(quality) else str(int(quality)) if quality.is_integer() else repr(quality) for quality in self.GetColumn(chunk, "QUAL").tolist()]
+
+
+    def ReadBlock(self, chunk: dict, sample_selection: np.ndarray = None):
+        """
+        Returns the genotype block of the provided chunk, with the provided individuals only (all of them if None)
+        """
+
+        samples_cnt = chunk["samples"]
+        packed_genotypes = self.GetColumn(chunk, "genotypes")
+        phased_bits = self.GetColumn(chunk, "phased")
+
+        if(sample_selection is None):
+            sample_indices = np.arange(samples_cnt)
+        else:
+            sample_indices = sample_selection[sample_selection < samples_cnt]
+
+        # each byte holds the alleles of 2 individuals, the first individual on the high bits
+        shifts = np.where((sample_indices % 2 == 0)[:, np.newaxis], [6, 4], [2, 0]).astype(np.uint8)
+        codes = (packed_genotypes[:, sample_indices // 2][:, :, np.newaxis] >> shifts) & 3
+
+        alleles = codes.astype(np.int8)
+        alleles[codes == GenotypeStoreGenerator.MISSING_CODE] = GenotypeBlock.MISSING_ALLELE
+
+        if(sample_selection is None):
+            phased_bits = np.array(phased_bits)
+        else:
+            phased_bits = np.packbits(np.unpackbits(phased_bits, axis=1, count=samples_cnt)[:, sample_indices], axis=1)
+
+        fixed_fields = [[chrom.decode("utf-8"), str(pos), ".", ref.decode("utf-8"), alt.decode("utf-8"), quality, filter, info, "GT"]
+                        for chrom, pos, ref, alt, quality, filter, info in zip(self.GetColumn(chunk, "CHROM").tolist(), self.GetColumn(chunk, "POS").tolist(), self.GetColumn(chunk, "REF").tolist(),
+                                                                              self.GetColumn(chunk, "ALT").tolist(), self.GetQualities(chunk), self.GetStrings(chunk, "FILTER"), self.GetStrings(chunk, "INFO"))]
+
+        return GenotypeBlock(fixed_fields, alleles, phased_bits, None if sample_selection is None else sample_indices)
+
+
+    def IterateBlocks(self, sample_selection: np.ndarray = None):
+        """
+        Yields the genotype blocks of the store, with the provided individuals only (all of them if None)
+        """
+
+        for chunk in self.chunks:
+            yield self.ReadBlock(chunk, sample_selection)
+
+
+    def close(self):
+        """
+        Releases the mapping of the store
+        """
+
+        self.data = None
@@ -0,0 +1,145 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements a reader of the lines of a text file reading ahead in a background thread.
+"""
+
+
+from threading import Thread, Event
+from queue import Queue, Full
+
+
+class ReadAheadReader:
+    """
+    Implements a reader of the lines of a text file reading ahead in a background thread.
+    The thread reads the lines of the file by chunks of about chunk_size characters, cut at line breaks
+    (see io.IOBase.readlines), and hands them to the reader through a bounded queue of queue_size chunks,
+    so that waiting for the file (slow or network file systems, decompression) overlaps with parsing.
+    The thread waits while the queue is full, so that at most queue_size chunks are held in memory:
+    reading only keeps overlapping with the processing of a genotype block if they hold more than a block.
+    Exceptions raised while reading are raised again in the reader, and the thread is stopped when the reader
+    is closed, even before the end of the file.
+    Files without a readlines method (see BgzfReader) are read line by line in the thread, by chunks of lines.
+    """
+
+
+    # default number of characters read at once
+    CHUNK_SIZE = 4 * 1024 * 1024
+
+    # default number of chunks read ahead
+    QUEUE_SIZE = 4
+
+
+    # Constructor
+
+    def __init__(self, file, chunk_size: int = CHUNK_SIZE, queue_size: int = QUEUE_SIZE, **kwargs):
+        """
+        Constructor
+        The provided file, opened in text mode, is closed with the reader
+        Opening it with a buffer of chunk_size bytes makes the reads of the thread as large as the chunks
+        """
+
+        self.file = file
+        self.chunk_size = chunk_size
+
+        # chunks of lines read ahead, then None at the end of the file or the exception raised while reading
+        self.chunks = Queue(maxsize=queue_size)
+
+        # used to stop the reading thread when the reader is closed before the end of the file
+        self.stop_event = Event()
+
+        self.thread = Thread(target=self.readChunks, daemon=True)
+        self.thread.start()
+
+
+
+    # Methods
+
+    def ReadChunks(self):
+        """
+        Yields the lists of lines of the successive chunks of the file
+        """
+
+        readlines = getattr(self.file, "readlines", None)
+        if(readlines != None):
+            lines = readlines(self.chunk_size)
+            while len(lines) > 0:
+                yield lines
+                lines = readlines(self.chunk_size)
+            return
+
+        lines = []
+        characters_cnt = 0
+        for line in self.file:
+            lines.append(line)
+            characters_cnt += len(line)
+            if(characters_cnt >= self.chunk_size):
+                yield lines
+                lines = []
+                characters_cnt = 0
+        if(len(lines) > 0):
+            yield lines
+
+
+    def readChunks(self):
+        """
+        Reads the chunks of the file in the queue, until the end of the file or until the reader is closed
+        """
+
+        try:
+            for lines in self.ReadChunks():
+                if(not self.putChunk(lines)):
+                    return
+            chunk = None
+        except Exception as exception:
+            chunk = exception
+
+        self.putChunk(chunk)
+
+
+    def putChunk(self, chunk):
+        """
+        Puts the provided chunk in the queue, waiting for free space unless the reader is closed
+        Returns False if the reader has been closed
+        """
+
+        while not self.stop_event.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return True
+            except Full:
+                pass
+
+        return False
+
+
+    def ReadLines(self):
+        """
+        Yields the lines of the file, as they are read by the thread
+        """
+
+        while True:
+            chunk = self.chunks.get()
+            if(isinstance(chunk, Exception)):
+                raise chunk
+            if(chunk == None):
+                return
+            yield from chunk
+
+
+    def __iter__(self):
+        """
+        Iterates over the lines of the file
+        """
+        return self.ReadLines()
+
+
+    def close(self):
+        """
+        Stops the reading thread and closes the file
+        """
+
+        self.stop_event.set()
+        self.thread.join()
+        self.file.close()
@@ -0,0 +1,169 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Represents a set of genomic regions used to restrict the reading of a VCF file.
+"""
+
+
+from bisect import bisect_right
+
+import os
+
+
+class Regions:
+    """
+    Represents a set of genomic regions used to restrict the reading of a VCF file.
+    Regions are stored per chromosome as sorted, non-overlapping intervals
+    of 1-based inclusive positions.
+    """
+
+
+    # end position used for regions covering a whole chromosome
+    MAX_POSITION = 2**31 - 1
+
+
+    # Constructor
+
+    def __init__(self, **kwargs):
+        """
+        Constructor
+        """
+
+        # dictionary of intervals (start, end) per chromosome
+        self.intervals = {}
+
+        # start positions of the intervals per chromosome, used for lookups
+        self.starts = {}
+
+
+
+    # Getters
+
+    def GetChromosomes(self):
+        """
+        Returns the list of chromosomes having at least one region, in insertion order
+        """
+        return list(self.intervals.keys())
+
+
+    def GetIntervals(self, chrom: str):
+        """
+        Returns the sorted list of intervals (start, end) of the provided chromosome
+        """
+        return self.intervals.get(chrom, [])
+
+
+
+    # Methods
+
+    @staticmethod
+    def FromArgument(regions):
+        """
+        Creates the regions from the provided argument, which can be:
+        - the name of a BED file
+        - a region string: "chr1", "chr1:1000-2000" or "chr1:1000" (1-based, inclusive)
+        - a list of region strings or of tuples (chrom, start, end) (1-based, inclusive)
+        """
+
+        if(isinstance(regions, Regions)):
+            return regions
+
+        result = Regions()
+
+        if(isinstance(regions, str)):
+            if(os.path.isfile(regions)):
+                result.ReadBedFile(regions)
+                result.Normalize()
+                return result
+            regions = [regions]
+
+        for region in regions:
+            if(isinstance(region, str)):
+                result.AddRegion(*Regions.ParseRegion(region))
+            else:
+                result.AddRegion(*region)
+
+        result.Normalize()
+        return result
+
+
+    @staticmethod
+    def ParseRegion(region: str):
+        """
+        Parses the provided region string into a tuple (chrom, start, end)
+        """
+
+        chrom, separator, interval = region.rpartition(":")
+        if(separator == "" or chrom == ""):
+            return region, 1, Regions.MAX_POSITION
+
+        interval_parts = interval.replace(",", "").split("-")
+        try:
+            start = int(interval_parts[0])
+            end = int(interval_parts[1]) if len(interval_parts) > 1 and interval_parts[1] != "" else Regions.MAX_POSITION
+        except ValueError:
+            # the colon is part of the chromosome name
+            return region, 1, Regions.MAX_POSITION
+
+        return chrom, start, end
+
+
+    def ReadBedFile(self, file_name: str):
+        """
+        Reads the regions of the provided BED file (0-based, half-open intervals)
+        """
+
+        file = open(file_name, "r")
+
+        for line in file:
+            if(line.startswith("#") or line.startswith("track") or line.startswith("browser") or line.strip() == ""):
+                continue
+
+            line_parts = line.split()
+            if(len(line_parts) < 3):
+                raise Exception("Wrong format for BED line \"" + line + "\"")
+
+            self.AddRegion(line_parts[0], int(line_parts[1]) + 1, int(line_parts[2]))
+
+        file.close()
+
+
+    def AddRegion(self, chrom: str, start: int, end: int):
+        """
+        Adds the provided region (1-based, inclusive)
+        """
+
+        if(not chrom in self.intervals):
+            self.intervals[chrom] = []
+        self.intervals[chrom].append((int(start), int(end)))
+
+
+    def Normalize(self):
+        """
+        Sorts and merges the overlapping intervals of each chromosome
+        """
+
+        for chrom, intervals in self.intervals.items():
+            merged_intervals = []
+            for start, end in sorted(intervals):
+                if(len(merged_intervals) > 0 and start <= merged_intervals[-1][1] + 1):
+                    merged_intervals[-1] = (merged_intervals[-1][0], max(merged_intervals[-1][1], end))
+                else:
+                    merged_intervals.append((start, end))
+            self.intervals[chrom] = merged_intervals
+            self.starts[chrom] = [start for start, end in merged_intervals]
+
+
+    def Contains(self, chrom: str, pos: int):
+        """
+        Returns a boolean indicating whether the provided position is in one of the regions
+        """
+
+        starts = self.starts.get(chrom)
+        if(starts == None):
+            return False
+
+        index = bisect_right(starts, pos) - 1
+
+        return index >= 0 and pos <= self.intervals[chrom][index][1]
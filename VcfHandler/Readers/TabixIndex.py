@@ -0,0 +1,211 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements a reader of tabix (.tbi) and CSI (.csi) indices of BGZF-compressed VCF files.
+"""
+
+
+import gzip
+import os
+import struct
+
+
+class TabixIndex:
+    """
+    Implements a reader of tabix (.tbi) and CSI (.csi) indices of BGZF-compressed VCF files.
+    Both indices are binning indices: each reference sequence is divided in hierarchical bins,
+    each bin lists chunks of virtual offsets (compressed block offset << 16 | offset in block)
+    of the records overlapping the bin.
+    """
+
+
+    # binning parameters of tabix indices
+    TBI_MIN_SHIFT = 14
+    TBI_DEPTH = 5
+
+
+    # Constructor
+
+    def __init__(self, file_name: str, **kwargs):
+        """
+        Constructor
+        """
+
+        self.file_name = file_name
+
+        # dictionary of the index of each reference sequence, per name
+        self.reference_indices = {}
+
+        self.min_shift = self.TBI_MIN_SHIFT
+        self.depth = self.TBI_DEPTH
+
+        # True for CSI indices, whose bins store their own minimal offset instead of a linear index
+        self.is_csi = False
+
+        self.ReadIndex()
+
+
+
+    # Methods
+
+    @staticmethod
+    def Open(vcf_file_name: str):
+        """
+        Opens the index lying next to the provided VCF file, or returns None if there is none
+        """
+
+        for extension in [".tbi", ".csi"]:
+            if(os.path.isfile(vcf_file_name + extension)):
+                return TabixIndex(vcf_file_name + extension)
+
+        return None
+
+
+    def ReadIndex(self):
+        """
+        Reads the index file
+        """
+
+        file = gzip.open(self.file_name, "rb")
+        data = file.read()
+        file.close()
+
+        self.data = data
+        self.offset = 0
+
+        magic = data[0:4]
+        self.offset = 4
+        if(magic == b"TBI\x01"):
+            n_ref = self.readInt("<i")
+            names = self.readTabixHeader()
+        elif(magic == b"CSI\x01"):
+            self.is_csi = True
+            self.min_shift = self.readInt("<i")
+            self.depth = self.readInt("<i")
+            aux_length = self.readInt("<i")
+            aux_end = self.offset + aux_length
+            names = self.readTabixHeader() if aux_length > 0 else []
+            self.offset = aux_end
+            n_ref = self.readInt("<i")
+        else:
+            raise Exception("Unknown index format for file " + self.file_name)
+
+        for i in range(0, n_ref):
+            bins = {}
+            n_bin = self.readInt("<i")
+            for j in range(0, n_bin):
+                bin_number = self.readInt("<I")
+                min_offset = self.readInt("<Q") if self.is_csi else 0
+                n_chunk = self.readInt("<i")
+                chunks = list(struct.iter_unpack("<QQ", data[self.offset:self.offset + 16 * n_chunk]))
+                self.offset += 16 * n_chunk
+                bins[bin_number] = (min_offset, chunks)
+
+            linear_index = []
+            if(not self.is_csi):
+                n_intv = self.readInt("<i")
+                linear_index = [offset[0] for offset in struct.iter_unpack("<Q", data[self.offset:self.offset + 8 * n_intv])]
+                self.offset += 8 * n_intv
+
+            name = names[i] if i < len(names) else str(i)
+            self.reference_indices[name] = (bins, linear_index)
+
+        del self.data
+
+
+    def readInt(self, int_format: str):
+        """
+        Reads an integer in the provided struct format at the current offset of the index data
+        """
+
+        value = struct.unpack_from(int_format, self.data, self.offset)[0]
+        self.offset += struct.calcsize(int_format)
+        return value
+
+
+    def readTabixHeader(self):
+        """
+        Reads the tabix header (format, columns, meta character, skipped lines, sequence names)
+        at the current offset of the index data and returns the sequence names
+        """
+
+        self.offset += 6 * 4
+        names_length = self.readInt("<i")
+        names = self.data[self.offset:self.offset + names_length].split(b"\x00")
+        self.offset += names_length
+
+        return [name.decode("utf-8") for name in names if len(name) > 0]
+
+
+    def RegionToBins(self, begin: int, end: int):
+        """
+        Returns the list of bins overlapping the provided 0-based, half-open interval
+        """
+
+        bins = []
+
+        end -= 1
+        shift = self.min_shift + 3 * self.depth
+        first_bin = 0
+        for level in range(0, self.depth + 1):
+            bins.extend(range(first_bin + (begin >> shift), first_bin + (end >> shift) + 1))
+            shift -= 3
+            first_bin += 1 << (3 * level)
+
+        return bins
+
+
+    def MinimalOffset(self, bins: dict, linear_index: list, begin: int):
+        """
+        Returns the minimal virtual offset of the records overlapping position begin
+        """
+
+        if(not self.is_csi):
+            if(len(linear_index) == 0):
+                return 0
+            return linear_index[min(begin >> self.TBI_MIN_SHIFT, len(linear_index) - 1)]
+
+        # the bin of the deepest level containing begin, or its closest existing left neighbour or ancestor
+        bin_number = (((1 << (3 * self.depth)) - 1) // 7) + (begin >> self.min_shift)
+        while bin_number > 0 and not bin_number in bins:
+            first_bin = (((bin_number - 1) >> 3) << 3) + 1
+            if(bin_number > first_bin):
+                bin_number -= 1
+            else:
+                bin_number = (bin_number - 1) >> 3
+
+        return bins[bin_number][0] if bin_number in bins else 0
+
+
+    def Query(self, chrom: str, intervals: list):
+        """
+        Returns the sorted and merged list of chunks (virtual start, virtual end) containing
+        the records of the provided chromosome overlapping the provided intervals (1-based, inclusive)
+        """
+
+        if(not chrom in self.reference_indices):
+            return []
+
+        bins, linear_index = self.reference_indices[chrom]
+        max_position = 1 << (self.min_shift + 3 * self.depth)
+
+        chunks = []
+        for start, end in intervals:
+            begin = max(0, start - 1)
+            end = min(end, max_position)
+            if(begin >= end):
+                continue
+            min_offset = self.MinimalOffset(bins, linear_index, begin)
+            for bin_number in self.RegionToBins(begin, end):
+                if(bin_number in bins):
+                    chunks.extend(chunk for chunk in bins[bin_number][1] if chunk[1] > min_offset)
+
+        merged_chunks = []
+        for chunk_start, chunk_end in sorted(chunks):
+            if(len(merged_chunks) > 0 and chunk_start <= merged_chunks[-1][1]):
+                merged_chunks[-1] = (merged_chunks[-1][0], max(merged_chunks[-1][1], chunk_end))
+            else:
+                merged_chunks.append((chunk_start, chunk_end))
+
+        return merged_chunks
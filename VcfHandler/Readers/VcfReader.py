@@ -6,14 +6,29 @@ Implements a reader of VCF files.
 """
 
 
-from Generators.SfsGenerator import SfsGenerator
+from Filters.GenericFilter import GenericFilter
+from Generators.GenericGenerator import GenericGenerator
+from Generators.GenotypeStoreGenerator import GenotypeStoreGenerator
+from Instrumentation.Metrics import Metrics
+from Readers.BgzfReader import BgzfReader
+from Readers.GenotypeCache import GenotypeCache
+from Readers.GenotypeStoreReader import GenotypeStoreReader
+from Readers.ReadAheadReader import ReadAheadReader
+from Readers.Regions import Regions
+from Readers.TabixIndex import TabixIndex
+from Readers.VcfTokenizer import VcfTokenizer
 from VariantCallSet.IndividualCallValue import IndividualCallValue, Genotype
 from VariantCallSet.VariantCall import VariantCall
 from VariantCallSet.VariantCallSet import VariantCallSet
+from VariantCallSet.GenotypeBlock import GenotypeBlock
 
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-import re
+import os
+import gzip
+import math
+import time
+import numpy as np
 
 
 
@@ -23,43 +38,569 @@ class VcfReader:
     """
 
 
+    # codes of the genotypes in the packed buffers of variant calls, per textual value
+    # ALT alleles other than the first one are called, as in genotype blocks, anything else is a missing call
+    GENOTYPE_CODES = {"0": Genotype.REF.value, "1": Genotype.ALT.value, **{str(i): Genotype.OTHER_ALT.value for i in range(2, 10)}}
+
+
     # Constructor
 
-    def __init__(self, enable_debug: bool = False, **kwargs):
+    def __init__(self, enable_debug: bool = False, keep_variant_calls: bool = False, cache: GenotypeCache = None, threads: int = 1, read_ahead_chunk_size: int = 0, read_ahead_queue_size: int = ReadAheadReader.QUEUE_SIZE, **kwargs):
         """
         Constructor
+        If keep_variant_calls is True, the variant calls read line by line are kept in the variant call set,
+        otherwise they are released as soon as the generators have consumed them
+        If a cache is provided, the genotype blocks of the files read by blocks are stored in it,
+        and replayed from it when the same file is read again
+        If threads is greater than 1, the generators are fed with each genotype block in parallel threads,
+        which only pays off with several independent generators doing heavy work on each block
+        If read_ahead_chunk_size is greater than 0, files are read ahead in a background thread by chunks
+        of read_ahead_chunk_size characters, at most read_ahead_queue_size chunks ahead (see ReadAheadReader),
+        so that I/O overlaps with parsing and aggregation
         """
 
         self.variant_call_set = VariantCallSet()
 
-        self.sfs_generator = None
+        # generators fed with the variant calls of every file read
+        self.generators = []
+
+        # generators fed with the variant calls of the file being read, in addition to the registered ones
+        self.file_generators = []
 
         self.enable_debug = enable_debug
 
+        self.keep_variant_calls = keep_variant_calls
+
+        self.cache = cache
+
+        # generator writing the cache entry of the file being read, fed with unfiltered genotype blocks
+        self.cache_writer = None
+
+        # filters of the variant calls fed to the generators
+        self.filters = []
+
+        # splits lines into their fields, with the delimiter detected for the file being read
+        self.tokenizer = VcfTokenizer()
+
+        self.threads = threads
+
+        # pool of threads feeding the generators with genotype blocks, created when a file is read with several threads
+        self.executor = None
+
+        self.read_ahead_chunk_size = read_ahead_chunk_size
+        self.read_ahead_queue_size = read_ahead_queue_size
+
+
+
+    # Getters
+
+    def GetGenerators(self):
+        """
+        Returns the list of generators fed with the variant calls of the file being read
+        """
+
+        return self.generators + [generator for generator in self.file_generators if not generator in self.generators]
+
+
+    def SetFileGenerators(self, generators):
+        """
+        Sets the generators fed with the variant calls of the file being read: a generator, a list of generators or None
+        """
+
+        if(generators == None):
+            self.file_generators = []
+        elif(isinstance(generators, (list, tuple))):
+            self.file_generators = list(generators)
+        else:
+            self.file_generators = [generators]
+
 
 
     # Methods
 
-    def ReadFile(self, file_name: str, sfs_generator: SfsGenerator = None):
+    def RegisterGenerator(self, generator: GenericGenerator):
+        """
+        Registers the provided generator, which will be fed with the variant calls of every file read
+        """
+
+        self.generators.append(generator)
+
+
+    def AddFilter(self, filter: GenericFilter):
+        """
+        Adds the provided filter: only the variant calls accepted by all the filters are fed to the generators
+        """
+
+        self.filters.append(filter)
+
+
+
+    def ReadFile(self, file_name: str, sfs_generator = None, block_size: int = 10000, regions = None):
+        """
+        Reads the VCF filename provided in parameter and feeds the registered generators
+        and the provided one (or list of generators) with its variant calls
+        Each line is parsed once, and all the generators are fed with the same genotype blocks
+        If block_size is greater than 0, variant calls are streamed by blocks of block_size lines
+        parsed into genotype matrices, which are released once the generators have consumed them.
+        Otherwise, variant calls are read and materialized line by line.
+        If regions are provided (see Regions.FromArgument), only the variant calls whose position
+        is in one of them are read
+        The file can also be a genotype store converted from a VCF file (see ConvertFile),
+        which is read by chunks without any text parsing
+        """
+
+        Metrics.Log("Reading file " + file_name + "...")
+
+        self.SetFileGenerators(sfs_generator)
+
+        lines = None
+        try:
+            if(GenotypeStoreReader.IsGenotypeStore(file_name)):
+                self.ReadGenotypeStore(file_name, regions)
+            elif(self.cache != None and block_size > 0 and regions == None):
+                self.ReadCachedFile(file_name, block_size)
+            else:
+                lines = self.IterateLines(file_name, regions)
+                self.ReadLines(lines, block_size)
+        finally:
+            # lines are closed explicitly, so that the file and the read-ahead thread are released as soon as an error occurs
+            if(lines != None):
+                lines.close()
+            self.ShutdownExecutor()
+
+        Metrics.Log("Done.")
+
+
+
+    def ReadGenotypeStore(self, file_name: str, regions = None):
+        """
+        Feeds the generators with the genotype blocks of the genotype store provided in parameter
+        Only the individuals selected by the generators are unpacked from the memory-mapped chunks
+        Filters reading standard fields which aren't stored in the store (stores written before QUAL, FILTER and INFO
+        were stored) raise an exception rather than being evaluated on "." values
+        """
+
+        if(regions != None):
+            raise Exception("Regions can't be read from the genotype store " + file_name)
+
+        genotype_store_reader = GenotypeStoreReader(file_name)
+
+        # filters can't be evaluated on the standard fields which aren't stored, which are all "."
+        missing_fields = [field for filter in self.filters for field in filter.GetFields() if not field in genotype_store_reader.GetFields()]
+        if(len(missing_fields) > 0):
+            genotype_store_reader.close()
+            raise Exception("The genotype store " + file_name + " doesn't store the fields " + ", ".join(sorted(set(missing_fields))) + " read by the filters, convert the VCF file again")
+
+        self.variant_call_set.ResetHeader()
+        for line in genotype_store_reader.GetHeaderLines():
+            self.ReadHeaderLine(line)
+
+        for genotype_block in genotype_store_reader.IterateBlocks(self.GetSampleSelection()):
+            self.AddGenotypeBlock(genotype_block, True)
+
+        genotype_store_reader.close()
+
+
+
+    def ConvertFile(self, file_name: str, store_file_name: str, block_size: int = 10000):
+        """
+        Converts the VCF filename provided in parameter into a genotype store, in chunks of block_size variant calls
+        Generators registered in the reader are fed with the variant calls of the file as well
+        """
+
+        # stores are written from genotype blocks, which aren't built when lines are read one by one
+        if(block_size <= 0):
+            raise Exception("Genotype stores are written in chunks of at least one variant call, got a block size of " + str(block_size))
+
+        Metrics.Log("Converting file " + file_name + "...")
+
+        genotype_store_generator = GenotypeStoreGenerator(store_file_name)
+        self.SetFileGenerators(genotype_store_generator)
+
+        lines = self.IterateLines(file_name)
+        try:
+            self.ReadLines(lines, block_size)
+        finally:
+            lines.close()
+            self.ShutdownExecutor()
+        genotype_store_generator.GenerateOutputfile(store_file_name)
+
+        self.SetFileGenerators(None)
+
+        Metrics.Log("Done.")
+
+
+
+    def ReadCachedFile(self, file_name: str, block_size: int = 10000):
+        """
+        Feeds the generators with the genotype blocks of the VCF filename provided in parameter stored in the cache
+        If they aren't in the cache, the file is read by blocks of block_size lines, which are stored in the cache
+        """
+
+        # individuals are matched by name before the selection is computed
+        self.ReadHeader(file_name)
+
+        entry_id = self.cache.Find(file_name, self.GetSampleSelection())
+        if(entry_id != None):
+            Metrics.Log("Reading cached genotypes of file " + file_name + "...")
+            for genotype_block in self.cache.ReadBlocks(entry_id):
+                self.AddGenotypeBlock(genotype_block, True)
+            return
+
+        # the entry is independent from the filters, which are applied after the blocks are stored
+        self.cache_writer = self.cache.CreateWriter(file_name, self.GetSampleSelection())
+        lines = self.IterateLines(file_name)
+        try:
+            for genotype_block in self.IterateBlocks(lines, block_size, False):
+                self.cache_writer.AddGenotypeBlock(genotype_block)
+                self.AddGenotypeBlock(genotype_block, True)
+        except:
+            self.cache.Discard(self.cache_writer)
+            raise
+        else:
+            self.cache.Commit(self.cache_writer)
+        finally:
+            lines.close()
+            self.cache_writer = None
+
+
+
+    def IterateLines(self, file_name: str, regions = None):
         """
-        Reads the VCF filename provided in parameter
+        Yields the lines of the VCF filename provided in parameter, restricted to the provided regions if any
         """
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Reading file " + file_name + "...")
+        self.tokenizer = VcfTokenizer()
+        self.variant_call_set.ResetHeader()
+
+        if(regions != None):
+            yield from self.RegionLines(file_name, Regions.FromArgument(regions))
+            return
+
+        if(self.read_ahead_chunk_size > 0):
+            file = ReadAheadReader(self.OpenFile(file_name, self.read_ahead_chunk_size), self.read_ahead_chunk_size, self.read_ahead_queue_size)
+        else:
+            file = self.OpenFile(file_name)
+        try:
+            yield from file
+        finally:
+            file.close()
 
-        self.sfs_generator = sfs_generator
 
-        file = open(file_name, "r")
+
+    def IterateBlocks(self, lines, block_size: int = 10000, filter_fixed_fields: bool = True):
+        """
+        Yields the genotype blocks of at most block_size variant calls parsed from the provided iterable of lines
+        Only the individuals selected by the generators of the reader are decoded.
+        If filter_fixed_fields is True, lines rejected by the filters on the standard fields are skipped before decoding.
+        Header lines are skipped. Blocks aren't kept by the reader, so memory usage doesn't depend on the file size.
+        """
+
         line_cnt = 0
-        for line in file:
-            self.ReadLine(line)
+        block_lines = []
+
+        # lines of a block are timed as I/O, once the block is complete
+        block_start_time = time.perf_counter()
+        for line in lines:
+            if(not str.startswith(line, "#")):
+                block_lines.append(line)
+                if(len(block_lines) == block_size):
+                    Metrics.AddTime("io", time.perf_counter() - block_start_time)
+                    genotype_block = self.ParseBlock(block_lines, filter_fixed_fields)
+                    if(genotype_block != None):
+                        yield genotype_block
+                    block_lines = []
+                    block_start_time = time.perf_counter()
+            else:
+                self.ReadHeaderLine(line)
             line_cnt += 1
             if(line_cnt % 10000 == 0):
-                print(datetime.now().strftime("%H:%M:%S") + ": Read " + str(line_cnt) + " lines...")
+                Metrics.Log("Read " + str(line_cnt) + " lines" + self.GetProgress(line) + Metrics.GetRateSuffix() + "...")
+        Metrics.AddTime("io", time.perf_counter() - block_start_time)
+        if(len(block_lines) > 0):
+            genotype_block = self.ParseBlock(block_lines, filter_fixed_fields)
+            if(genotype_block != None):
+                yield genotype_block
+
+
+
+    def ReadFileParallel(self, file_name: str, sfs_generator, processes: int = None, block_size: int = 10000):
+        """
+        Reads the VCF filename provided in parameter with a pool of processes
+        The file is split in byte ranges, each range is read by a worker with its own copy of the generator
+        (or of each generator of the provided list) and the partial spectra returned by the workers are merged
+        into the provided generators, which must implement InitializeSpectra, GetPartialSpectrum and MergePartialSpectrum
+        Scripts using this method must be protected by a if __name__ == "__main__" guard
+        """
+
+        Metrics.Log("Reading file " + file_name + " in parallel...")
+
+        self.SetFileGenerators(sfs_generator)
+        generators = self.file_generators
+
+        if(processes == None):
+            processes = os.cpu_count()
+
+        if(GenotypeStoreReader.IsGenotypeStore(file_name)):
+            self.ReadFile(file_name, sfs_generator, block_size)
+            return
+
+        # individuals are matched by name before the generator is copied to the workers
+        self.ReadHeader(file_name)
+
+        if(BgzfReader.IsGzip(file_name) and not BgzfReader.IsBgzf(file_name)):
+            print("File " + file_name + " is not BGZF-compressed and can't be split, reading it with a single process")
+            self.ReadFile(file_name, sfs_generator, block_size)
+            return
+
+        # more shards than processes allow to balance the load between workers
+        shards = self.ComputeShards(file_name, 4 * processes)
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(VcfReader.ReadShard, file_name, shard, generators, block_size, self.filters) for shard in shards]
+            for future in futures:
+                for generator, partial_spectrum in zip(generators, future.result()):
+                    generator.MergePartialSpectrum(partial_spectrum)
+
+        Metrics.Log("Done.")
+
+
+
+    @staticmethod
+    def ReadShard(file_name: str, shard: tuple, generators: list, block_size: int, filters: list = []):
+        """
+        Reads the lines of the VCF file starting in the provided shard with empty copies
+        of the generators and the provided filters, and returns the resulting partial spectra
+        A shard is a byte range (start, end), or for BGZF files a tuple
+        (start, end, decompressed length, offset of the previous block) of compressed offsets
+        """
+
+        vcf_reader = VcfReader()
+        for generator in generators:
+            generator.InitializeSpectra()
+            vcf_reader.RegisterGenerator(generator)
+        for filter in filters:
+            vcf_reader.AddFilter(filter)
+
+        if(len(shard) == 4):
+            file = vcf_reader.OpenBgzfRange(file_name, shard[0], shard[2], shard[3])
+            lines = file
+        else:
+            file = open(file_name, "rb")
+            lines = vcf_reader.RangeLines(file, shard[0], shard[1])
+
+        vcf_reader.ReadLines(lines, block_size)
         file.close()
 
-        print(datetime.now().strftime("%H:%M:%S") + ": Done.")
-        
+        return [generator.GetPartialSpectrum() for generator in generators]
+
+
+
+    def OpenFile(self, file_name: str, buffer_size: int = -1):
+        """
+        Opens the provided VCF file for reading, transparently decompressing
+        BGZF and gzip files
+        Uncompressed files are read by reads of buffer_size bytes (the default buffer size if it's negative)
+        """
+
+        if(BgzfReader.IsBgzf(file_name)):
+            return BgzfReader(file_name)
+        if(BgzfReader.IsGzip(file_name)):
+            return gzip.open(file_name, "rt")
+
+        return open(file_name, "r", buffering=buffer_size)
+
+
+
+    def RegionLines(self, file_name: str, regions: Regions):
+        """
+        Yields the header lines of the provided VCF file, followed by its variant call lines in the provided regions
+        If the file is BGZF-compressed and indexed, only the blocks overlapping the regions are read,
+        otherwise the whole file is read and lines are filtered on their CHROM and POS fields only
+        """
+
+        index = TabixIndex.Open(file_name) if BgzfReader.IsBgzf(file_name) else None
+
+        if(index == None):
+            file = self.OpenFile(file_name)
+            try:
+                for line in file:
+                    if(str.startswith(line, "#") or self.IsLineInRegions(line, regions)):
+                        yield line
+            finally:
+                file.close()
+            return
+
+        file = BgzfReader(file_name, threaded=False)
+        try:
+            for line in file:
+                if(not str.startswith(line, "#")):
+                    break
+                yield line
+
+            for chrom in regions.GetChromosomes():
+                for chunk_start, chunk_end in index.Query(chrom, regions.GetIntervals(chrom)):
+                    for line in file.ReadChunkLines(chunk_start, chunk_end):
+                        if(self.IsLineInRegions(line, regions, chrom)):
+                            yield line
+        finally:
+            file.close()
+
+
+
+    def IsLineInRegions(self, line: str, regions: Regions, chrom: str = None):
+        """
+        Returns a boolean indicating whether the provided variant call line is in the provided regions
+        Only the CHROM and POS fields are parsed. If chrom is provided, the line must also be on this chromosome.
+        """
+
+        line_parts = line.split(None, 2)
+        if(len(line_parts) < 2 or (chrom != None and line_parts[0] != chrom)):
+            return False
+
+        return regions.Contains(line_parts[0], int(line_parts[1]))
+
+
+
+    def OpenBgzfRange(self, file_name: str, start: int, length: int, previous_block_offset: int):
+        """
+        Opens a reader of the lines starting in the first length bytes of decompressed data
+        after the BGZF block at the compressed offset start
+        """
+
+        # the first line is partial unless the previous block ends with a complete line
+        skip_first_line = False
+        if(previous_block_offset >= 0):
+            previous_block_reader = BgzfReader(file_name, threaded=False)
+            skip_first_line = not previous_block_reader.ReadBlockAt(previous_block_offset).endswith(b"\n")
+            previous_block_reader.close()
+
+        return BgzfReader(file_name, start, length, skip_first_line)
+
+
+
+    def ComputeShards(self, file_name: str, shards_cnt: int):
+        """
+        Splits the provided file in at most shards_cnt byte ranges of similar sizes
+        For BGZF files, ranges are aligned on block boundaries
+        """
+
+        file_size = os.path.getsize(file_name)
+        shard_size = max(1, math.ceil(file_size / max(1, shards_cnt)))
+
+        if(BgzfReader.IsBgzf(file_name)):
+            shards = []
+            start = 0
+            length = 0
+            previous_block_offset = -1
+            shard_previous_block_offset = -1
+            for offset, size in BgzfReader.ReadBlockOffsets(file_name):
+                if(offset - start >= shard_size):
+                    shards.append((start, offset, length, shard_previous_block_offset))
+                    start = offset
+                    length = 0
+                    shard_previous_block_offset = previous_block_offset
+                length += size
+                if(size > 0):
+                    previous_block_offset = offset
+            shards.append((start, file_size, length, shard_previous_block_offset))
+            return shards
+
+        return [(start, min(start + shard_size, file_size)) for start in range(0, file_size, shard_size)]
+
+
+
+    def RangeLines(self, file, start: int, end: int):
+        """
+        Yields the lines of the provided binary file which start in the byte range [start, end)
+        A line which starts before the range belongs to the previous range and is skipped
+        """
+
+        position = start
+        if(start > 0):
+            file.seek(start - 1)
+            if(file.read(1) != b"\n"):
+                position += len(file.readline())
+        else:
+            file.seek(0)
+
+        while position < end:
+            line = file.readline()
+            if(not line):
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+
+    def ReadLines(self, lines, block_size: int = 10000):
+        """
+        Reads the provided iterable of lines from a VCF file and feeds the generators with its variant calls
+        If block_size is greater than 0, variant calls are read by blocks of block_size lines
+        """
+
+        if(block_size > 0):
+            for genotype_block in self.IterateBlocks(lines, block_size):
+                self.AddGenotypeBlock(genotype_block)
+            return
+
+        line_cnt = 0
+        for line in lines:
+            self.ReadLine(line)
+            line_cnt += 1
+            if(line_cnt % 10000 == 0):
+                Metrics.Log("Read " + str(line_cnt) + " lines" + self.GetProgress(line) + Metrics.GetRateSuffix() + "...")
+
+
+
+    def ReadHeaderLine(self, line: str):
+        """
+        Reads the provided header line from a VCF file into the variant call set
+        Once the #CHROM line is read, the generators are provided with the variant call set
+        so that they can find their individuals by name
+        """
+
+        self.variant_call_set.ReadHeaderLine(line)
+
+        if(str.startswith(line, "#CHROM")):
+            self.tokenizer.DetectDelimiter(line)
+            for generator in self.GetGenerators():
+                generator.SetVariantCallSet(self.variant_call_set)
+
+
+    def ReadHeader(self, file_name: str):
+        """
+        Reads the header of the VCF filename provided in parameter into the variant call set
+        """
+
+        self.variant_call_set.ResetHeader()
+
+        file = self.OpenFile(file_name)
+        try:
+            for line in file:
+                if(not str.startswith(line, "#")):
+                    break
+                self.ReadHeaderLine(line)
+        finally:
+            file.close()
+
+
+    def GetProgress(self, line: str):
+        """
+        Returns the estimated fraction of the genome read when the provided line is reached,
+        as a message suffix, or an empty string if the lengths of the contigs are unknown
+        """
+
+        genome_length = self.variant_call_set.GetGenomeLength()
+        if(genome_length == None or genome_length == 0 or str.startswith(line, "#")):
+            return ""
+
+        line_parts = self.tokenizer.Split(line, 2)
+        contig_offsets = self.variant_call_set.GetContigOffsets()
+        if(len(line_parts) < 3 or not line_parts[0] in contig_offsets or not line_parts[1].isdigit()):
+            return ""
+
+        return " (" + str(round(100 * (contig_offsets[line_parts[0]] + int(line_parts[1])) / genome_length, 1)) + "% of the genome)"
 
 
     def ReadLine(self, line: str):
@@ -67,35 +608,270 @@ class VcfReader:
         Reads the provided line from a VCF file
         """
 
+        if(str.startswith(line, "#")):
+            self.ReadHeaderLine(line)
+
         # this is a variant call
         if(not str.startswith(line, "#")):
-            line_parts = re.split(r' +', line)  # elements on a line a separated by a variable number of empty spaces
+            line_parts = self.SplitLine(line)
+            Metrics.Count("lines")
 
-            if(len(line_parts) < 9):  # variant call must have at least 9 standard fields
-                line_parts = re.split(r'\t+', line)  # then we check tab separator
-                if(len(line_parts) < 9):  # variant call must have at least 9 standard fields
-                    raise Exception("Incorrect format for the variant call " + line)
+            if(not self.AcceptFixedFields(line_parts[0:VcfTokenizer.FIXED_FIELDS_CNT])):
+                Metrics.Count("sites_filtered")
+                return
 
             # creation of a variant call with the standard fields
             variant_call = VariantCall(line_parts[0], line_parts[1], line_parts[2], line_parts[3], line_parts[4], line_parts[5], line_parts[6], line_parts[7], line_parts[8])
 
+            # individuals which are not in the sample selection of the generator are not decoded
+            sample_indices = self.GetSampleSelection()
+            is_selected = None
+            if(sample_indices is not None):
+                is_selected = [False] * (len(line_parts) - 9)
+                for i in sample_indices.tolist():
+                    if(i < len(is_selected)):
+                        is_selected[i] = True
+
             # adding individual call values
             for i in range (9, len(line_parts)):
-                individual_call_info = line_parts[i]
-                individual_call_info_parts = individual_call_info.split(":")
-                genotype = individual_call_info_parts[0]  # format: 1/0 (1: ref, 0: alt, | or /: phased or non phased)
-                genotype_0 = genotype[0]
-                genotype_1 = genotype[2]
+                if(is_selected is not None and not is_selected[i - 9]):
+                    variant_call.AddGenotypes(Genotype.UNKNOWN.value, Genotype.UNKNOWN.value, 0)
+                    continue
+
+                genotype = line_parts[i][0:3]  # format: 1/0 (1: ref, 0: alt, | or /: phased or non phased)
+                if(len(genotype) < 3):
+                    raise Exception("Invalid genotype format: " + genotype)
+                genotype_0 = self.GENOTYPE_CODES.get(genotype[0], Genotype.UNKNOWN.value)
+                genotype_1 = self.GENOTYPE_CODES.get(genotype[2], Genotype.UNKNOWN.value)
                 if(genotype[1] == "|" or genotype[1] == "/"):
-                    is_phased = True if genotype[1] == "|" else False
+                    is_phased = 1 if genotype[1] == "|" else 0
                 else:
                     raise Exception("Invalid genotype format: " + genotype)
-                    
-                variant_call.AddIndividualCall(IndividualCallValue(genotype_0, genotype_1, is_phased))
+
+                variant_call.AddGenotypes(genotype_0, genotype_1, is_phased)
 
             if(self.enable_debug):
                 print("I read the line \"" + line + "\"")
                 print("The variant call is " + variant_call.ToFullString())
 
-            if(self.sfs_generator != None):
-                self.sfs_generator.AddVariantCall(variant_call)
\ No newline at end of file
+            # the genotype block of the variant call is built once for all the filters
+            genotype_block = GenotypeBlock.FromVariantCall(variant_call) if len(self.filters) > 0 else None
+            for filter in self.filters:
+                is_accepted = filter.FilterGenotypeBlock(genotype_block)
+                if(is_accepted is not None and not is_accepted[0]):
+                    Metrics.Count("sites_filtered")
+                    return
+
+            Metrics.Count("sites_kept")
+
+            if(self.keep_variant_calls):
+                self.variant_call_set.AddVariantCall(variant_call)
+
+            for generator in self.GetGenerators():
+                generator.AddVariantCall(variant_call)
+
+
+
+    def ReadBlock(self, lines: list):
+        """
+        Reads the provided variant call lines from a VCF file as a single genotype block
+        and feeds the generators with it
+        """
+
+        genotype_block = self.ParseBlock(lines)
+        if(genotype_block != None):
+            self.AddGenotypeBlock(genotype_block)
+
+        return genotype_block
+
+
+
+    def AddGenotypeBlock(self, genotype_block: GenotypeBlock, filter_fixed_fields: bool = False):
+        """
+        Feeds the generators with the variant calls of the provided genotype block accepted by the filters
+        Filters on the standard fields are only evaluated if filter_fixed_fields is True,
+        since they are usually evaluated on lines before decoding
+        """
+
+        is_accepted = np.ones(genotype_block.GetNumberOfVariants(), dtype=bool)
+        with Metrics.Stage("filter"):
+            for filter in self.filters:
+                if(filter_fixed_fields):
+                    is_accepted &= np.array([filter.AcceptFixedFields(fixed_fields) for fixed_fields in genotype_block.GetFixedFields()], dtype=bool)
+                filter_accepted = filter.FilterGenotypeBlock(genotype_block)
+                if(filter_accepted is not None):
+                    is_accepted &= filter_accepted
+
+        if(not is_accepted.all()):
+            Metrics.Count("sites_filtered", int(len(is_accepted) - is_accepted.sum()))
+            if(not is_accepted.any()):
+                return
+            genotype_block = genotype_block.GetSubset(is_accepted)
+
+        Metrics.Count("sites_kept", genotype_block.GetNumberOfVariants())
+
+        with Metrics.Stage("aggregate"):
+            generators = self.GetGenerators()
+            if(self.threads > 1 and len(generators) > 1):
+                # each generator gets the blocks in order, all of them being done with a block before the next one
+                if(self.executor == None):
+                    self.executor = ThreadPoolExecutor(max_workers=self.threads)
+                for future in [self.executor.submit(generator.AddGenotypeBlock, genotype_block) for generator in generators]:
+                    future.result()
+            else:
+                for generator in generators:
+                    generator.AddGenotypeBlock(genotype_block)
+
+
+    def ShutdownExecutor(self):
+        """
+        Stops the pool of threads feeding the generators, if any
+        """
+
+        if(self.executor != None):
+            self.executor.shutdown()
+            self.executor = None
+
+
+    def AcceptFixedFields(self, fixed_fields: list):
+        """
+        Returns True if the variant call with the provided standard fields is accepted by all the filters
+        """
+
+        for filter in self.filters:
+            if(not filter.AcceptFixedFields(fixed_fields)):
+                return False
+
+        return True
+
+
+
+    def ParseBlock(self, lines: list, filter_fixed_fields: bool = True):
+        """
+        Parses the provided variant call lines from a VCF file as a single genotype block
+        Only the individuals of the sample selection of the generators are decoded
+        If filter_fixed_fields is True, lines rejected by the filters on the standard fields are skipped,
+        and None is returned if all of them are rejected
+        """
+
+        fixed_fields = []
+        genotype_strings = []
+
+        # raw lines of the variant calls kept, written as they are by VCF writers
+        kept_lines = []
+
+        sample_indices = self.GetSampleSelection()
+
+        # the first line gives the number of individuals, used to restrict the selection to existing columns
+        samples_cnt = len(self.SplitLine(lines[0])) - VcfTokenizer.FIXED_FIELDS_CNT
+        if(sample_indices is not None):
+            sample_indices = sample_indices[sample_indices < samples_cnt]
+
+        with Metrics.Stage("tokenize"):
+            for line in lines:
+                fields, individual_calls = self.tokenizer.Tokenize(line)
+                if(filter_fixed_fields and len(self.filters) > 0 and not self.AcceptFixedFields(fields)):
+                    continue
+                fixed_fields.append(fields)
+                genotype_strings.append(self.ExtractGenotypes(line, individual_calls, sample_indices, samples_cnt))
+                kept_lines.append(line)
+
+        Metrics.Count("lines", len(lines))
+        Metrics.Count("sites_filtered", len(lines) - len(fixed_fields))
+
+        if(len(fixed_fields) == 0):
+            return None
+
+        selected_cnt = samples_cnt if sample_indices is None else len(sample_indices)
+        with Metrics.Stage("decode"):
+            genotype_block = GenotypeBlock(fixed_fields, *self.DecodeGenotypes(genotype_strings, len(fixed_fields), selected_cnt), sample_indices, kept_lines)
+
+        Metrics.Count("genotypes_decoded", len(fixed_fields) * selected_cnt)
+
+        if(self.enable_debug):
+            print("I read a block of " + str(genotype_block.GetNumberOfVariants()) + " variant calls")
+
+        return genotype_block
+
+
+
+    def GetSampleSelection(self):
+        """
+        Returns the sorted array of the indices of the individuals needed by the generators,
+        or None if all of them are needed
+        """
+
+        # filters and the cache entry being written need individuals as well
+        selectors = self.GetGenerators() + self.filters + ([self.cache_writer] if self.cache_writer != None else [])
+
+        if(len(selectors) == 0):
+            return None
+
+        sample_selection = np.array([], dtype=np.intp)
+        for selector in selectors:
+            generator_selection = selector.GetSampleSelection()
+            if(generator_selection is None):
+                return None
+            sample_selection = np.union1d(sample_selection, generator_selection)
+
+        return sample_selection
+
+
+
+    def ExtractGenotypes(self, line: str, individual_calls: str, sample_indices: np.ndarray, samples_cnt: int):
+        """
+        Extracts the concatenated GT prefixes (3 characters: 0/1 or 0|1) of the provided individuals
+        from the unsplit individual calls of a variant call line. Individual calls are only split
+        up to the last needed one and their FORMAT subfields are never split.
+        """
+
+        if(sample_indices is None):
+            individual_calls = self.tokenizer.SplitIndividualCalls(individual_calls)
+            if(len(individual_calls) != samples_cnt):
+                raise Exception("Incorrect number of individuals for the variant call " + line)
+            genotypes = "".join([individual_call[0:3] for individual_call in individual_calls])
+        else:
+            if(len(sample_indices) > 0):
+                individual_calls = self.tokenizer.SplitIndividualCalls(individual_calls, int(sample_indices[-1]) + 1)
+                if(len(individual_calls) <= sample_indices[-1]):
+                    raise Exception("Incorrect number of individuals for the variant call " + line)
+            genotypes = "".join([individual_calls[i][0:3] for i in sample_indices.tolist()])
+
+        if(len(genotypes) != 3 * (samples_cnt if sample_indices is None else len(sample_indices))):
+            raise Exception("Invalid genotype format in the variant call " + line)
+
+        return genotypes
+
+
+
+    def DecodeGenotypes(self, genotype_strings: list, variants_cnt: int, samples_cnt: int):
+        """
+        Decodes the provided genotype strings (concatenated 3 characters genotypes of each variant call)
+        into an allele matrix of shape (variants, samples, 2) and a packed phasing bitmask
+        """
+
+        codes = np.frombuffer("".join(genotype_strings).encode("ascii"), dtype=np.uint8).reshape(variants_cnt, samples_cnt, 3)
+
+        separators = codes[:, :, 1]
+        phased = separators == ord("|")
+        is_valid = phased | (separators == ord("/"))
+        if(not np.all(is_valid)):
+            invalid_index = int(np.argmin(is_valid.ravel()))
+            raise Exception("Invalid genotype format: " + bytes(codes.reshape(-1, 3)[invalid_index]).decode("ascii"))
+
+        # digits are converted to allele indices, anything else (typically '.') is a missing call
+        alleles = codes[:, :, 0::2].astype(np.int8) - ord("0")
+        alleles[(alleles < 0) | (alleles > 9)] = GenotypeBlock.MISSING_ALLELE
+
+        return alleles, np.packbits(phased, axis=1)
+
+
+
+    def SplitLine(self, line: str):
+        """
+        Splits the provided variant call line into its fields
+        """
+
+        fixed_fields, individual_calls = self.tokenizer.Tokenize(line)
+
+        return fixed_fields + self.tokenizer.SplitIndividualCalls(individual_calls)
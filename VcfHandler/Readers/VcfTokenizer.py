@@ -0,0 +1,97 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements the splitting of VCF lines into their fields.
+"""
+
+
+import re
+
+
+class VcfTokenizer:
+    """
+    Implements the splitting of VCF lines into their fields.
+    The delimiter of the file is detected once, from the header or the first variant call.
+    Lines are split into their 9 standard fields and the unsplit tail of individual calls,
+    which is only split when individual calls are decoded.
+    """
+
+
+    # number of standard fields of a variant call (CHROM to FORMAT)
+    FIXED_FIELDS_CNT = 9
+
+    # delimiter of space-separated files: elements are separated by a variable number of empty spaces
+    SPACES = re.compile(r' +')
+
+
+    # Constructor
+
+    def __init__(self, **kwargs):
+        """
+        Constructor
+        """
+
+        # "\t" for tab-separated files, " " for space-separated files, None until detected
+        self.delimiter = None
+
+
+
+    # Methods
+
+    def DetectDelimiter(self, line: str):
+        """
+        Detects the delimiter of the file from the provided #CHROM header line or variant call line
+        """
+
+        line = line.rstrip("\r\n")
+
+        if(len(line.split("\t", self.FIXED_FIELDS_CNT - 1)) == self.FIXED_FIELDS_CNT):
+            self.delimiter = "\t"
+        elif(len(self.SPACES.split(line, self.FIXED_FIELDS_CNT - 1)) == self.FIXED_FIELDS_CNT):
+            self.delimiter = " "
+        else:
+            raise Exception("Incorrect format for the variant call " + line)
+
+
+    def Split(self, line: str, max_split: int):
+        """
+        Splits the provided line with the delimiter of the file, in at most max_split + 1 parts
+        """
+
+        if(self.delimiter == "\t"):
+            return line.split("\t", max_split)
+
+        return self.SPACES.split(line, max_split if max_split > 0 else 0)
+
+
+    def Tokenize(self, line: str):
+        """
+        Splits the provided variant call line into the list of its 9 standard fields
+        and the unsplit string of its individual calls, without the trailing line break
+        """
+
+        if(self.delimiter == None):
+            self.DetectDelimiter(line)
+
+        line_parts = self.Split(line.rstrip("\r\n"), self.FIXED_FIELDS_CNT)
+        if(len(line_parts) < self.FIXED_FIELDS_CNT):  # variant call must have at least 9 standard fields
+            raise Exception("Incorrect format for the variant call " + line)
+
+        if(len(line_parts) == self.FIXED_FIELDS_CNT):
+            return line_parts, ""
+
+        return line_parts[0:self.FIXED_FIELDS_CNT], line_parts[self.FIXED_FIELDS_CNT]
+
+
+    def SplitIndividualCalls(self, individual_calls: str, max_cnt: int = -1):
+        """
+        Splits the provided string of individual calls
+        If max_cnt is positive, only the first max_cnt individual calls are split, the rest of the string
+        being kept as the last element
+        """
+
+        if(individual_calls == ""):
+            return []
+
+        return self.Split(individual_calls, max_cnt)
@@ -0,0 +1,243 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Represents a block of consecutive variant calls stored as a compact genotype matrix.
+"""
+
+
+from VariantCallSet.IndividualCallValue import Genotype
+from VariantCallSet.VariantCall import VariantCall
+
+import threading
+import numpy as np
+
+
+class GenotypeBlock:
+    """
+    Represents a block of consecutive variant calls stored as a compact genotype matrix.
+    Alleles are stored in an int8 matrix of shape (variants, samples, 2) where each value
+    is the allele index of the call (0: ref, 1: first alt, ...) or MISSING_ALLELE for nocalls.
+    Phasing is stored as a bitmask of shape (variants, ceil(samples / 8)).
+    A block is shared by all the consumers of the reader: derived views (ALT and called masks, allele counts
+    of sets of individuals) are computed on demand, at most once per block, and shared by the consumers.
+    """
+
+
+    # value of the allele matrix for a missing call
+    MISSING_ALLELE = -1
+
+
+    # Constructor
+
+    def __init__(self, fixed_fields: list, alleles: np.ndarray, phased_bits: np.ndarray, sample_indices: np.ndarray = None, lines: list = None, **kwargs):
+        """
+        Constructor
+        """
+
+        # standard fields of each variant call (CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO, FORMAT)
+        self.fixed_fields = fixed_fields
+
+        # allele matrix of shape (variants, samples, 2)
+        self.alleles = alleles
+
+        # packed phasing bitmask of shape (variants, ceil(samples / 8))
+        self.phased_bits = phased_bits
+
+        # sorted indices of the individuals of the block in the variant call set, None if all of them are in the block
+        self.sample_indices = sample_indices
+
+        # raw lines of the variant calls, None if the block wasn't parsed from a VCF file
+        self.lines = lines
+
+        # views derived from the allele matrix, per key, computed on demand and shared by the consumers of the block
+        self.views = {}
+
+        # lock ensuring that a view is computed once when consumers run in parallel threads, reentrant since views
+        # are computed from other views
+        self.views_lock = threading.RLock()
+
+
+
+    # Getters
+
+    def GetNumberOfVariants(self):
+        """
+        Returns the number of variant calls of the block
+        """
+        return self.alleles.shape[0]
+
+
+    def GetNumberOfSamples(self):
+        """
+        Returns the number of individuals of the block
+        """
+        return self.alleles.shape[1]
+
+
+    def GetFixedFields(self):
+        """
+        Returns the list of standard fields of each variant call of the block
+        """
+        return self.fixed_fields
+
+
+    def GetAlleles(self):
+        """
+        Returns the allele matrix of the block
+        """
+        return self.alleles
+
+
+    def GetSampleIndices(self):
+        """
+        Returns the sorted indices of the individuals of the block in the variant call set,
+        or None if all of them are in the block
+        """
+        return self.sample_indices
+
+
+    def GetLines(self):
+        """
+        Returns the raw lines of the variant calls of the block, or None if the block wasn't parsed from a VCF file
+        """
+        return self.lines
+
+
+    def GetPhased(self):
+        """
+        Returns a boolean matrix of shape (variants, samples) indicating whether each genotype is phased
+        """
+        return np.unpackbits(self.phased_bits, axis=1, count=self.GetNumberOfSamples()).astype(bool)
+
+
+
+    def GetIsAlt(self):
+        """
+        Returns the boolean matrix of shape (variants, samples, 2) of the alleles equal to the first ALT allele
+        """
+        return self.GetView(("is_alt",), lambda: self.alleles == 1)
+
+
+    def GetIsCalled(self):
+        """
+        Returns the boolean matrix of shape (variants, samples, 2) of the alleles which aren't missing
+        """
+        return self.GetView(("is_called",), lambda: self.alleles != self.MISSING_ALLELE)
+
+
+    def GetAltCounts(self, sample_indices: np.ndarray):
+        """
+        Returns the number of alleles equal to the first ALT allele of the provided individuals of the variant call set,
+        for each variant call
+        """
+        return self.GetView(("alt_counts", sample_indices.tobytes()), lambda: self.CountAlleles(self.GetIsAlt(), sample_indices))
+
+
+    def GetCalledCounts(self, sample_indices: np.ndarray):
+        """
+        Returns the number of called alleles of the provided individuals of the variant call set, for each variant call
+        """
+        return self.GetView(("called_counts", sample_indices.tobytes()), lambda: self.CountAlleles(self.GetIsCalled(), sample_indices))
+
+
+
+    # Methods
+
+    def GetView(self, key: tuple, compute):
+        """
+        Returns the view of the provided key, computed with the provided function the first time it's requested
+        """
+
+        view = self.views.get(key)
+        if(view is None):
+            with self.views_lock:
+                view = self.views.get(key)
+                if(view is None):
+                    view = compute()
+                    self.views[key] = view
+
+        return view
+
+
+    def CountAlleles(self, is_counted: np.ndarray, sample_indices: np.ndarray):
+        """
+        Returns the number of alleles of the provided individuals of the variant call set which are set in the provided
+        boolean matrix of shape (variants, samples, 2), for each variant call
+        """
+        return is_counted[:, self.GetSamplePositions(sample_indices), :].sum(axis=(1, 2), dtype=np.int64)
+
+
+    def GetSamplePositions(self, sample_indices: np.ndarray):
+        """
+        Returns the positions in the block of the provided individuals of the variant call set
+        Individuals beyond the last column of the variant call set are ignored
+        """
+
+        if(self.sample_indices is None):
+            return sample_indices[sample_indices < self.GetNumberOfSamples()]
+
+        positions = np.searchsorted(self.sample_indices, sample_indices)
+        is_in_block = positions < len(self.sample_indices)
+        if(not np.array_equal(self.sample_indices[positions[is_in_block]], sample_indices[is_in_block])):
+            raise Exception("Some of the requested individuals haven't been decoded in the genotype block")
+
+        return positions[is_in_block]
+
+
+    def GetSubset(self, is_selected: np.ndarray):
+        """
+        Returns the genotype block made of the variant calls selected by the provided boolean array
+        """
+
+        fixed_fields = [fields for fields, selected in zip(self.fixed_fields, is_selected.tolist()) if selected]
+        lines = None if self.lines == None else [line for line, selected in zip(self.lines, is_selected.tolist()) if selected]
+
+        return GenotypeBlock(fixed_fields, self.alleles[is_selected], self.phased_bits[is_selected], self.sample_indices, lines)
+
+
+    @classmethod
+    def FromVariantCall(cls, variant_call: VariantCall):
+        """
+        Returns the genotype block made of the provided variant call
+        ALT alleles other than the first one are all given the allele index 2
+        """
+
+        genotypes = np.frombuffer(variant_call.GetGenotypes().tobytes(), dtype=np.int8).reshape(1, -1, 3)
+
+        alleles = np.full((1, genotypes.shape[1], 2), cls.MISSING_ALLELE, dtype=np.int8)
+        alleles[genotypes[:, :, 0:2] == Genotype.REF.value] = 0
+        alleles[genotypes[:, :, 0:2] == Genotype.ALT.value] = 1
+        alleles[genotypes[:, :, 0:2] == Genotype.OTHER_ALT.value] = 2
+
+        fixed_fields = [variant_call.GetChromosome(), variant_call.GetPosition(), variant_call.GetId(), variant_call.GetRef(), variant_call.GetAlt(),
+                        variant_call.GetQuality(), variant_call.GetFilter(), variant_call.GetInfo(), variant_call.GetFormat()]
+
+        return cls([fixed_fields], alleles, np.packbits(genotypes[:, :, 2] != 0, axis=1))
+
+
+    def GetVariantCall(self, index: int):
+        """
+        Materializes the variant call at the provided index of the block
+        """
+
+        variant_call = VariantCall(*self.fixed_fields[index])
+
+        # packed buffer of the variant call: genotype codes of both alleles and phasing flag of each individual
+        genotypes = np.full((self.GetNumberOfSamples(), 3), Genotype.UNKNOWN.value, dtype=np.int8)
+        genotypes[:, 0:2][self.alleles[index] == 0] = Genotype.REF.value
+        genotypes[:, 0:2][self.alleles[index] == 1] = Genotype.ALT.value
+        genotypes[:, 0:2][self.alleles[index] >= 2] = Genotype.OTHER_ALT.value
+        genotypes[:, 2] = np.unpackbits(self.phased_bits[index], count=self.GetNumberOfSamples())
+        variant_call.SetGenotypes(genotypes.tobytes())
+
+        return variant_call
+
+
+    def GetVariantCalls(self):
+        """
+        Materializes the variant calls of the block one by one
+        """
+
+        for i in range(0, self.GetNumberOfVariants()):
+            yield self.GetVariantCall(i)
@@ -6,6 +6,7 @@ Represents a variant call value for an individual of the cohort.
 """
 
 
+from array import array
 from enum import Enum
 
 
@@ -13,14 +14,24 @@ class Genotype(Enum):
     REF = 1
     ALT = 2
     UNKNOWN = 3
+    OTHER_ALT = 4  # called ALT allele other than the first one, at multiallelic variant calls
 
 
 
 class IndividualCallValue:
     """
     Represents a variant call value for an individual of the cohort.
+    The value is a lightweight view over three bytes of a packed buffer
+    (genotype 0 code, genotype 1 code, phasing flag), which is usually
+    the genotype buffer of a variant call shared by all its individuals.
     """
-    
+
+
+    __slots__ = ("genotypes", "offset")
+
+    # genotypes indexed by their code in the packed buffer (the value of the Genotype enum)
+    GENOTYPES = (None, Genotype.REF, Genotype.ALT, Genotype.UNKNOWN, Genotype.OTHER_ALT)
+
 
     # Constructor
 
@@ -29,9 +40,21 @@ class IndividualCallValue:
         Constructor
         """
 
-        self.genotype_0 = self.GenotypeFromString(genotype_0)
-        self.genotype_1 = self.GenotypeFromString(genotype_1)
-        self.is_phased = is_phased
+        self.genotypes = array("b", (self.GenotypeFromString(genotype_0).value, self.GenotypeFromString(genotype_1).value, 1 if is_phased else 0))
+        self.offset = 0
+
+
+    @classmethod
+    def FromBuffer(cls, genotypes: array, offset: int):
+        """
+        Creates a view over the individual call value stored at the provided offset of the packed buffer
+        """
+
+        individual_call_value = cls.__new__(cls)
+        individual_call_value.genotypes = genotypes
+        individual_call_value.offset = offset
+
+        return individual_call_value
 
 
 
@@ -41,21 +64,28 @@ class IndividualCallValue:
         """
         Returns the value of the first genotype of the individual
         """
-        return self.genotype_0
+        return self.GENOTYPES[self.genotypes[self.offset]]
 
 
     def GetGenotype1(self):
         """
         Returns the value of the second genotype of the individual
         """
-        return self.genotype_1
+        return self.GENOTYPES[self.genotypes[self.offset + 1]]
 
 
     def GetIsPhased(self):
         """
         Returns a boolean indicating whether the genotype is phased
         """
-        return self.is_phased
+        return self.genotypes[self.offset + 2] == 1
+
+
+    def GetPackedValue(self):
+        """
+        Returns the three bytes (genotype 0 code, genotype 1 code, phasing flag) of the individual call value
+        """
+        return self.genotypes[self.offset:self.offset + 3]
 
 
     def ToString(self):
@@ -84,6 +114,8 @@ class IndividualCallValue:
             result = "0"
         elif(genotype == Genotype.ALT):
             result = "1"
+        elif(genotype == Genotype.OTHER_ALT):
+            result = ">1"
 
         return result
 
@@ -99,5 +131,7 @@ class IndividualCallValue:
             result = Genotype.REF
         elif(genotype_value == "1"):
             result = Genotype.ALT
+        elif(len(genotype_value) == 1 and genotype_value in "23456789"):
+            result = Genotype.OTHER_ALT
 
         return result
\ No newline at end of file
@@ -8,13 +8,20 @@ Represents a variant call.
 
 from VariantCallSet.IndividualCallValue import IndividualCallValue
 
+from array import array
+
 
 class VariantCall:
     """
     Represents a variant call.
+    Individual call values are packed in a single buffer of three bytes per individual
+    (genotype 0 code, genotype 1 code, phasing flag) and exposed as views over this buffer.
     """
 
 
+    __slots__ = ("chrom", "pos", "id", "ref", "alt", "qual", "filter", "info", "format", "genotypes")
+
+
     # Constructor
 
     def __init__(self, chrom: str, pos: int, id: str, ref: str, alt: str, qual: str, filter: str, info: str, format: str, **kwargs):
@@ -31,7 +38,7 @@ class VariantCall:
         self.filter = filter
         self.info = info
         self.format = format
-        self.individual_calls = []
+        self.genotypes = array("b")
 
         self.CheckFields()
 
@@ -78,7 +85,7 @@ class VariantCall:
         """
         Returns the quality of the call
         """
-        return self.chrom
+        return self.qual
 
 
     def GetFilter(self):
@@ -104,9 +111,23 @@ class VariantCall:
 
     def GetIndividualCalls(self):
         """
-        Returns the list of individual calls of the variant call
+        Returns the list of individual calls of the variant call, as views over the genotype buffer
+        """
+        return [IndividualCallValue.FromBuffer(self.genotypes, offset) for offset in range(0, len(self.genotypes), 3)]
+
+
+    def GetNumberOfIndividualCalls(self):
+        """
+        Returns the number of individual calls of the variant call
+        """
+        return len(self.genotypes) // 3
+
+
+    def GetGenotypes(self):
+        """
+        Returns the packed genotype buffer of the variant call
         """
-        return self.individual_calls
+        return self.genotypes
 
 
 
@@ -127,7 +148,25 @@ class VariantCall:
         Adds the provided individual call value to the list of individual values of the variant call
         """
 
-        self.individual_calls.append(individual_call)
+        self.genotypes.extend(individual_call.GetPackedValue())
+
+
+    def AddGenotypes(self, genotype_0: int, genotype_1: int, is_phased: int):
+        """
+        Adds an individual call value from its genotype codes (values of the Genotype enum) and phasing flag (0 or 1)
+        """
+
+        self.genotypes.append(genotype_0)
+        self.genotypes.append(genotype_1)
+        self.genotypes.append(is_phased)
+
+
+    def SetGenotypes(self, genotypes: bytes):
+        """
+        Sets all the individual call values from a packed buffer of three bytes per individual
+        """
+
+        self.genotypes = array("b", genotypes)
 
 
     def ToString(self):
@@ -135,7 +174,7 @@ class VariantCall:
         Returns the textual representation of the variant call
         """
 
-        return "chrom: {" + self.GetChromosome() + "} pos: {" + self.GetPosition() + "} ref: {" + self.GetRef() + "} alt: {" + self.GetAlt() + "} individuals: {" + str(len(self.GetIndividualCalls())) + "}"
+        return "chrom: {" + self.GetChromosome() + "} pos: {" + self.GetPosition() + "} ref: {" + self.GetRef() + "} alt: {" + self.GetAlt() + "} individuals: {" + str(self.GetNumberOfIndividualCalls()) + "}"
 
 
     def ToFullString(self):
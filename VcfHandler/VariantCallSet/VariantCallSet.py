@@ -23,6 +23,9 @@ class VariantCallSet:
         Constructor
         """
 
+        # version of the VCF format of this variant call set
+        self.file_format = None
+
         # programs used to generate this variant call set
         self.sources = []
 
@@ -35,16 +38,161 @@ class VariantCallSet:
         # dictionary of infos used in this variant call set
         self.infos = {}
 
-        # list of contigs in this variant call set
+        # list of contigs in this variant call set, each contig being a dictionary of its attributes (ID, length...)
         self.contigs = []
 
+        # names of the individuals of this variant call set, in the order of the columns
+        self.sample_names = []
+
+        # index of the column of each individual, per name
+        self.sample_columns = {}
+
+        # raw header lines of this variant call set, including the #CHROM line
+        self.header_lines = []
+
         # list of variant calls of this variant call set
         self.variant_calls = []
 
 
 
+    # Getters
+
+    def GetSampleNames(self):
+        """
+        Returns the names of the individuals of this variant call set, in the order of the columns
+        """
+        return self.sample_names
+
+
+    def GetSampleColumn(self, sample_name: str):
+        """
+        Returns the index of the column of the provided individual, or None if it's not in this variant call set
+        """
+        return self.sample_columns.get(sample_name)
+
+
+    def GetContigLength(self, contig_name: str):
+        """
+        Returns the length of the provided contig, or None if unknown
+        """
+
+        for contig in self.contigs:
+            if(contig.get("ID") == contig_name and "length" in contig):
+                return int(contig["length"])
+
+        return None
+
+
+    def GetGenomeLength(self):
+        """
+        Returns the sum of the lengths of the contigs of the header, or None if some of them are unknown
+        """
+
+        if(len(self.contigs) == 0 or any(not "length" in contig for contig in self.contigs)):
+            return None
+
+        return sum(int(contig["length"]) for contig in self.contigs)
+
+
+    def GetContigOffsets(self):
+        """
+        Returns the position of the start of each contig in the concatenation of all the contigs, per name
+        """
+
+        contig_offsets = {}
+        offset = 0
+        for contig in self.contigs:
+            contig_offsets[contig.get("ID")] = offset
+            offset += int(contig.get("length", 0))
+
+        return contig_offsets
+
+
+
     # Methods
 
+    def ResetHeader(self):
+        """
+        Clears the information read from the header of a VCF file
+        """
+
+        self.file_format = None
+        self.sources = []
+        self.filters = {}
+        self.formats = {}
+        self.infos = {}
+        self.contigs = []
+        self.sample_names = []
+        self.sample_columns = {}
+        self.header_lines = []
+
+
+    def ReadHeaderLine(self, line: str):
+        """
+        Reads the provided header line (## meta-information line or #CHROM line)
+        """
+
+        line = line.rstrip("\r\n")
+        self.header_lines.append(line)
+
+        if(str.startswith(line, "#CHROM")):
+            self.sample_names = line.split("\t")[9:] if "\t" in line else line.split()[9:]
+            self.sample_columns = {}
+            for i in range(0, len(self.sample_names)):
+                self.sample_columns[self.sample_names[i]] = i
+            return
+
+        if(not str.startswith(line, "##") or not "=" in line):
+            return
+
+        key, value = line[2:].split("=", 1)
+
+        if(key == "fileformat"):
+            self.file_format = value
+        elif(key == "source"):
+            self.sources.append(value)
+        elif(str.startswith(value, "<") and str.endswith(value, ">")):
+            attributes = self.ParseStructuredValue(value[1:-1])
+            if(key == "contig"):
+                self.contigs.append(attributes)
+            elif(key == "FILTER"):
+                self.filters[attributes.get("ID")] = attributes
+            elif(key == "FORMAT"):
+                self.formats[attributes.get("ID")] = attributes
+            elif(key == "INFO"):
+                self.infos[attributes.get("ID")] = attributes
+
+
+    def ParseStructuredValue(self, value: str):
+        """
+        Parses the attributes of a structured meta-information value: ID=DP,Number=1,Description="..."
+        Commas and equal signs in quoted values are kept
+        """
+
+        attributes = {}
+
+        key = ""
+        current = ""
+        in_quotes = False
+        for character in value:
+            if(character == "\""):
+                in_quotes = not in_quotes
+            elif(character == "=" and not in_quotes and key == ""):
+                key = current
+                current = ""
+            elif(character == "," and not in_quotes):
+                attributes[key] = current
+                key = ""
+                current = ""
+            else:
+                current += character
+        if(key != "" or current != ""):
+            attributes[key] = current
+
+        return attributes
+
+
+
     def AddVariantCall(self, variant_call: VariantCall):
         """
         Adds the provided variant call to the list of variant call sets
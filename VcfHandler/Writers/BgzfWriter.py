@@ -0,0 +1,155 @@
+# -*-coding:Utf-8 -*
+
+
+"""
+Implements a streaming writer of BGZF (blocked gzip) files, as produced by bgzip.
+"""
+
+
+from threading import Thread
+from queue import Queue
+
+import struct
+import zlib
+
+
+class BgzfWriter:
+    """
+    Implements a streaming writer of BGZF (blocked gzip) files, as produced by bgzip.
+    Data is buffered, then cut in blocks of at most BLOCK_DATA_SIZE bytes, each block being compressed
+    as an independent gzip member storing its own compressed size in a 'BC' extra subfield.
+    The file ends with the empty EOF block. Files can be read by the BgzfReader, bgzip and tabix.
+    Compression can run in a background thread, fed with batches of blocks through a bounded queue,
+    so that it overlaps with parsing: the caller only waits if the queue is full.
+    """
+
+
+    # maximal size of the decompressed data of a block, as bgzip
+    BLOCK_DATA_SIZE = 65280
+
+    # size of the buffered data handed to the compression at once, made of several blocks
+    BUFFER_SIZE = 64 * BLOCK_DATA_SIZE
+
+    # empty block ending BGZF files
+    EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+    # Constructor
+
+    def __init__(self, file_name: str, compression_level: int = 6, threaded: bool = True, queue_size: int = 8, **kwargs):
+        """
+        Constructor
+        """
+
+        self.file_name = file_name
+        self.compression_level = compression_level
+        self.threaded = threaded
+
+        self.file = open(file_name, "wb")
+
+        # data written but not compressed yet
+        self.buffer = bytearray()
+
+        # batches of data to compress, and thread compressing them and writing the blocks in order
+        self.batches = None
+        self.thread = None
+
+        # exception raised by the compression thread, raised again in the caller
+        self.exception = None
+
+        if(self.threaded):
+            self.batches = Queue(maxsize=queue_size)
+            self.thread = Thread(target=self.compressBatches, daemon=True)
+            self.thread.start()
+
+
+
+    # Methods
+
+    def write(self, data):
+        """
+        Writes the provided text or bytes
+        """
+
+        self.buffer += data.encode("utf-8") if isinstance(data, str) else data
+
+        if(len(self.buffer) >= self.BUFFER_SIZE):
+            self.flushBuffer()
+
+
+    def flushBuffer(self):
+        """
+        Hands the buffered data to the compression
+        """
+
+        if(self.exception != None):
+            raise self.exception
+
+        if(len(self.buffer) == 0):
+            return
+
+        batch = bytes(self.buffer)
+        self.buffer = bytearray()
+
+        if(self.threaded):
+            self.batches.put(batch)
+        else:
+            self.file.write(self.CompressBatch(batch))
+
+
+    def CompressBatch(self, batch: bytes):
+        """
+        Returns the BGZF blocks of the provided data
+        """
+        return b"".join(self.CompressBlock(batch[start:start + self.BLOCK_DATA_SIZE]) for start in range(0, len(batch), self.BLOCK_DATA_SIZE))
+
+
+    def CompressBlock(self, data: bytes):
+        """
+        Returns the BGZF block of the provided data, of at most BLOCK_DATA_SIZE bytes
+        """
+
+        compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -15)
+        compressed_data = compressor.compress(data) + compressor.flush()
+
+        # gzip header with the BC subfield giving the total size of the block minus 1
+        header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff" + struct.pack("<H2sHH", 6, b"BC", 2, len(compressed_data) + 25)
+        footer = struct.pack("<II", zlib.crc32(data), len(data))
+
+        return header + compressed_data + footer
+
+
+    def compressBatches(self):
+        """
+        Compresses the batches of the queue and writes their blocks, until the None batch ending the file
+        """
+
+        while True:
+            batch = self.batches.get()
+            if(batch == None):
+                return
+            if(self.exception != None):
+                continue
+
+            try:
+                self.file.write(self.CompressBatch(batch))
+            except Exception as exception:
+                self.exception = exception
+
+
+    def close(self):
+        """
+        Compresses the remaining data, writes the EOF block and closes the file
+        """
+
+        self.flushBuffer()
+
+        if(self.threaded):
+            self.batches.put(None)
+            self.thread.join()
+
+        self.file.write(self.EOF_BLOCK)
+        self.file.close()
+
+        if(self.exception != None):
+            raise self.exception